@@ -300,13 +300,14 @@ import { useRouter } from "next/navigation";
 import Link from "next/link";
 import { Users, LogOut, LayoutGrid, Trash2, Calendar, Wallet } from "lucide-react";
 import { authService, User } from "@/services/authService";
-import { userService } from "@/services/userService";
+import { userService, DashboardStats } from "@/services/userService";
 import AddEmployeeModal from "@/components/admin/AddEmployeeModal";
 
 export default function AdminDashboard() {
   const router = useRouter();
   const [user, setUser] = useState<User | null>(null);
   const [employees, setEmployees] = useState<User[]>([]);
+  const [stats, setStats] = useState<DashboardStats | null>(null);
   const [isModalOpen, setIsModalOpen] = useState(false);
   const [loading, setLoading] = useState(true);
   const [deletingId, setDeletingId] = useState<number | null>(null);
@@ -314,15 +315,7 @@ export default function AdminDashboard() {
   const fetchEmployees = async () => {
     try {
       setLoading(true);
-      const data = await userService.getEmployees();
-      
-      if (data.results) {
-        setEmployees(data.results);
-      } else if (Array.isArray(data)) {
-        setEmployees(data);
-      } else {
-        setEmployees([]);
-      }
+      setEmployees(await userService.getAllEmployees());
     } catch (err) {
       console.error("Fetch employees failed:", err);
       setEmployees([]);
@@ -331,6 +324,18 @@ export default function AdminDashboard() {
     }
   };
 
+  const fetchStats = async () => {
+    try {
+      setStats(await userService.getDashboardStats());
+    } catch (err) {
+      console.error("Fetch dashboard stats failed:", err);
+    }
+  };
+
+  const refreshDashboard = async () => {
+    await Promise.all([fetchEmployees(), fetchStats()]);
+  };
+
   const handleDeleteEmployee = async (id: number, username: string) => {
     if (!confirm(`Are you sure you want to delete employee "${username}"?`)) {
       return;
@@ -339,7 +344,7 @@ export default function AdminDashboard() {
     try {
       setDeletingId(id);
       await userService.deleteEmployee(id);
-      await fetchEmployees();
+      await refreshDashboard();
     } catch (err) {
       console.error("Delete failed:", err);
       alert("Failed to delete employee. Please try again.");
@@ -368,7 +373,7 @@ export default function AdminDashboard() {
       }
 
       setUser(currentUser);
-      fetchEmployees();
+      refreshDashboard();
     };
 
     initDashboard();
@@ -382,8 +387,8 @@ export default function AdminDashboard() {
     );
   }
 
-  const activeEmployees = employees.filter(emp => emp.is_active !== false);
-  const totalDepartments = new Set(employees.map(emp => emp.department).filter(Boolean)).size;
+  const activeEmployees = stats?.headcount.total ?? 0;
+  const totalDepartments = stats?.headcount.departments ?? 0;
 
   return (
     <div className="min-h-screen bg-dayflow-dark flex text-white">
@@ -455,7 +460,7 @@ export default function AdminDashboard() {
         <div className="grid grid-cols-1 md:grid-cols-4 gap-6 mb-10">
           <div className="bg-dayflow-card p-6 rounded-2xl border border-white/10">
             <h3 className="text-gray-400 text-sm font-medium">Total Employees</h3>
-            <p className="text-3xl font-bold mt-2">{activeEmployees.length}</p>
+            <p className="text-3xl font-bold mt-2">{activeEmployees}</p>
             <p className="text-xs text-gray-500 mt-1">Active accounts</p>
           </div>
 
@@ -476,10 +481,40 @@ export default function AdminDashboard() {
           </button>
         </div>
 
+        <div className="grid grid-cols-1 md:grid-cols-4 gap-6 mb-10">
+          <div className="bg-dayflow-card p-6 rounded-2xl border border-white/10">
+            <h3 className="text-gray-400 text-sm font-medium">Present Today</h3>
+            <p className="text-3xl font-bold mt-2">{stats?.attendance_today.present ?? 0}</p>
+            <p className="text-xs text-gray-500 mt-1">
+              {stats?.attendance_today.not_recorded ?? 0} not checked in yet
+            </p>
+          </div>
+
+          <div className="bg-dayflow-card p-6 rounded-2xl border border-white/10">
+            <h3 className="text-gray-400 text-sm font-medium">Absent / On Leave</h3>
+            <p className="text-3xl font-bold mt-2">
+              {stats?.attendance_today.absent ?? 0} / {stats?.attendance_today.on_leave ?? 0}
+            </p>
+            <p className="text-xs text-gray-500 mt-1">Today</p>
+          </div>
+
+          <div className="bg-dayflow-card p-6 rounded-2xl border border-white/10">
+            <h3 className="text-gray-400 text-sm font-medium">Pending Leaves</h3>
+            <p className="text-3xl font-bold mt-2">{stats?.pending_leaves ?? 0}</p>
+            <p className="text-xs text-gray-500 mt-1">Awaiting review</p>
+          </div>
+
+          <div className="bg-dayflow-card p-6 rounded-2xl border border-white/10">
+            <h3 className="text-gray-400 text-sm font-medium">Payroll This Month</h3>
+            <p className="text-3xl font-bold mt-2">₹{Number(stats?.payroll.net_salary ?? 0).toLocaleString('en-IN')}</p>
+            <p className="text-xs text-gray-500 mt-1">{stats?.payroll.employees ?? 0} payslips</p>
+          </div>
+        </div>
+
         <div className="mb-4 flex justify-between items-center">
           <h2 className="text-xl font-bold">Employee Directory</h2>
           <p className="text-sm text-gray-400">
-            {activeEmployees.length} {activeEmployees.length === 1 ? 'employee' : 'employees'}
+            {activeEmployees} {activeEmployees === 1 ? 'employee' : 'employees'}
           </p>
         </div>
 
@@ -585,7 +620,7 @@ export default function AdminDashboard() {
       <AddEmployeeModal 
         isOpen={isModalOpen} 
         onClose={() => setIsModalOpen(false)} 
-        onRefresh={fetchEmployees} 
+        onRefresh={refreshDashboard} 
       />
     </div>
   );
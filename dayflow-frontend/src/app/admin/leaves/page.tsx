@@ -43,17 +43,7 @@ export default function AdminLeavesPage() {
   const fetchLeaves = async () => {
     try {
       setLoading(true);
-      const response = await leaveService.getLeaves({ ordering: '-start_date' });
-      
-      console.log('Admin leaves response:', response); // Debug log
-      
-      // Handle both array and paginated response
-      let leaveList = [];
-      if (Array.isArray(response)) {
-        leaveList = response;
-      } else if (response.results && Array.isArray(response.results)) {
-        leaveList = response.results;
-      }
+      const leaveList = await leaveService.getAllLeaves({ ordering: '-start_date' });
       
       setLeaves(leaveList);
     } catch (err) {
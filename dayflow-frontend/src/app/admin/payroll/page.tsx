@@ -46,17 +46,7 @@ export default function AdminPayrollPage() {
   const fetchPayrolls = async () => {
     try {
       setLoading(true);
-      const response = await payrollService.getPayrolls({ ordering: '-month' });
-      
-      console.log('Payrolls response:', response); // Debug log
-      
-      // Handle both array and paginated response
-      let payrollList = [];
-      if (Array.isArray(response)) {
-        payrollList = response;
-      } else if (response.results && Array.isArray(response.results)) {
-        payrollList = response.results;
-      }
+      const payrollList = await payrollService.getAllPayrolls({ ordering: '-month' });
       
       setPayrolls(payrollList);
     } catch (err) {
@@ -69,17 +59,7 @@ export default function AdminPayrollPage() {
 
   const fetchEmployees = async () => {
     try {
-      const response = await userService.getEmployees();
-      
-      console.log('Employees response:', response); // Debug log
-      
-      // Handle both array and paginated response
-      let employeeList = [];
-      if (Array.isArray(response)) {
-        employeeList = response;
-      } else if (response.results && Array.isArray(response.results)) {
-        employeeList = response.results;
-      }
+      const employeeList = await userService.getAllEmployees();
       
       setEmployees(employeeList);
     } catch (err) {
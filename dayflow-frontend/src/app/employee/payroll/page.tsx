@@ -42,17 +42,7 @@ export default function EmployeePayrollPage() {
   const fetchPayrolls = async () => {
     try {
       setLoading(true);
-      const response = await payrollService.getPayrolls({ ordering: '-month' });
-      
-      console.log('Employee payrolls response:', response); // Debug log
-      
-      // Handle both array and paginated response
-      let payrollList = [];
-      if (Array.isArray(response)) {
-        payrollList = response;
-      } else if (response.results && Array.isArray(response.results)) {
-        payrollList = response.results;
-      }
+      const payrollList = await payrollService.getAllPayrolls({ ordering: '-month' });
       
       setPayrolls(payrollList);
       
@@ -19,12 +19,12 @@ export function AttendanceCalendar() {
       const month = currentDate.getMonth() + 1;
       const year = currentDate.getFullYear();
       
-      const response = await attendanceService.getAttendance({
+      const records = await attendanceService.getAllAttendance({
         ordering: '-date'
       });
       
       // Filter for current month
-      const monthlyData = (response.results || []).filter((record: Attendance) => {
+      const monthlyData = records.filter((record: Attendance) => {
         const recordDate = new Date(record.date);
         return recordDate.getMonth() === currentDate.getMonth() && 
                recordDate.getFullYear() === currentDate.getFullYear();
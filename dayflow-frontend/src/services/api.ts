@@ -91,4 +91,20 @@ apiService.interceptors.response.use(
 
     return Promise.reject(error.message || "An error occurred");
   }
-);
\ No newline at end of file
+);
+
+// Fetch every page of a paginated list endpoint by following `next` until
+// it is empty; the cursor links carry the filters and page size along
+export async function getAllPages<T>(url: string, params?: Record<string, unknown>): Promise<T[]> {
+  const results: T[] = [];
+  let next: string | null = url;
+  let query: Record<string, unknown> | undefined = { page_size: 200, ...params };
+
+  while (next) {
+    const response = await apiService.get<{ next: string | null; results: T[] }>(next, { params: query });
+    results.push(...response.data.results);
+    next = response.data.next;
+    query = undefined;
+  }
+  return results;
+}
@@ -1,4 +1,4 @@
-import { apiService } from './api';
+import { apiService, getAllPages } from './api';
 
 export interface Attendance {
   id: number;
@@ -20,6 +20,9 @@ export interface AttendanceSummary {
   present: number;
   absent: number;
   half_day: number;
+  on_leave: number;
+  work_hours: number;
+  extra_hours: number;
 }
 
 export interface CheckInResponse {
@@ -73,6 +76,16 @@ export const attendanceService = {
     }
   },
 
+  // Get every attendance record matching the filters, across all pages
+  async getAllAttendance(params?: {
+    date?: string;
+    status?: string;
+    employee?: number;
+    ordering?: string;
+  }): Promise<Attendance[]> {
+    return getAllPages<Attendance>('/attendance/', params);
+  },
+
   // Get monthly summary
   async getMonthlySummary(month?: number, year?: number, employeeId?: number): Promise<AttendanceSummary> {
     try {
@@ -14,6 +14,7 @@ export interface User {
   address?: string;
   location?: string;
   profile_picture?: string;
+  profile_thumbnails?: Record<string, string> | null;
   resume?: string;
   joining_date?: string;
   paid_leave_balance?: number;
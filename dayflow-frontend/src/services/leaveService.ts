@@ -1,4 +1,4 @@
-import { apiService } from './api';
+import { apiService, getAllPages } from './api';
 
 export interface LeaveRequest {
   id: number;
@@ -23,6 +23,38 @@ export interface CreateLeaveRequest {
   attachment?: File;
 }
 
+export interface LeaveReviewResult {
+  id: number;
+  status: 'approved' | 'rejected' | 'error';
+  error?: string;
+}
+
+export interface LeaveReviewResponse {
+  received: number;
+  summary: Record<string, number>;
+  results: LeaveReviewResult[];
+}
+
+export interface TeamAbsence {
+  employee: number;
+  employee_id: string | null;
+  username: string;
+  first_name: string;
+  last_name: string;
+  department: string | null;
+  start_date: string;
+  end_date: string;
+  leave_type: 'PAID' | 'SICK' | 'UNPAID' | null;
+  status: 'PENDING' | 'APPROVED' | 'ON_LEAVE';
+  source: 'LEAVE' | 'ATTENDANCE';
+}
+
+export interface TeamCalendar {
+  start: string;
+  end: string;
+  absences: TeamAbsence[];
+}
+
 export const leaveService = {
   // Get all leave requests
   async getLeaves(params?: {
@@ -38,6 +70,15 @@ export const leaveService = {
     }
   },
 
+  // Get every leave request matching the filters, across all pages
+  async getAllLeaves(params?: {
+    status?: string;
+    leave_type?: string;
+    ordering?: string;
+  }): Promise<LeaveRequest[]> {
+    return getAllPages<LeaveRequest>('/leaves/', params);
+  },
+
   // Get single leave request
   async getLeave(id: number): Promise<LeaveRequest> {
     try {
@@ -120,6 +161,37 @@ export const leaveService = {
     }
   },
 
+  // Approve or reject many pending leaves at once (admin only)
+  async reviewLeaves(
+    ids: number[],
+    decision: 'APPROVED' | 'REJECTED',
+    comment?: string
+  ): Promise<LeaveReviewResponse> {
+    try {
+      const response = await apiService.post<LeaveReviewResponse>(
+        '/leaves/review/',
+        { ids, decision, comment: comment || '' }
+      );
+      return response.data;
+    } catch (error) {
+      throw error;
+    }
+  },
+
+  // Who is out in the user's team between start and end (default: this week)
+  async getTeamCalendar(params?: {
+    start?: string;
+    end?: string;
+    manager?: number;
+  }): Promise<TeamCalendar> {
+    try {
+      const response = await apiService.get<TeamCalendar>('/leaves/team_calendar/', { params });
+      return response.data;
+    } catch (error) {
+      throw error;
+    }
+  },
+
   // Delete leave request
   async deleteLeave(id: number): Promise<void> {
     try {
@@ -1,4 +1,4 @@
-import { apiService } from './api';
+import { apiService, getAllPages } from './api';
 
 export interface Payroll {
   id: number;
@@ -13,6 +13,8 @@ export interface Payroll {
   gross_salary: number;
   pf: string;
   professional_tax: string;
+  unpaid_days: string;
+  loss_of_pay: string;
   total_deductions: number;
   net_salary: string;
 }
@@ -43,6 +45,15 @@ export const payrollService = {
     }
   },
 
+  // Get every payroll record matching the filters, across all pages
+  async getAllPayrolls(params?: {
+    employee?: number;
+    month?: string;
+    ordering?: string;
+  }): Promise<Payroll[]> {
+    return getAllPages<Payroll>('/payroll/', params);
+  },
+
   // Get single payroll record
   async getPayroll(id: number): Promise<Payroll> {
     try {
@@ -1,4 +1,4 @@
-import { apiService } from './api';
+import { apiService, getAllPages } from './api';
 import { User } from './authService';
 
 interface PaginatedResponse<T> {
@@ -25,6 +25,57 @@ export interface CreateUserData {
   joining_date?: string;
 }
 
+export interface UserMatch {
+  id: number;
+  name: string;
+  employee_id: string | null;
+}
+
+export interface DashboardStats {
+  date: string;
+  headcount: {
+    total: number;
+    departments: number;
+    by_department: Record<string, number>;
+    by_role: Record<string, number>;
+  };
+  attendance_today: {
+    present: number;
+    absent: number;
+    half_day: number;
+    on_leave: number;
+    not_recorded: number;
+  };
+  pending_leaves: number;
+  payroll: {
+    month: string;
+    employees: number;
+    basic_salary: string;
+    hra: string;
+    standard_allowance: string;
+    other_allowances: string;
+    pf: string;
+    professional_tax: string;
+    loss_of_pay: string;
+    net_salary: string;
+  };
+}
+
+export interface EmployeeImportResult {
+  index: number;
+  status: 'created' | 'valid' | 'error';
+  id?: number;
+  username?: string;
+  errors?: Record<string, string[]>;
+}
+
+export interface EmployeeImportResponse {
+  received: number;
+  dry_run: boolean;
+  summary: Partial<Record<EmployeeImportResult['status'], number>>;
+  results: EmployeeImportResult[];
+}
+
 export const userService = {
   // Get all employees with optional filters
   async getEmployees(params?: {
@@ -44,6 +95,16 @@ export const userService = {
     }
   },
 
+  // Get every employee matching the filters, across all pages
+  async getAllEmployees(params?: {
+    role?: string;
+    department?: string;
+    is_active?: boolean;
+    search?: string;
+  }): Promise<User[]> {
+    return getAllPages<User>('/users/', params);
+  },
+
   // Get single employee by ID
   async getEmployee(id: number): Promise<User> {
     try {
@@ -81,5 +142,45 @@ export const userService = {
     } catch (error) {
       throw error;
     }
+  },
+
+  // Ranked name/ID matches for pickers (Admin only)
+  async typeahead(q: string, limit?: number): Promise<UserMatch[]> {
+    try {
+      const response = await apiService.get<UserMatch[]>('/users/typeahead/', {
+        params: { q, limit }
+      });
+      return response.data;
+    } catch (error) {
+      throw error;
+    }
+  },
+
+  // Create employees from a CSV or JSON file (Admin only)
+  async bulkImport(file: File, dryRun = false): Promise<EmployeeImportResponse> {
+    try {
+      const formData = new FormData();
+      formData.append('file', file);
+
+      const response = await apiService.post<EmployeeImportResponse>('/users/bulk_import/', formData, {
+        params: dryRun ? { dry_run: 1 } : undefined,
+        headers: {
+          'Content-Type': 'multipart/form-data',
+        },
+      });
+      return response.data;
+    } catch (error) {
+      throw error;
+    }
+  },
+
+  // Aggregated admin dashboard figures (Admin only)
+  async getDashboardStats(): Promise<DashboardStats> {
+    try {
+      const response = await apiService.get<DashboardStats>('/users/dashboard_stats/');
+      return response.data;
+    } catch (error) {
+      throw error;
+    }
   }
 };
\ No newline at end of file
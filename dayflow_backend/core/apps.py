@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        # Register the job handlers core.jobs dispatches to
+        from . import leaves, payroll, rollups  # noqa: F401
@@ -0,0 +1,147 @@
+"""
+Async versions of the hot endpoints: check-in, check-out, me and monthly_summary.
+
+Served under ASGI (see dayflow_backend/asgi.py) these do not hold a worker
+thread while waiting on the database, so one process absorbs the morning
+check-in burst. They answer with the same payloads as the DRF actions they
+mirror and are mounted under /core/async/ (see core.urls).
+
+Reads use the async ORM. The check-in and check-out writes need a
+transaction, which the async ORM does not support, so they run the shared
+core.checkins functions through sync_to_async; Django's ASGI handler gives
+each request its own thread for that, so requests still overlap.
+"""
+import logging
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from rest_framework import exceptions, status
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from . import checkins
+from .authentication import AsyncJWTAuthentication
+from .replicas import use_replica
+from .serializers import UserSerializer
+from .views import AttendanceViewSet, check_in_payload, check_out_payload
+
+logger = logging.getLogger(__name__)
+
+
+def api_response(data, status=status.HTTP_200_OK, headers=None):
+    return JsonResponse(data, status=status, headers=headers, encoder=JSONEncoder, safe=False)
+
+
+def _error_response(error, authenticator):
+    """Render a DRF APIException the way DRF's exception handler would"""
+    detail = error.detail if isinstance(error.detail, (list, dict)) else {"detail": error.detail}
+    headers = {}
+    if isinstance(error, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        headers['WWW-Authenticate'] = authenticator.authenticate_header(None)
+    if getattr(error, 'wait', None):
+        headers['Retry-After'] = str(int(error.wait))
+    return api_response(detail, status=error.status_code, headers=headers)
+
+
+async def _check_throttles(request):
+    waits = []
+    for throttle_class in api_settings.DEFAULT_THROTTLE_CLASSES:
+        throttle = throttle_class()
+        if not await sync_to_async(throttle.allow_request)(request, None):
+            waits.append(throttle.wait())
+    if waits:
+        raise exceptions.Throttled(max((wait for wait in waits if wait is not None), default=None))
+
+
+def async_api_view(*methods):
+    """
+    Wrap an async view with JWT authentication, the default throttles and a
+    405 for other methods, as DRF would for the equivalent APIView. The
+    view gets request.user and request.auth set.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return api_response(
+                    {"detail": f'Method "{request.method}" not allowed.'},
+                    status=status.HTTP_405_METHOD_NOT_ALLOWED,
+                    headers={'Allow': ', '.join(methods)},
+                )
+
+            authenticator = AsyncJWTAuthentication()
+            try:
+                authenticated = await authenticator.aauthenticate(request)
+                if authenticated is None:
+                    raise exceptions.NotAuthenticated()
+                request.user, request.auth = authenticated
+                await _check_throttles(request)
+            except exceptions.APIException as error:
+                return _error_response(error, authenticator)
+
+            return await view(request, *args, **kwargs)
+
+        # Bearer-token API, like the DRF views (which skip CSRF without session auth)
+        wrapper.csrf_exempt = True
+        return wrapper
+    return decorator
+
+
+@async_api_view('POST')
+async def check_in(request):
+    """Handle employee check-in"""
+    try:
+        attendance = await sync_to_async(checkins.check_in)(request.user)
+    except checkins.CheckInError as error:
+        return api_response({"error": error.message}, status=error.status)
+
+    logger.info(f"Check-in recorded for {request.user.username} at {attendance.check_in}")
+    return api_response(check_in_payload(attendance), status=status.HTTP_201_CREATED)
+
+
+@async_api_view('POST')
+async def check_out(request):
+    """Handle employee check-out and calculate work hours"""
+    try:
+        attendance = await sync_to_async(checkins.check_out)(request.user)
+    except checkins.CheckInError as error:
+        return api_response({"error": error.message}, status=error.status)
+
+    logger.info(f"Check-out recorded for {request.user.username} at {attendance.check_out}")
+    return api_response(check_out_payload(attendance))
+
+
+@async_api_view('GET')
+async def me(request):
+    """Get current user profile"""
+    return api_response(UserSerializer(request.user, context={'request': request}).data)
+
+
+@async_api_view('GET')
+async def monthly_summary(request):
+    """Get monthly attendance summary, optionally grouped by employee, department or day"""
+    try:
+        month, year, group_by, attendance_records = AttendanceViewSet.summary_query(request.user, request.GET)
+    except ValueError as error:
+        return api_response({"error": str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+    counts = AttendanceViewSet._summary_counts
+    with use_replica():
+        if not group_by:
+            return api_response({
+                "month": month,
+                "year": year,
+                **counts(await attendance_records.asummary())
+            })
+
+        columns, label = AttendanceViewSet.SUMMARY_GROUPINGS[group_by]
+        return api_response({
+            "month": month,
+            "year": year,
+            "group_by": group_by,
+            "results": [
+                {**label(row), **counts(row)}
+                async for row in attendance_records.summary_by(*columns)
+            ]
+        })
@@ -0,0 +1,237 @@
+"""
+JWT authentication backed by a short-lived cache of the user row.
+
+simplejwt's JWTAuthentication loads the User by primary key on every request.
+CachedJWTAuthentication keeps the columns the API reads from request.user
+for a few seconds, so a burst of requests from the same user costs one query
+instead of one per request. Entries are dropped whenever the user is saved
+or deleted (see core.signals).
+
+An invalidation only reaches the cache of the process that made the change,
+so the per-process LRU is only used when there is a single worker process
+(AUTH_USER_CACHE['PROCESSES']). With more, entries live in the shared Django
+cache named by SHARED_CACHE only, or the user cache is off. The cached row
+is for reads: code that writes the user reloads it first.
+
+AsyncJWTAuthentication does the same for the async views in core.async_views
+without blocking the event loop.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User
+
+DEFAULTS = {
+    'TTL': 30,
+    'MAX_ENTRIES': 10000,
+    'SHARED_CACHE': None,
+    'PROCESSES': 1,
+}
+
+# The password hash never leaves the database; a cached user is loaded with
+# it deferred, so save() on request.user only writes the other columns.
+EXCLUDED_FIELDS = {'password'}
+
+
+def cache_settings():
+    return {**DEFAULTS, **getattr(settings, 'AUTH_USER_CACHE', {})}
+
+
+class LocalUserCache:
+    """Thread-safe LRU of user rows with a per-entry expiry"""
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires, row = entry
+            if expires < time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return row
+
+    def set(self, user_id, row, ttl, max_entries):
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + ttl, row)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+local_cache = LocalUserCache()
+
+
+def _shared_cache():
+    alias = cache_settings()['SHARED_CACHE']
+    return caches[alias] if alias else None
+
+
+def _stores():
+    """(local LRU, shared cache) to use, either possibly None"""
+    options = cache_settings()
+    if not options['TTL']:
+        return None, None
+    if options['SHARED_CACHE']:
+        # Other processes' invalidations only reach the shared cache, so keep no local copy
+        return None, _shared_cache()
+    if options['PROCESSES'] > 1:
+        return None, None
+    return local_cache, None
+
+
+def _cache_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def _cached_fields():
+    return [field for field in User._meta.concrete_fields if field.name not in EXCLUDED_FIELDS]
+
+
+def user_to_row(user):
+    return {
+        field.attname: field.get_prep_value(field.value_from_object(user))
+        for field in _cached_fields()
+    }
+
+
+def user_from_row(row):
+    """Build a per-request User instance (password deferred) from a cached row"""
+    fields = [field for field in _cached_fields() if field.attname in row]
+    return User.from_db(
+        DEFAULT_DB_ALIAS,
+        [field.attname for field in fields],
+        [row[field.attname] for field in fields],
+    )
+
+
+def get_cached_user(user_id):
+    local, shared = _stores()
+    if local:
+        row = local.get(str(user_id))
+    elif shared:
+        row = shared.get(_cache_key(user_id))
+    else:
+        return None
+    return user_from_row(row) if row is not None else None
+
+
+def cache_user(user):
+    local, shared = _stores()
+    options = cache_settings()
+    if local:
+        local.set(str(user.pk), user_to_row(user), options['TTL'], options['MAX_ENTRIES'])
+    elif shared:
+        shared.set(_cache_key(user.pk), user_to_row(user), options['TTL'])
+
+
+async def aget_cached_user(user_id):
+    local, shared = _stores()
+    if local:
+        row = local.get(str(user_id))
+    elif shared:
+        row = await shared.aget(_cache_key(user_id))
+    else:
+        return None
+    return user_from_row(row) if row is not None else None
+
+
+async def acache_user(user):
+    local, shared = _stores()
+    options = cache_settings()
+    if local:
+        local.set(str(user.pk), user_to_row(user), options['TTL'], options['MAX_ENTRIES'])
+    elif shared:
+        await shared.aset(_cache_key(user.pk), user_to_row(user), options['TTL'])
+
+
+def invalidate_user(user_id):
+    """Forget a user everywhere; call after updates that bypass Model.save()"""
+    key = str(user_id)
+    local_cache.delete(key)
+    shared = _shared_cache()
+    if shared:
+        shared.delete(_cache_key(key))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that resolves the token's user through the user cache"""
+
+    def get_user(self, validated_token):
+        # Revocation checks compare against the password hash, which is never cached.
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = get_cached_user(user_id)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache_user(user)
+        elif api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        return user
+
+
+class AsyncJWTAuthentication(CachedJWTAuthentication):
+    """CachedJWTAuthentication for plain Django async views (HttpRequest, not a DRF Request)"""
+
+    async def aauthenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return await sync_to_async(super().get_user)(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        user = await aget_cached_user(user_id)
+        if user is None:
+            try:
+                user = await User.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except User.DoesNotExist:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            await acache_user(user)
+
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
@@ -0,0 +1,231 @@
+"""
+Reproducible API benchmarks.
+
+generate_dataset() fills the database with a seeded, synthetic company
+(employees, months of attendance, leave and payroll) using bulk_create.
+run_benchmarks() then drives the real URLconf through the DRF test client
+with JWT-authenticated requests and reports, per endpoint, p50/p99/mean
+latency, SQL queries per request and the process RSS, as a JSON-ready dict.
+
+`manage.py benchmark` runs both against a throwaway test database.
+"""
+import math
+import os
+import random
+import resource
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import time as dt_time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework.throttling import SimpleRateThrottle
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Attendance, AttendanceStatus, LeaveRequest, LeaveStatus, LeaveType, Payroll, User
+from .rollups import rebuild_rollups
+
+PASSWORD = 'bench-pass-123'
+DEPARTMENTS = ['Engineering', 'Sales', 'Operations', 'Finance', 'Support', 'People']
+STATUS_WEIGHTS = [
+    (AttendanceStatus.PRESENT, 85), (AttendanceStatus.ABSENT, 5),
+    (AttendanceStatus.HALF_DAY, 5), (AttendanceStatus.ON_LEAVE, 5),
+]
+
+
+def _month_starts(today, months):
+    first = today.replace(day=1)
+    starts = []
+    for _ in range(months):
+        first = (first - timedelta(days=1)).replace(day=1)
+        starts.append(first)
+    return sorted(starts)
+
+
+def generate_dataset(employees=200, months=3, seed=0, today=None, batch_size=2000):
+    """
+    Create an admin plus `employees` employees with `months` full months of
+    history before the current one. Returns {'admin', 'employees', 'pending_leaves'}.
+    """
+    rng = random.Random(seed)
+    today = today or timezone.localdate()
+    password = make_password(PASSWORD)
+    month_starts = _month_starts(today, months)
+    history_start, history_end = month_starts[0], today - timedelta(days=1)
+
+    User.objects.bulk_create([User(
+        username='bench-admin', email='bench-admin@dayflow.test', role='ADMIN',
+        is_staff=True, password=password,
+    )] + [
+        User(
+            username=f'bench-{i:05}', email=f'bench-{i:05}@dayflow.test', password=password,
+            employee_id=f'B{i:05}', first_name='Bench', last_name=str(i),
+            department=DEPARTMENTS[i % len(DEPARTMENTS)], joining_date=history_start,
+        )
+        for i in range(employees)
+    ], batch_size=batch_size)
+    admin = User.objects.get(username='bench-admin')
+    staff = list(User.objects.filter(username__startswith='bench-0').order_by('username'))
+
+    statuses, weights = zip(*STATUS_WEIGHTS)
+    attendance, leaves, payrolls = [], [], []
+    for employee in staff:
+        day = history_start
+        while day <= history_end:
+            if day.weekday() < 5:
+                row = Attendance(employee=employee, date=day, status=rng.choices(statuses, weights)[0])
+                if row.status in (AttendanceStatus.PRESENT, AttendanceStatus.HALF_DAY):
+                    row.check_in = dt_time(8 + rng.randint(0, 1), rng.randint(0, 59))
+                    row.record_check_out(dt_time(16 + rng.randint(0, 3), rng.randint(0, 59)))
+                attendance.append(row)
+            day += timedelta(days=1)
+
+        for month in month_starts:
+            start = month + timedelta(days=rng.randint(0, 20))
+            leaves.append(LeaveRequest(
+                employee=employee, leave_type=rng.choice(LeaveType.values),
+                start_date=start, end_date=start + timedelta(days=rng.randint(0, 2)),
+                status=rng.choice([LeaveStatus.APPROVED, LeaveStatus.REJECTED]),
+                reason='Generated benchmark leave request',
+            ))
+            basic = Decimal(rng.randrange(25_000, 90_000, 500))
+            payroll = Payroll(
+                employee=employee, month=month, basic_salary=basic, hra=basic * Decimal('0.4'),
+                standard_allowance=Decimal('2000'), pf=basic * Decimal('0.12'), professional_tax=Decimal('200'),
+            )
+            payroll.net_salary = payroll.compute_net_salary()
+            payrolls.append(payroll)
+
+        # One pending request per employee, for the approve benchmark
+        start = today + timedelta(days=30 + rng.randint(0, 30))
+        leaves.append(LeaveRequest(
+            employee=employee, leave_type=LeaveType.UNPAID, start_date=start, end_date=start,
+            status=LeaveStatus.PENDING, reason='Generated benchmark leave request',
+        ))
+
+    Attendance.objects.bulk_create(attendance, batch_size=batch_size)
+    LeaveRequest.objects.bulk_create(leaves, batch_size=batch_size)
+    Payroll.objects.bulk_create(payrolls, batch_size=batch_size)
+    rebuild_rollups(history_start, history_end)
+
+    return {
+        'admin': admin,
+        'employees': staff,
+        'pending_leaves': list(
+            LeaveRequest.objects.filter(status=LeaveStatus.PENDING).order_by('id').values_list('id', flat=True)
+        ),
+    }
+
+
+def rss_mb():
+    """Current resident set size (Linux), else the peak reported by getrusage"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+@contextmanager
+def throttling_disabled():
+    """Rate limits would otherwise turn most benchmark requests into 429s"""
+    allow_request = SimpleRateThrottle.allow_request
+    SimpleRateThrottle.allow_request = lambda self, request, view: True
+    try:
+        yield
+    finally:
+        SimpleRateThrottle.allow_request = allow_request
+
+
+class Benchmark:
+    def __init__(self, dataset, iterations=50, warmup=3):
+        self.dataset = dataset
+        self.iterations = min(iterations, len(dataset['employees']))
+        self.warmup = warmup
+        self.client = APIClient()
+        self.tokens = {}
+
+    def authenticate(self, user):
+        if user is None:
+            self.client.credentials()
+            return
+        if user.pk not in self.tokens:
+            self.tokens[user.pk] = str(RefreshToken.for_user(user).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.tokens[user.pk]}')
+
+    def endpoints(self):
+        """(name, user for request i, request i, idempotent)"""
+        admin, employees = self.dataset['admin'], self.dataset['employees']
+        pending = self.dataset['pending_leaves']
+        month = timezone.localdate().replace(day=1) - timedelta(days=1)
+        summary = f'/core/attendance/monthly_summary/?month={month.month}&year={month.year}'
+        client = self.client
+        return [
+            ('login', lambda i: None, lambda i: client.post(
+                '/core/auth/login/', {'username': employees[i].username, 'password': PASSWORD}, format='json'
+            ), True),
+            ('check_in', lambda i: employees[i], lambda i: client.post('/core/attendance/check_in/'), False),
+            ('check_out', lambda i: employees[i], lambda i: client.post('/core/attendance/check_out/'), False),
+            ('monthly_summary', lambda i: employees[i], lambda i: client.get(summary), True),
+            ('monthly_summary_company', lambda i: admin, lambda i: client.get(summary), True),
+            ('monthly_summary_by_employee', lambda i: admin, lambda i: client.get(f'{summary}&group_by=employee'), True),
+            ('users_list', lambda i: admin, lambda i: client.get('/core/users/'), True),
+            ('attendance_list', lambda i: admin, lambda i: client.get('/core/attendance/'), True),
+            ('attendance_list_own', lambda i: employees[i], lambda i: client.get('/core/attendance/'), True),
+            ('leaves_list', lambda i: admin, lambda i: client.get('/core/leaves/'), True),
+            ('payroll_list', lambda i: admin, lambda i: client.get('/core/payroll/'), True),
+            ('leave_approve', lambda i: admin, lambda i: client.post(
+                f'/core/leaves/{pending[i]}/approve/', {'comment': 'ok'}, format='json'
+            ), False),
+        ]
+
+    def measure(self, user_for, send, idempotent):
+        if idempotent:
+            for i in range(min(self.warmup, self.iterations)):
+                self.authenticate(user_for(i))
+                send(i)
+
+        latencies, queries, statuses = [], [], Counter()
+        for i in range(self.iterations):
+            self.authenticate(user_for(i))
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = send(i)
+                latencies.append((time.perf_counter() - start) * 1000)
+            queries.append(len(captured))
+            statuses[str(response.status_code)] += 1
+
+        return {
+            'requests': len(latencies),
+            'status': dict(statuses),
+            'p50_ms': round(percentile(latencies, 0.50), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+            'mean_ms': round(sum(latencies) / len(latencies), 3),
+            'queries_mean': round(sum(queries) / len(queries), 2),
+            'queries_max': max(queries),
+            'rss_mb': round(rss_mb(), 1),
+        }
+
+    def run(self, only=None):
+        results = {}
+        with throttling_disabled():
+            for name, user_for, send, idempotent in self.endpoints():
+                if only and name not in only:
+                    continue
+                results[name] = self.measure(user_for, send, idempotent)
+        return results
+
+
+def run_benchmarks(dataset, iterations=50, warmup=3, only=None):
+    return Benchmark(dataset, iterations, warmup).run(only)
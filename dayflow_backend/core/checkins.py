@@ -0,0 +1,65 @@
+"""
+Check-in and check-out, shared by the DRF actions and the async views.
+
+Both are short transactions; the async views run them through
+sync_to_async because the async ORM has no transaction support.
+"""
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Attendance, AttendanceStatus
+
+
+class CheckInError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def check_in(employee, moment=None):
+    """Create today's attendance row for employee; raises CheckInError on a second check-in"""
+    moment = moment or timezone.now()
+    # The (employee, date) unique constraint rejects double check-ins, so
+    # no pre-check query is needed and concurrent requests cannot race.
+    try:
+        with transaction.atomic():
+            return Attendance.objects.create(
+                employee=employee,
+                date=moment.date(),
+                check_in=moment.time(),
+                status=AttendanceStatus.PRESENT
+            )
+    except IntegrityError:
+        pass
+
+    # The row exists; close_day() may have recorded an absence before the employee arrived
+    with transaction.atomic():
+        attendance = Attendance.objects.select_for_update().filter(employee=employee, date=moment.date()).first()
+        if attendance is None or attendance.check_in is not None:
+            raise CheckInError("Already checked in today")
+        if attendance.status != AttendanceStatus.ABSENT:
+            raise CheckInError("Today is already recorded as leave")
+        attendance.check_in = moment.time()
+        attendance.status = AttendanceStatus.PRESENT
+        attendance.save(update_fields=['check_in', 'status'])
+    return attendance
+
+
+def check_out(employee, moment=None):
+    """Close today's attendance row for employee and compute its hours"""
+    moment = moment or timezone.now()
+    with transaction.atomic():
+        try:
+            attendance = Attendance.objects.select_for_update().get(employee=employee, date=moment.date())
+        except Attendance.DoesNotExist:
+            raise CheckInError("No check-in record found for today", status=404)
+        if attendance.check_in is None:
+            # An absence or leave recorded by close_day()
+            raise CheckInError("No check-in record found for today", status=404)
+        if attendance.check_out:
+            raise CheckInError("Already checked out today")
+
+        attendance.record_check_out(moment.time())
+        attendance.save(update_fields=['check_out', 'work_hours', 'extra_hours'])
+    return attendance
@@ -0,0 +1,90 @@
+"""
+End-of-day attendance closing.
+
+Only employees who check in get an Attendance row, and a forgotten
+check-out leaves the row open. close_day() settles a day in bulk:
+
+- every active employee without a row gets one, ON_LEAVE when an approved
+  leave request covers the day and ABSENT otherwise (working days only);
+- rows with a check-in but no check-out are closed at the policy time.
+
+Everything is a handful of set-based queries regardless of head count, and
+because missing rows are inserted with ignore_conflicts and only open rows
+are closed, running it twice for the same day changes nothing.
+"""
+from datetime import datetime, time
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Attendance, AttendanceStatus, LeaveRequest, LeaveStatus, User
+from .rollups import rebuild_rollups
+
+DEFAULT_POLICY = {
+    'CHECK_OUT_TIME': '18:00',
+    # Monday=0 ... Sunday=6; absences are only recorded on these days
+    'WORKING_DAYS': [0, 1, 2, 3, 4],
+}
+
+
+def attendance_policy():
+    return {**DEFAULT_POLICY, **getattr(settings, 'ATTENDANCE_POLICY', {})}
+
+
+def close_day(day, policy=None, batch_size=2000):
+    """Record absences and close open rows for day; returns counts per action"""
+    policy = {**attendance_policy(), **(policy or {})}
+    check_out = policy['CHECK_OUT_TIME']
+    if not isinstance(check_out, time):
+        check_out = datetime.strptime(check_out, '%H:%M').time()
+
+    with transaction.atomic():
+        missing = []
+        if day.weekday() in policy['WORKING_DAYS']:
+            on_leave = set(
+                LeaveRequest.objects.filter(status=LeaveStatus.APPROVED)
+                .overlapping(day, day).values_list('employee_id', flat=True)
+            )
+            employee_ids = (
+                User.objects.filter(is_active=True)
+                .exclude(joining_date__gt=day)
+                .exclude(attendance__date=day)
+                .values_list('id', flat=True)
+            )
+            missing = [
+                Attendance(
+                    employee_id=employee_id, date=day,
+                    status=AttendanceStatus.ON_LEAVE if employee_id in on_leave else AttendanceStatus.ABSENT,
+                )
+                for employee_id in employee_ids
+            ]
+            # A check-in racing with the job wins; its row is simply skipped here
+            Attendance.objects.bulk_create(missing, batch_size=batch_size, ignore_conflicts=True)
+            # ignore_conflicts reports nothing back, so keep only the rows that
+            # were written: the skipped ones are check-ins and have a check_in
+            inserted = set(
+                Attendance.objects.filter(date=day, check_in__isnull=True).values_list('employee_id', flat=True)
+            )
+            missing = [attendance for attendance in missing if attendance.employee_id in inserted]
+
+        open_rows = list(
+            Attendance.objects.select_for_update()
+            .filter(date=day, check_in__isnull=False, check_out__isnull=True)
+            .only('id', 'employee_id', 'date', 'check_in', 'check_out', 'work_hours', 'extra_hours')
+        )
+        for attendance in open_rows:
+            attendance.record_check_out(max(check_out, attendance.check_in))
+        Attendance.objects.bulk_update(
+            open_rows, ['check_out', 'work_hours', 'extra_hours'], batch_size=batch_size
+        )
+
+        touched = {attendance.employee_id for attendance in missing + open_rows}
+        if touched:
+            # bulk writes bypass the rollup signals
+            rebuild_rollups(day, day, employee_ids=touched)
+
+    return {
+        "absent": sum(attendance.status == AttendanceStatus.ABSENT for attendance in missing),
+        "on_leave": sum(attendance.status == AttendanceStatus.ON_LEAVE for attendance in missing),
+        "closed": len(open_rows),
+    }
@@ -0,0 +1,80 @@
+"""
+Admin dashboard figures.
+
+dashboard_stats() answers with four grouped queries whatever the head
+count: active users per (department, role), today's attendance (read from
+that day's Attendance rows, since department-day rollups trail check-ins by
+a job), the pending leave count and the current month's payroll totals. cached_dashboard_stats() keeps the result for
+RESPONSE_CACHE['DASHBOARD_TTL'] seconds, so a dashboard left open and
+refreshing costs nothing.
+"""
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import Attendance, LeaveRequest, LeaveStatus, Payroll, User, month_bounds
+from .payroll import AMOUNT_FIELDS
+from .replicas import use_replica
+from .response_cache import response_cache_settings
+
+PAYROLL_TOTAL_FIELDS = AMOUNT_FIELDS + ['loss_of_pay', 'net_salary']
+CENTS = Decimal('0.01')
+
+
+def _headcount():
+    by_department, by_role, total = {}, {}, 0
+    rows = (
+        User.objects.filter(is_active=True)
+        .values('department', 'role').annotate(count=Count('id')).order_by()
+    )
+    for row in rows:
+        department = row['department'] or ''
+        by_department[department] = by_department.get(department, 0) + row['count']
+        by_role[row['role']] = by_role.get(row['role'], 0) + row['count']
+        total += row['count']
+    return {
+        "total": total,
+        "departments": len([department for department in by_department if department]),
+        "by_department": dict(sorted(by_department.items())),
+        "by_role": dict(sorted(by_role.items())),
+    }
+
+
+def dashboard_stats(today=None):
+    today = today or timezone.localdate()
+    with use_replica():
+        headcount = _headcount()
+        attendance = Attendance.objects.filter(date=today, employee__isnull=False).summary()
+        pending_leaves = LeaveRequest.objects.filter(status=LeaveStatus.PENDING).count()
+        start, end = month_bounds(today.year, today.month)
+        payroll = Payroll.objects.filter(month__gte=start, month__lt=end).aggregate(
+            employees=Count('id'), **{field: Sum(field) for field in PAYROLL_TOTAL_FIELDS}
+        )
+
+    return {
+        "date": today,
+        "headcount": headcount,
+        "attendance_today": {
+            "present": attendance['present'],
+            "absent": attendance['absent'],
+            "half_day": attendance['half_day'],
+            "on_leave": attendance['on_leave'],
+            "not_recorded": max(headcount['total'] - attendance['total_days'], 0),
+        },
+        "pending_leaves": pending_leaves,
+        "payroll": {
+            "month": start,
+            "employees": payroll.pop('employees'),
+            **{field: str(Decimal(value or 0).quantize(CENTS)) for field, value in payroll.items()},
+        },
+    }
+
+
+def cached_dashboard_stats():
+    ttl = response_cache_settings()['DASHBOARD_TTL']
+    if not ttl:
+        return dashboard_stats()
+    today = timezone.localdate()
+    return cache.get_or_set(f'dashboard-stats:{today}', lambda: dashboard_stats(today), ttl)
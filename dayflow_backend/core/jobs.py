@@ -0,0 +1,157 @@
+"""
+Transactional outbox and background jobs.
+
+enqueue() writes a Job row in the caller's transaction, so a job exists if
+and only if the change that asked for it committed; no broker is involved.
+`manage.py run_jobs` claims due jobs in batches (FOR UPDATE SKIP LOCKED on
+PostgreSQL, so any number of workers can poll the same table), runs the
+handler registered under each job's name in its own transaction and retries
+failures with exponential backoff up to max_attempts.
+
+A claim is a lease of JOBS['LEASE_SECONDS'], renewed as each job of the
+batch starts: the jobs of a worker that dies are claimed again once it runs
+out, so handlers must be idempotent. A claim is identified by the job's
+attempt count, and every state change checks it, so a worker that lost its
+lease can no longer finish, retry or fail a job another worker has claimed;
+its handler's writes are rolled back.
+
+Handlers are registered with @job('name') next to the code they serve
+(core.leaves, core.payroll, core.rollups) and called with the payload as
+keyword arguments.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'BATCH_SIZE': 20,
+    'LEASE_SECONDS': 300,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BASE_SECONDS': 10,
+    'RETRY_MAX_SECONDS': 3600,
+    'KEEP_FINISHED_DAYS': 7,
+    'DEFER_ROLLUP_REBUILDS': False,
+}
+
+HANDLERS = {}
+
+
+class LeaseLost(Exception):
+    """The job was claimed again by another worker"""
+
+
+def jobs_settings():
+    return {**DEFAULTS, **getattr(settings, 'JOBS', {})}
+
+
+def job(name):
+    """Register the decorated function as the handler of jobs called `name`"""
+    def decorator(handler):
+        HANDLERS[name] = handler
+        return handler
+    return decorator
+
+
+def enqueue(name, payload=None, delay=None, max_attempts=None):
+    """Add a job to the outbox, in the current transaction if there is one"""
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        run_after=timezone.now() + (delay or timedelta(0)),
+        max_attempts=max_attempts or jobs_settings()['MAX_ATTEMPTS'],
+    )
+
+
+def due_jobs(now):
+    return Job.objects.filter(
+        Q(status=JobStatus.PENDING, run_after__lte=now)
+        | Q(status=JobStatus.RUNNING, locked_until__lt=now)
+    )
+
+
+def claim_jobs(batch_size, now=None):
+    """Lease up to batch_size due jobs, oldest first, skipping rows another worker holds"""
+    now = now or timezone.now()
+    with transaction.atomic():
+        ids = list(
+            due_jobs(now).select_for_update(skip_locked=True)
+            .order_by('run_after', 'id').values_list('id', flat=True)[:batch_size]
+        )
+        Job.objects.filter(pk__in=ids).update(
+            status=JobStatus.RUNNING,
+            locked_until=now + timedelta(seconds=jobs_settings()['LEASE_SECONDS']),
+            attempts=F('attempts') + 1,
+        )
+    return list(Job.objects.filter(pk__in=ids).order_by('run_after', 'id'))
+
+
+def retry_delay(attempts):
+    config = jobs_settings()
+    return timedelta(seconds=min(config['RETRY_BASE_SECONDS'] * 2 ** (attempts - 1), config['RETRY_MAX_SECONDS']))
+
+
+def _claimed(job):
+    """The job's row, as long as this worker's claim on it still holds"""
+    return Job.objects.filter(pk=job.pk, status=JobStatus.RUNNING, attempts=job.attempts)
+
+
+def run_job(job):
+    """Run one claimed job; returns 'done', 'retried', 'failed' or 'lost'"""
+    lease = timedelta(seconds=jobs_settings()['LEASE_SECONDS'])
+    if not _claimed(job).update(locked_until=timezone.now() + lease):
+        return 'lost'
+    try:
+        handler = HANDLERS.get(job.name)
+        if handler is None:
+            raise LookupError(f"No handler registered for {job.name!r}")
+        with transaction.atomic():
+            handler(**job.payload)
+            # Finished in the handler's transaction: its writes and the DONE mark commit together
+            if not _claimed(job).update(
+                status=JobStatus.DONE, locked_until=None, finished_at=timezone.now(), last_error=''
+            ):
+                raise LeaseLost
+        return 'done'
+    except LeaseLost:
+        logger.warning(f"Job {job.name} #{job.pk} was claimed again before it finished; discarded")
+        return 'lost'
+    except Exception as error:
+        now = timezone.now()
+        if job.attempts >= job.max_attempts:
+            if not _claimed(job).update(
+                status=JobStatus.FAILED, locked_until=None, finished_at=now, last_error=repr(error)
+            ):
+                return 'lost'
+            logger.error(f"Job {job.name} #{job.pk} failed after {job.attempts} attempt(s): {error!r}")
+            return 'failed'
+        if not _claimed(job).update(
+            status=JobStatus.PENDING, locked_until=None,
+            run_after=now + retry_delay(job.attempts), last_error=repr(error)
+        ):
+            return 'lost'
+        logger.warning(f"Job {job.name} #{job.pk} attempt {job.attempts} failed, will retry: {error!r}")
+        return 'retried'
+
+
+def run_batch(batch_size=None):
+    """Claim and run one batch; returns counts by outcome"""
+    counts = {}
+    for claimed in claim_jobs(batch_size or jobs_settings()['BATCH_SIZE']):
+        outcome = run_job(claimed)
+        counts[outcome] = counts.get(outcome, 0) + 1
+    return counts
+
+
+def purge_finished_jobs(now=None):
+    """Delete DONE jobs older than KEEP_FINISHED_DAYS; FAILED ones are kept for inspection"""
+    cutoff = (now or timezone.now()) - timedelta(days=jobs_settings()['KEEP_FINISHED_DAYS'])
+    deleted, _ = Job.objects.filter(status=JobStatus.DONE, finished_at__lt=cutoff).delete()
+    return deleted
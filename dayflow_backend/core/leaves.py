@@ -0,0 +1,295 @@
+"""
+Leave balance bookkeeping.
+
+Balances are kept as running totals on User for O(1) reads and every change
+is also written to LeaveLedgerEntry. Totals are only ever changed with a
+single F()-based UPDATE, never a read-modify-write save() of the user row, so
+concurrent approvals cannot lose each other's deductions.
+
+New requests and decisions enqueue a job (core.jobs) in the same
+transaction; the notices are sent by the worker, off the request path.
+"""
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, CharField, F, IntegerField, Value, When
+from django.db.models.functions import Coalesce, Least
+
+from .authentication import invalidate_user
+from .jobs import enqueue, job
+from .models import (
+    Attendance, AttendanceStatus, LeaveLedgerEntry, LeaveRequest, LeaveStatus, LeaveType, LedgerReason, User,
+)
+
+BALANCE_FIELDS = {
+    LeaveType.PAID: 'paid_leave_balance',
+    LeaveType.SICK: 'sick_leave_balance',
+}
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLICY = {
+    'PAID_ANNUAL': 24,
+    'SICK_ANNUAL': 7,
+    'PAID_CARRY_FORWARD_CAP': 12,
+}
+
+
+class LeaveNotPending(Exception):
+    pass
+
+
+def leave_policy():
+    return {**DEFAULT_POLICY, **getattr(settings, 'LEAVE_POLICY', {})}
+
+
+def leave_days(leave_request):
+    return (leave_request.end_date - leave_request.start_date).days + 1
+
+
+def _invalidate_on_commit(employee_ids):
+    """Balances changed via UPDATE, which the auth user cache cannot see"""
+    def invalidate():
+        for employee_id in employee_ids:
+            invalidate_user(employee_id)
+    transaction.on_commit(invalidate)
+
+
+def apply_ledger_entries(entries):
+    """
+    Write ledger entries and move the matching User balances.
+
+    Deltas are summed per employee and field and applied in one UPDATE using
+    F() + CASE, so the cost does not depend on how many entries there are.
+    """
+    totals = defaultdict(lambda: defaultdict(int))
+    for entry in entries:
+        field = BALANCE_FIELDS.get(entry.leave_type)
+        if field:
+            totals[field][entry.employee_id] += entry.delta
+
+    LeaveLedgerEntry.objects.bulk_create(entries)
+
+    updates = {
+        field: Coalesce(F(field), 0) + Case(
+            *[When(pk=employee_id, then=Value(delta)) for employee_id, delta in deltas.items()],
+            default=Value(0), output_field=IntegerField(),
+        )
+        for field, deltas in totals.items() if deltas
+    }
+    employee_ids = {employee_id for deltas in totals.values() for employee_id in deltas}
+    if updates:
+        User.objects.filter(pk__in=employee_ids).update(**updates)
+        _invalidate_on_commit(employee_ids)
+
+
+def approval_entry(leave_request):
+    """Ledger entry deducting an approved request, or None for unpaid leave"""
+    if leave_request.leave_type not in BALANCE_FIELDS:
+        return None
+    return LeaveLedgerEntry(
+        employee_id=leave_request.employee_id,
+        leave_type=leave_request.leave_type,
+        delta=-leave_days(leave_request),
+        reason=LedgerReason.APPROVAL,
+        year=leave_request.start_date.year,
+        leave_request=leave_request,
+    )
+
+
+def approve_leave(leave_id, comment=''):
+    """Approve a pending request and deduct its days, locking the request row"""
+    with transaction.atomic():
+        leave_request = (
+            LeaveRequest.objects.select_for_update(of=('self',))
+            .select_related('employee')
+            .get(pk=leave_id)
+        )
+        if leave_request.status != LeaveStatus.PENDING:
+            raise LeaveNotPending
+        leave_request.status = LeaveStatus.APPROVED
+        leave_request.admin_comment = comment
+        leave_request.save(update_fields=['status', 'admin_comment'])
+
+        entry = approval_entry(leave_request)
+        if entry:
+            apply_ledger_entries([entry])
+        enqueue('leave.decided', {'leave_ids': [leave_request.pk]})
+    return leave_request
+
+
+def review_leaves(leave_ids, decision, comment=''):
+    """
+    Approve or reject many pending requests in one transaction.
+
+    The requests are locked with one SELECT ... FOR UPDATE, checked in
+    memory, moved to `decision` with one UPDATE and, for approvals, their
+    days deducted with one aggregated balance UPDATE. Returns one outcome
+    dict per requested id, in input order.
+    """
+    with transaction.atomic():
+        leave_requests = {
+            leave_request.pk: leave_request
+            for leave_request in LeaveRequest.objects.select_for_update()
+            .filter(pk__in=leave_ids)
+            .only('id', 'employee_id', 'leave_type', 'start_date', 'end_date', 'status')
+        }
+
+        outcomes, decided = [], []
+        for leave_id in leave_ids:
+            leave_request = leave_requests.get(leave_id)
+            if leave_request is None:
+                outcomes.append({"id": leave_id, "status": "error", "error": "Leave request not found"})
+            elif leave_request.status != LeaveStatus.PENDING:
+                outcomes.append({"id": leave_id, "status": "error", "error": "Leave request is not pending"})
+            else:
+                # Mark it so a repeated id in the batch is reported, not applied twice.
+                leave_request.status = decision
+                decided.append(leave_request)
+                outcomes.append({"id": leave_id, "status": decision.lower()})
+
+        if decided:
+            LeaveRequest.objects.filter(pk__in=[leave_request.pk for leave_request in decided]).update(
+                status=decision, admin_comment=comment
+            )
+            if decision == LeaveStatus.APPROVED:
+                apply_ledger_entries([
+                    entry for entry in map(approval_entry, decided) if entry is not None
+                ])
+            enqueue('leave.decided', {'leave_ids': [leave_request.pk for leave_request in decided]})
+    return outcomes
+
+
+@job('leave.requested')
+def notify_leave_requested(leave_id):
+    leave_request = LeaveRequest.objects.select_related('employee').filter(pk=leave_id).first()
+    if leave_request is None:
+        return
+    logger.info(
+        f"Notice to admins: {leave_request.employee.username} requested {leave_request.leave_type} leave "
+        f"{leave_request.start_date} to {leave_request.end_date}"
+    )
+
+
+@job('leave.decided')
+def notify_leave_decision(leave_ids):
+    for leave_request in LeaveRequest.objects.select_related('employee').filter(pk__in=leave_ids):
+        logger.info(
+            f"Notice to {leave_request.employee.username}: leave {leave_request.start_date} to "
+            f"{leave_request.end_date} {leave_request.status.lower()}"
+        )
+
+
+def opening_entries(user):
+    return [
+        LeaveLedgerEntry(employee_id=user.pk, leave_type=leave_type,
+                         delta=getattr(user, field) or 0, reason=LedgerReason.OPENING)
+        for leave_type, field in BALANCE_FIELDS.items()
+    ]
+
+
+def adjustment_entries(user, previous_balances, note=''):
+    """Entries explaining a direct edit of a user's balance fields"""
+    entries = []
+    for leave_type, field in BALANCE_FIELDS.items():
+        delta = (getattr(user, field) or 0) - (previous_balances.get(field) or 0)
+        if delta:
+            entries.append(LeaveLedgerEntry(
+                employee_id=user.pk, leave_type=leave_type, delta=delta,
+                reason=LedgerReason.ADJUSTMENT, note=note,
+            ))
+    return entries
+
+
+def run_year_end(year, policy=None):
+    """
+    Credit the year's entitlement and carry forward capped paid leave.
+
+    Paid balance becomes min(balance, carry-forward cap) + annual entitlement;
+    sick leave resets to its annual entitlement. Employees that already have
+    an ACCRUAL entry for the year are skipped, so the job is safe to re-run.
+    Balances move in a single set-based UPDATE; the ledger in one bulk insert.
+    Returns the number of employees credited.
+    """
+    policy = {**leave_policy(), **(policy or {})}
+    cap, paid_annual, sick_annual = (
+        policy['PAID_CARRY_FORWARD_CAP'], policy['PAID_ANNUAL'], policy['SICK_ANNUAL']
+    )
+
+    with transaction.atomic():
+        already_credited = LeaveLedgerEntry.objects.filter(
+            reason=LedgerReason.ACCRUAL, year=year
+        ).values('employee_id')
+        employees = User.objects.filter(is_active=True).exclude(pk__in=already_credited)
+        rows = list(
+            employees.select_for_update()
+            .values_list('pk', 'paid_leave_balance', 'sick_leave_balance')
+        )
+        if not rows:
+            return 0
+
+        entries = []
+        for employee_id, paid, sick in rows:
+            paid, sick = paid or 0, sick or 0
+            for leave_type, lapse, accrual in [
+                (LeaveType.PAID, min(cap, paid) - paid, paid_annual),
+                (LeaveType.SICK, -sick, sick_annual),
+            ]:
+                if lapse:
+                    entries.append(LeaveLedgerEntry(
+                        employee_id=employee_id, leave_type=leave_type, delta=lapse,
+                        reason=LedgerReason.LAPSE, year=year,
+                    ))
+                entries.append(LeaveLedgerEntry(
+                    employee_id=employee_id, leave_type=leave_type, delta=accrual,
+                    reason=LedgerReason.ACCRUAL, year=year,
+                ))
+
+        employee_ids = [row[0] for row in rows]
+        User.objects.filter(pk__in=employee_ids).update(
+            paid_leave_balance=Least(Coalesce(F('paid_leave_balance'), 0), Value(cap)) + paid_annual,
+            sick_leave_balance=Value(sick_annual),
+        )
+        LeaveLedgerEntry.objects.bulk_create(entries, batch_size=2000)
+        _invalidate_on_commit(employee_ids)
+    return len(rows)
+
+
+ABSENCE_EMPLOYEE_COLUMNS = [
+    ('employee', 'employee_id'), ('employee_id', 'employee__employee_id'),
+    ('username', 'employee__username'), ('first_name', 'employee__first_name'),
+    ('last_name', 'employee__last_name'), ('department', 'employee__department'),
+]
+ABSENCE_COLUMNS = [name for name, _ in ABSENCE_EMPLOYEE_COLUMNS] + [
+    'start_date', 'end_date', 'leave_type', 'status', 'source',
+]
+
+
+def team_absences(employees, start, end):
+    """
+    Absences of `employees` (a User queryset) during the inclusive window.
+
+    Pending/approved leave overlapping the window and ON_LEAVE attendance days
+    are read in a single UNION query: the leave side uses the leave_no_overlap
+    GiST index on PostgreSQL, the attendance side the (employee, date) index.
+    """
+    lookups = [lookup for _, lookup in ABSENCE_EMPLOYEE_COLUMNS]
+    leave = (
+        LeaveRequest.objects.active().overlapping(start, end)
+        .filter(employee__in=employees)
+        .annotate(source=Value('LEAVE'))
+        .values_list(*lookups, 'start_date', 'end_date', 'leave_type', 'status', 'source')
+    )
+    attendance = (
+        Attendance.objects.filter(
+            employee__in=employees, date__gte=start, date__lte=end, status=AttendanceStatus.ON_LEAVE
+        )
+        .annotate(
+            end_date=F('date'), leave_type=Value(None, output_field=CharField()), source=Value('ATTENDANCE')
+        )
+        .values_list(*lookups, 'date', 'end_date', 'leave_type', 'status', 'source')
+    )
+    rows = leave.union(attendance, all=True).order_by('start_date', 'employee_id')
+    return [dict(zip(ABSENCE_COLUMNS, row)) for row in rows]
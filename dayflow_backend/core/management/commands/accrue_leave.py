@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.leaves import leave_policy, run_year_end
+
+
+class Command(BaseCommand):
+    help = "Credit annual leave entitlements and carry forward paid leave for a year"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, default=None, help="Leave year to open (default: current year)")
+        parser.add_argument('--paid', type=int, help="Annual paid leave entitlement")
+        parser.add_argument('--sick', type=int, help="Annual sick leave entitlement")
+        parser.add_argument('--carry-forward-cap', type=int, help="Maximum paid days carried forward")
+
+    def handle(self, *args, **options):
+        year = options['year'] or timezone.now().year
+        overrides = {
+            'PAID_ANNUAL': options['paid'],
+            'SICK_ANNUAL': options['sick'],
+            'PAID_CARRY_FORWARD_CAP': options['carry_forward_cap'],
+        }
+        policy = {**leave_policy(), **{key: value for key, value in overrides.items() if value is not None}}
+
+        credited = run_year_end(year, policy)
+        self.stdout.write(self.style.SUCCESS(
+            f"Leave year {year}: credited {credited} employee(s) "
+            f"(paid {policy['PAID_ANNUAL']}, sick {policy['SICK_ANNUAL']}, "
+            f"carry-forward cap {policy['PAID_CARRY_FORWARD_CAP']})"
+        ))
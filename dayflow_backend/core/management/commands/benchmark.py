@@ -0,0 +1,72 @@
+import json
+import platform
+import subprocess
+import time
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.utils import timezone
+
+from core.benchmarks import Benchmark, generate_dataset
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the core API against a throwaway test database seeded with synthetic data "
+        "and print per-endpoint latency, query counts and RSS as JSON"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--employees', type=int, default=200)
+        parser.add_argument('--months', type=int, default=3, help="Months of history to generate")
+        parser.add_argument('--iterations', type=int, default=50, help="Requests per endpoint")
+        parser.add_argument('--warmup', type=int, default=3, help="Unrecorded requests per read endpoint")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--only', nargs='*', help="Endpoint names to run (default: all)")
+        parser.add_argument('--output', help="Write the JSON report to this file instead of stdout")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            started = time.perf_counter()
+            dataset = generate_dataset(options['employees'], options['months'], options['seed'])
+            generated = time.perf_counter() - started
+            results = Benchmark(dataset, options['iterations'], options['warmup']).run(options['only'])
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'commit': _git_commit(),
+                'timestamp': timezone.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'employees': options['employees'],
+                'months': options['months'],
+                'iterations': options['iterations'],
+                'seed': options['seed'],
+                'generate_seconds': round(generated, 2),
+            },
+            'results': results,
+        }
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(output + '\n')
+            self.stderr.write(f"Wrote {options['output']}")
+        else:
+            self.stdout.write(output)
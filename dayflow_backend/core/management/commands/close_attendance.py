@@ -0,0 +1,27 @@
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.closing import attendance_policy, close_day
+
+
+class Command(BaseCommand):
+    help = "Record absences and close forgotten check-outs for a day (run after midnight; safe to re-run)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=date.fromisoformat, help="Day to close, YYYY-MM-DD (default: yesterday)")
+        parser.add_argument('--check-out', help="Check-out time for open rows, HH:MM (default: ATTENDANCE_POLICY)")
+
+    def handle(self, *args, **options):
+        # Closing today would mark late arrivals absent and check out everyone still at work
+        day = options['date'] or timezone.localdate() - timedelta(days=1)
+        policy = attendance_policy()
+        if options['check_out']:
+            policy['CHECK_OUT_TIME'] = options['check_out']
+
+        counts = close_day(day, policy)
+        self.stdout.write(self.style.SUCCESS(
+            f"Closed {day}: {counts['absent']} absent, {counts['on_leave']} on leave, "
+            f"{counts['closed']} check-out(s) closed at {policy['CHECK_OUT_TIME']}"
+        ))
@@ -0,0 +1,32 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.onboarding import import_employees, read_employee_rows
+
+
+class Command(BaseCommand):
+    help = "Create employees from a CSV or JSON file (rows with errors are reported and skipped)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', type=Path, help="CSV (with a header row) or JSON file")
+        parser.add_argument('--dry-run', action='store_true', help="Validate only; create nothing")
+        parser.add_argument('--workers', type=int, help="Password-hashing processes (default: one per CPU)")
+        parser.add_argument('--batch-size', type=int, default=500, help="Rows per INSERT (default: 500)")
+
+    def handle(self, *args, **options):
+        try:
+            rows = read_employee_rows(options['path'].read_bytes(), options['path'].name)
+        except (OSError, ValueError, UnicodeDecodeError) as error:
+            raise CommandError(f"Could not read {options['path']}: {error}")
+
+        results = import_employees(
+            rows, dry_run=options['dry_run'], workers=options['workers'], batch_size=options['batch_size']
+        )
+        errors = [result for result in results if result['status'] == 'error']
+        for result in errors:
+            self.stderr.write(f"Row {result['index'] + 1}: {dict(result['errors'])}")
+
+        done = len(results) - len(errors)
+        verb = "valid" if options['dry_run'] else "created"
+        self.stdout.write(self.style.SUCCESS(f"{done} of {len(results)} employee(s) {verb}, {len(errors)} error(s)"))
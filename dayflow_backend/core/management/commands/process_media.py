@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.media import process_pending_thumbnails
+
+
+class Command(BaseCommand):
+    help = "Make avatar thumbnails for new profile pictures (run every minute, or with --interval)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=100, help="Pictures per pass (default: 100)")
+        parser.add_argument('--interval', type=float, help="Keep running, polling every N seconds")
+
+    def handle(self, *args, **options):
+        while True:
+            counts = process_pending_thumbnails(limit=options['limit'])
+            if counts['processed'] or counts['failed'] or not options['interval']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Thumbnails made for {counts['processed']} picture(s), {counts['failed']} unreadable"
+                ))
+            if not options['interval']:
+                return
+            if counts['processed'] + counts['failed'] < options['limit']:
+                time.sleep(options['interval'])
@@ -0,0 +1,37 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from core.models import Attendance
+from dayflow_backend.database import job_statement_timeout, statement_timeout
+from core.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recompute the attendance rollup tables for a date range (default: all attendance)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', type=date.fromisoformat, help="First day, YYYY-MM-DD")
+        parser.add_argument('--end', type=date.fromisoformat, help="Last day, YYYY-MM-DD")
+        parser.add_argument(
+            '--statement-timeout', type=int, default=job_statement_timeout(),
+            help="Statement timeout in ms for this run (default: DB_JOB_STATEMENT_TIMEOUT, 0 = none)"
+        )
+
+    def handle(self, *args, **options):
+        bounds = Attendance.objects.aggregate(first=Min('date'), last=Max('date'))
+        start = options['start'] or bounds['first']
+        end = options['end'] or bounds['last']
+        if start is None or end is None:
+            self.stdout.write("No attendance to roll up")
+            return
+        if end < start:
+            raise CommandError("--end must not be before --start")
+
+        with statement_timeout(options['statement_timeout']):
+            months, days = rebuild_rollups(start, end)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt attendance rollups for {start} to {end}: "
+            f"{months} employee-month row(s), {days} department-day row(s)"
+        ))
@@ -0,0 +1,73 @@
+import signal
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.jobs import jobs_settings, purge_finished_jobs, run_batch
+
+PURGE_EVERY_SECONDS = 3600
+
+
+class Command(BaseCommand):
+    help = "Run outbox jobs (core.jobs) until stopped, or until no job is due with --once"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=1, help="Worker threads (default: 1)")
+        parser.add_argument('--batch-size', type=int, help="Jobs claimed at a time (default: JOBS['BATCH_SIZE'])")
+        parser.add_argument('--interval', type=float, default=1.0, help="Seconds to wait when idle (default: 1)")
+        parser.add_argument('--once', action='store_true', help="Exit once no job is due")
+
+    def handle(self, *args, **options):
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.totals = {}
+        self.next_purge = time.monotonic()
+        signal.signal(signal.SIGTERM, lambda *_: self.stop.set())
+
+        try:
+            if options['concurrency'] <= 1:
+                self.work(options)
+            else:
+                workers = [
+                    threading.Thread(target=self.work_in_thread, args=(options,), name=f'jobs-{number}')
+                    for number in range(options['concurrency'])
+                ]
+                for worker in workers:
+                    worker.start()
+                while any(worker.is_alive() for worker in workers):
+                    for worker in workers:
+                        worker.join(timeout=1)
+        except KeyboardInterrupt:
+            self.stop.set()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Jobs: {self.totals.get('done', 0)} done, {self.totals.get('retried', 0)} to retry, "
+            f"{self.totals.get('failed', 0)} failed"
+        ))
+
+    def work_in_thread(self, options):
+        try:
+            self.work(options)
+        finally:
+            # Each thread has its own database connection
+            connection.close()
+
+    def work(self, options):
+        batch_size = options['batch_size'] or jobs_settings()['BATCH_SIZE']
+        while not self.stop.is_set():
+            counts = run_batch(batch_size)
+            with self.lock:
+                for outcome, count in counts.items():
+                    self.totals[outcome] = self.totals.get(outcome, 0) + count
+                purge = time.monotonic() >= self.next_purge
+                if purge:
+                    self.next_purge = time.monotonic() + PURGE_EVERY_SECONDS
+            if purge:
+                purge_finished_jobs()
+            if sum(counts.values()) < batch_size:
+                # Nothing more is due right now
+                if options['once']:
+                    return
+                self.stop.wait(options['interval'])
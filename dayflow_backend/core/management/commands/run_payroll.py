@@ -0,0 +1,52 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.payroll import PayrollRun
+from core.serializers import PayrollRunSerializer
+from dayflow_backend.database import job_statement_timeout, statement_timeout
+
+
+class Command(BaseCommand):
+    help = "Generate a month's payroll for all active employees from a salary template"
+
+    def add_arguments(self, parser):
+        parser.add_argument('month', help="Month to run, as YYYY-MM")
+        parser.add_argument('--template', required=True, help="Path to a salary template JSON file")
+        parser.add_argument('--dry-run', action='store_true', help="Compute and report without writing")
+        parser.add_argument('--replace', action='store_true', help="Overwrite existing rows that differ")
+        parser.add_argument('--diff', action='store_true', help="Print the per-employee results as JSON")
+        parser.add_argument(
+            '--statement-timeout', type=int, default=job_statement_timeout(),
+            help="Statement timeout in ms for this run (default: DB_JOB_STATEMENT_TIMEOUT, 0 = none)"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['template']) as template_file:
+                template = json.load(template_file)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Could not read template: {exc}")
+
+        serializer = PayrollRunSerializer(data={
+            'month': options['month'],
+            'template': template,
+            'dry_run': options['dry_run'],
+            'replace': options['replace'],
+        })
+        if not serializer.is_valid():
+            raise CommandError(json.dumps(serializer.errors))
+        params = serializer.validated_data
+
+        with statement_timeout(options['statement_timeout']):
+            report = PayrollRun(
+                params['month'], params['template'], replace=params['replace']
+            ).execute(dry_run=params['dry_run'])
+
+        if options['diff']:
+            self.stdout.write(json.dumps(report['results'], default=str, indent=2))
+        prefix = "[dry run] " if params['dry_run'] else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}Payroll {params['month']:%Y-%m}: "
+            + ", ".join(f"{action}={count}" for action, count in sorted(report['summary'].items()))
+        ))
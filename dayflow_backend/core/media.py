@@ -0,0 +1,160 @@
+"""
+Uploaded files: profile pictures, resumes and leave attachments.
+
+Uploads are spooled to a temporary file by Django's upload handlers (see
+FILE_UPLOAD_MAX_MEMORY_SIZE) and copied to storage chunk by chunk; nothing is
+decoded while the request is open. Avatar thumbnails are made afterwards by
+`manage.py process_media`, which picks up every user whose
+profile_thumbnails is still NULL.
+
+Nothing is served from MEDIA_URL. The API returns signed URLs to
+/core/media/<name>, only to the owner of the object or an admin (as
+IsOwnerOrAdmin), and they expire after MEDIA_PIPELINE['URL_MAX_AGE']. The
+expiry is rounded up to a whole window, so a URL stays the same for a while
+and browsers can cache the file. With MEDIA_PIPELINE['ACCEL_PREFIX'] set,
+serve_media hands the transfer to nginx through X-Accel-Redirect.
+"""
+import io
+import logging
+import mimetypes
+import time
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+from PIL import Image, ImageOps
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'THUMBNAIL_SIZES': {'small': 64, 'medium': 256},
+    'THUMBNAIL_QUALITY': 80,
+    'URL_MAX_AGE': 3600,
+    'ACCEL_PREFIX': '',
+    'MAX_UPLOAD_SIZE': 5 * 1024 * 1024,
+}
+SIGNING_SALT = 'core.media'
+# Served inline; anything else (SVG and HTML included) is a download
+INLINE_TYPES = {'image/jpeg', 'image/png', 'image/gif', 'image/webp'}
+
+
+def media_settings():
+    return {**DEFAULTS, **getattr(settings, 'MEDIA_PIPELINE', {})}
+
+
+def _signature(name, expires):
+    return signing.Signer(salt=SIGNING_SALT).signature(f'{name}:{expires}')
+
+
+def can_view(user, instance):
+    """IsOwnerOrAdmin for a user row or anything with an employee"""
+    if user.role == 'ADMIN':
+        return True
+    owner_id = instance.pk if isinstance(instance, User) else instance.employee_id
+    return owner_id == user.pk
+
+
+def signed_url(name, request=None, now=None):
+    """URL of a stored file, valid for between one and two URL_MAX_AGE windows"""
+    window = media_settings()['URL_MAX_AGE']
+    expires = (int(now or time.time()) // window + 2) * window
+    url = f"{reverse('media-file', args=[name])}?{urlencode({'expires': expires, 'signature': _signature(name, expires)})}"
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def verify(name, expires, signature, now=None):
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return False
+    return expires > (now or time.time()) and constant_time_compare(signature or '', _signature(name, expires))
+
+
+@require_GET
+def serve_media(request, name):
+    """Send a stored file to the holder of a valid signed URL"""
+    expires = request.GET.get('expires')
+    if not verify(name, expires, request.GET.get('signature')):
+        return HttpResponseForbidden("Invalid or expired link")
+
+    content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    # Uploads are user-controlled: only raster images may render on our origin
+    as_attachment = content_type not in INLINE_TYPES
+    accel_prefix = media_settings()['ACCEL_PREFIX']
+    if accel_prefix:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{quote(name)}"
+        if as_attachment:
+            response['Content-Disposition'] = f'attachment; filename="{quote(name.rsplit("/", 1)[-1])}"'
+    else:
+        try:
+            file = default_storage.open(name)
+        except FileNotFoundError:
+            raise Http404("File not found")
+        response = FileResponse(file, content_type=content_type, as_attachment=as_attachment)
+    response['Cache-Control'] = f'private, max-age={max(int(expires) - int(time.time()), 0)}'
+    # Even if a browser ignores the download, the document gets no script or origin
+    response['Content-Security-Policy'] = 'sandbox'
+    response['X-Content-Type-Options'] = 'nosniff'
+    return response
+
+
+def delete_on_commit(names):
+    names = [name for name in names if name]
+    if names:
+        transaction.on_commit(lambda: [default_storage.delete(name) for name in names])
+
+
+def make_thumbnails(user):
+    """Write square WebP thumbnails of the user's profile picture; returns {size name: storage name}"""
+    config = media_settings()
+    sizes = sorted(config['THUMBNAIL_SIZES'].items(), key=lambda item: item[1], reverse=True)
+    with user.profile_picture.open('rb') as file:
+        image = Image.open(file)
+        # Let JPEG decode at a reduced scale when the picture is much larger
+        image.draft('RGB', (sizes[0][1] * 2, sizes[0][1] * 2))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+    names = {}
+    for size_name, size in sizes:
+        image = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, 'WEBP', quality=config['THUMBNAIL_QUALITY'])
+        names[size_name] = default_storage.save(
+            f'profile_thumbs/{user.pk}/{size_name}.webp', ContentFile(buffer.getvalue())
+        )
+    return names
+
+
+def pending_thumbnails():
+    return User.objects.filter(profile_thumbnails__isnull=True).exclude(profile_picture='').exclude(profile_picture__isnull=True)
+
+
+def process_pending_thumbnails(limit=100):
+    """Make thumbnails for up to `limit` users; concurrent workers skip each other's rows"""
+    counts = {'processed': 0, 'failed': 0}
+    for pk in pending_thumbnails().order_by('pk').values_list('pk', flat=True)[:limit]:
+        with transaction.atomic():
+            user = pending_thumbnails().select_for_update(skip_locked=True).filter(pk=pk).first()
+            if user is None:
+                continue
+            try:
+                user.profile_thumbnails = make_thumbnails(user)
+                counts['processed'] += 1
+            except (OSError, ValueError, Image.DecompressionBombError) as error:
+                # Mark it done with no thumbnails rather than retrying forever
+                logger.warning(f"Could not make thumbnails for user {user.username}: {error}")
+                user.profile_thumbnails = {}
+                counts['failed'] += 1
+            user.save(update_fields=['profile_thumbnails'])
+    return counts
@@ -0,0 +1,219 @@
+"""
+In-process request metrics in the Prometheus text format.
+
+MetricsMiddleware (core.middleware) records, per route, request latency,
+the number and total time of SQL queries, time spent producing serializer
+data (for serializers using TimedSerializerMixin) and the response size.
+metrics_view exposes them on /metrics to bearers of METRICS['TOKEN'], or to
+anyone when DEBUG is on and no token is set.
+
+Metrics live in the memory of each worker process; scrape every worker (or
+run one per container) and aggregate in Prometheus.
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+DEFAULTS = {
+    'SLOW_REQUEST_SECONDS': 1.0,
+    'SLOW_REQUEST_MAX_SQL': 50,
+    'TOKEN': None,
+}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+
+def metrics_settings():
+    return {**DEFAULTS, **getattr(settings, 'METRICS', {})}
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            yield self.name, _format_labels(self.labels, label_values), value
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            series = self._values.get(label_values)
+            if series is None:
+                series = self._values[label_values] = [[0] * len(self.buckets), 0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(counts), total, count) for key, (counts, total, count) in self._values.items()}
+        for label_values, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket', _format_labels(self.labels + ('le',), label_values + (bound,)), cumulative
+            yield f'{self.name}_bucket', _format_labels(self.labels + ('le',), label_values + ('+Inf',)), count
+            yield f'{self.name}_sum', _format_labels(self.labels, label_values), total
+            yield f'{self.name}_count', _format_labels(self.labels, label_values), count
+
+
+REQUESTS = Counter(
+    'dayflow_http_requests_total', "Requests handled, by route, method and status code",
+    ['route', 'method', 'status'],
+)
+LATENCY = Histogram(
+    'dayflow_http_request_duration_seconds', "Request latency", ['route', 'method'],
+)
+DB_QUERIES = Histogram(
+    'dayflow_db_queries_per_request', "SQL queries issued per request", ['route'],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+DB_TIME = Histogram(
+    'dayflow_db_time_seconds', "Time spent in SQL per request", ['route'],
+)
+SERIALIZER_TIME = Histogram(
+    'dayflow_serializer_time_seconds', "Time spent producing serializer data per request", ['route'],
+)
+RESPONSE_SIZE = Histogram(
+    'dayflow_http_response_size_bytes', "Response body size (non-streaming responses)", ['route'],
+    buckets=SIZE_BUCKETS,
+)
+REGISTRY = [REQUESTS, LATENCY, DB_QUERIES, DB_TIME, SERIALIZER_TIME, RESPONSE_SIZE]
+
+
+def render_metrics(registry=REGISTRY):
+    lines = []
+    for metric in registry:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        for name, labels, value in metric.samples():
+            lines.append(f'{name}{labels} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint; requires `Authorization: Bearer <METRICS['TOKEN']>`"""
+    token = metrics_settings()['TOKEN']
+    if not token:
+        # Latencies and query counts per endpoint are not for the public
+        if not settings.DEBUG:
+            return HttpResponseForbidden()
+    elif not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class RequestStats:
+    """What one request spent its time on; filled in while it is handled"""
+
+    def __init__(self, capture_sql=0):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.capture_sql = capture_sql
+        self.sql = []
+        self._serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        """connection.execute_wrapper hook"""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += duration
+            if len(self.sql) < self.capture_sql:
+                self.sql.append((duration, sql))
+
+
+current_stats = ContextVar('current_request_stats', default=None)
+
+
+def observe_queries(execute, sql, params, many, context):
+    """
+    Permanent execute_wrapper feeding the current request's stats.
+
+    Installed on every connection as it is opened (core.signals) rather than
+    per request: async views run their queries on other threads, each with
+    its own connection, but the context variable follows them there.
+    """
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+def install_query_observer(connection):
+    if observe_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(observe_queries)
+
+
+@contextmanager
+def timed_serialization():
+    """Add the enclosed time to the current request's serializer time (outermost call only)"""
+    stats = current_stats.get()
+    if stats is None:
+        yield
+        return
+    stats._serializer_depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats._serializer_depth -= 1
+        if not stats._serializer_depth:
+            stats.serializer_time += time.perf_counter() - start
+
+
+
+class TimedSerializerMixin:
+    """Count a serializer's to_representation() towards the request's serializer time"""
+
+    def to_representation(self, instance):
+        with timed_serialization():
+            return super().to_representation(instance)
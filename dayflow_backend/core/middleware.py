@@ -0,0 +1,93 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def route_name(request):
+    """Low-cardinality route label: '<router basename>.<action>' for viewsets, else the URL name"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    view = match.func
+    actions = getattr(view, 'actions', None)
+    basename = getattr(view, 'initkwargs', {}).get('basename')
+    if actions and basename:
+        return f"{basename}.{actions.get(request.method.lower(), request.method.lower())}"
+    return match.view_name or getattr(view, '__name__', 'unknown')
+
+
+class MetricsMiddleware:
+    """
+    Record latency, SQL query count/time, serializer time and response size
+    per route (see core.metrics), and log requests slower than
+    METRICS['SLOW_REQUEST_SECONDS'] together with the SQL they ran.
+
+    Runs natively in both the WSGI and the ASGI stack, so async views are
+    not pushed onto a thread by it.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if request.path_info == '/metrics':
+            return self.get_response(request)
+
+        # Connections opened before core.signals was connected
+        for connection in connections.all(initialized_only=True):
+            metrics.install_query_observer(connection)
+
+        stats = metrics.RequestStats(capture_sql=metrics.metrics_settings()['SLOW_REQUEST_MAX_SQL'])
+        token = metrics.current_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current_stats.reset(token)
+        self.record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if request.path_info == '/metrics':
+            return await self.get_response(request)
+
+        stats = metrics.RequestStats(capture_sql=metrics.metrics_settings()['SLOW_REQUEST_MAX_SQL'])
+        token = metrics.current_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current_stats.reset(token)
+        self.record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    def record(self, request, response, stats, duration):
+        route = route_name(request)
+        metrics.REQUESTS.inc(route, request.method, response.status_code)
+        metrics.LATENCY.observe(duration, route, request.method)
+        metrics.DB_QUERIES.observe(stats.queries, route)
+        metrics.DB_TIME.observe(stats.db_time, route)
+        metrics.SERIALIZER_TIME.observe(stats.serializer_time, route)
+        if not response.streaming:
+            metrics.RESPONSE_SIZE.observe(len(response.content), route)
+
+        if duration >= metrics.metrics_settings()['SLOW_REQUEST_SECONDS']:
+            statements = '\n'.join(f"  [{sql_time * 1000:.1f} ms] {sql}" for sql_time, sql in stats.sql)
+            logger.warning(
+                f"Slow request {request.method} {request.path} ({route}): {duration * 1000:.0f} ms, "
+                f"{stats.queries} queries in {stats.db_time * 1000:.0f} ms, "
+                f"serializers {stats.serializer_time * 1000:.0f} ms\n{statements}"
+            )
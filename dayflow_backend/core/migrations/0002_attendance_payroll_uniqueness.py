@@ -0,0 +1,69 @@
+# Generated by Django 6.0 on 2026-10-17 20:42
+
+import sys
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def duplicates(model, day_field):
+    return (
+        model.objects.filter(employee__isnull=False, **{f'{day_field}__isnull': False})
+        .values('employee', day_field)
+        .annotate(keep_id=Min('id'), rows=Count('id'))
+        .filter(rows__gt=1)
+        .order_by('employee', day_field)
+    )
+
+
+def check_duplicate_payrolls(apps, schema_editor):
+    """Payroll rows are issued payslips: refuse to pick one, list the clashes for an operator"""
+    Payroll = apps.get_model('core', 'Payroll')
+    clashes = [
+        f"employee {group['employee']} / {group['month']:%Y-%m} ({group['rows']} rows)"
+        for group in duplicates(Payroll, 'month')
+    ]
+    if clashes:
+        raise RuntimeError(
+            "Cannot add unique_payroll_employee_month: resolve these duplicate payroll rows first:\n  "
+            + "\n  ".join(clashes)
+        )
+
+
+def remove_duplicate_attendance(apps, schema_editor):
+    """Keep the oldest attendance row for each (employee, date), reporting the ones removed"""
+    Attendance = apps.get_model('core', 'Attendance')
+    for group in duplicates(Attendance, 'date'):
+        extra = Attendance.objects.filter(
+            employee=group['employee'], date=group['date']
+        ).exclude(id=group['keep_id'])
+        removed = list(extra.values_list('id', flat=True))
+        extra.delete()
+        sys.stdout.write(
+            f"\n  Removed duplicate attendance rows {removed} of employee {group['employee']} "
+            f"on {group['date']}, kept #{group['keep_id']}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_payrolls, migrations.RunPython.noop),
+        migrations.RunPython(remove_duplicate_attendance, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='leaverequest',
+            index=models.Index(fields=['employee', 'status', 'start_date', 'end_date'], name='leave_employee_status_dates'),
+        ),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(fields=('employee', 'date'), name='unique_attendance_employee_date'),
+        ),
+        migrations.AddConstraint(
+            model_name='payroll',
+            constraint=models.UniqueConstraint(fields=('employee', 'month'), name='unique_payroll_employee_month'),
+        ),
+    ]
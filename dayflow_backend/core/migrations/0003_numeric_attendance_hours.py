@@ -0,0 +1,70 @@
+# Generated by Django 6.0 on 2026-10-17 21:05
+
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations, models
+
+
+def backfill_numeric_hours(apps, schema_editor):
+    """Parse the legacy "8.25"-style strings into the new numeric columns."""
+    Attendance = apps.get_model('core', 'Attendance')
+
+    def parse(value):
+        try:
+            return Decimal(value.strip()).quantize(Decimal('0.01')) if value else None
+        except InvalidOperation:
+            return None
+
+    rows = (
+        Attendance.objects.filter(models.Q(work_hours__isnull=False) | models.Q(extra_hours__isnull=False))
+        .only('id', 'work_hours', 'extra_hours')
+    )
+    batch = []
+    for row in rows.iterator(chunk_size=2000):
+        row.work_hours_numeric = parse(row.work_hours)
+        row.extra_hours_numeric = parse(row.extra_hours)
+        batch.append(row)
+        if len(batch) >= 2000:
+            Attendance.objects.bulk_update(batch, ['work_hours_numeric', 'extra_hours_numeric'])
+            batch = []
+    if batch:
+        Attendance.objects.bulk_update(batch, ['work_hours_numeric', 'extra_hours_numeric'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_attendance_payroll_uniqueness'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='work_hours_numeric',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True),
+        ),
+        migrations.AddField(
+            model_name='attendance',
+            name='extra_hours_numeric',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True),
+        ),
+        migrations.RunPython(backfill_numeric_hours, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='attendance',
+            name='work_hours',
+        ),
+        migrations.RemoveField(
+            model_name='attendance',
+            name='extra_hours',
+        ),
+        migrations.RenameField(
+            model_name='attendance',
+            old_name='work_hours_numeric',
+            new_name='work_hours',
+        ),
+        migrations.RenameField(
+            model_name='attendance',
+            old_name='extra_hours_numeric',
+            new_name='extra_hours',
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-17 20:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_numeric_attendance_hours'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payroll',
+            name='loss_of_pay',
+            field=models.DecimalField(blank=True, decimal_places=2, default=0, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='payroll',
+            name='unpaid_days',
+            field=models.DecimalField(blank=True, decimal_places=1, default=0, max_digits=4, null=True),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 6.0 on 2026-10-17 20:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_opening_balances(apps, schema_editor):
+    """Open the ledger at each user's current balances so ledger totals match them."""
+    User = apps.get_model('core', 'User')
+    LeaveLedgerEntry = apps.get_model('core', 'LeaveLedgerEntry')
+    entries = []
+    for user_id, paid, sick in User.objects.values_list('id', 'paid_leave_balance', 'sick_leave_balance').iterator():
+        entries.append(LeaveLedgerEntry(employee_id=user_id, leave_type='PAID', delta=paid or 0, reason='OPENING'))
+        entries.append(LeaveLedgerEntry(employee_id=user_id, leave_type='SICK', delta=sick or 0, reason='OPENING'))
+    LeaveLedgerEntry.objects.bulk_create(entries, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_payroll_loss_of_pay'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaveLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('leave_type', models.CharField(choices=[('PAID', 'Paid Leave'), ('SICK', 'Sick Leave'), ('UNPAID', 'Unpaid Leave')], max_length=20)),
+                ('delta', models.IntegerField()),
+                ('reason', models.CharField(choices=[('OPENING', 'Opening Balance'), ('ACCRUAL', 'Annual Accrual'), ('LAPSE', 'Lapsed at Year End'), ('APPROVAL', 'Leave Approved'), ('ADJUSTMENT', 'Manual Adjustment')], max_length=20)),
+                ('year', models.IntegerField(blank=True, null=True)),
+                ('note', models.CharField(blank=True, max_length=255, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leave_ledger', to=settings.AUTH_USER_MODEL)),
+                ('leave_request', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to='core.leaverequest')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['employee', 'leave_type', 'created_at'], name='ledger_employee_type_created')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('reason__in', ['ACCRUAL', 'LAPSE'])), fields=('employee', 'leave_type', 'year', 'reason'), name='unique_leave_ledger_year_end'), models.UniqueConstraint(condition=models.Q(('reason', 'APPROVAL')), fields=('leave_request',), name='unique_leave_ledger_approval')],
+            },
+        ),
+        migrations.RunPython(seed_opening_balances, migrations.RunPython.noop),
+    ]
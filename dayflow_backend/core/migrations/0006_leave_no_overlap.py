@@ -0,0 +1,69 @@
+# Generated by Django 6.0 on 2026-10-17 21:05
+
+from itertools import groupby
+
+import django.contrib.postgres.constraints
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+from django.db.models import F
+
+import core.models
+from core.postgres import AddPostgresConstraint
+
+BALANCE_FIELDS = {'PAID': 'paid_leave_balance', 'SICK': 'sick_leave_balance'}
+
+
+def reject_overlapping_requests(apps, schema_editor):
+    """Reject requests that overlap an earlier one of the same employee so the
+    constraint can be created. Approved requests win over pending ones; a
+    rejected approval gets its deducted days credited back through the ledger."""
+    LeaveRequest = apps.get_model('core', 'LeaveRequest')
+    LeaveLedgerEntry = apps.get_model('core', 'LeaveLedgerEntry')
+    User = apps.get_model('core', 'User')
+
+    active = (
+        LeaveRequest.objects.filter(
+            status__in=['PENDING', 'APPROVED'], employee__isnull=False,
+            start_date__isnull=False, end_date__gte=F('start_date'),
+        )
+        .order_by('employee_id', 'start_date', 'id')
+        .only('id', 'employee_id', 'leave_type', 'start_date', 'end_date', 'status')
+    )
+    for employee_id, rows in groupby(active.iterator(), key=lambda row: row.employee_id):
+        kept = []
+        for row in sorted(rows, key=lambda row: (row.status != 'APPROVED', row.start_date, row.id)):
+            clash = next((other for other in kept
+                          if row.start_date <= other.end_date and row.end_date >= other.start_date), None)
+            if clash is None:
+                kept.append(row)
+                continue
+
+            LeaveRequest.objects.filter(pk=row.pk).update(
+                status='REJECTED',
+                admin_comment=f"Rejected automatically: overlaps leave request #{clash.pk}",
+            )
+            field = BALANCE_FIELDS.get(row.leave_type)
+            if row.status == 'APPROVED' and field:
+                days = (row.end_date - row.start_date).days + 1
+                LeaveLedgerEntry.objects.create(
+                    employee_id=employee_id, leave_type=row.leave_type, delta=days,
+                    reason='ADJUSTMENT', leave_request_id=row.pk,
+                    note=f"Refund for overlapping request #{row.pk}",
+                )
+                User.objects.filter(pk=employee_id).update(**{field: F(field) + days})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_leave_ledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(reject_overlapping_requests, migrations.RunPython.noop),
+        BtreeGistExtension(),
+        AddPostgresConstraint(
+            model_name='leaverequest',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('start_date__lte', models.F('end_date')), ('status__in', ['PENDING', 'APPROVED'])), expressions=[('employee', '='), (core.models.LeavePeriod(), '&&')], name='leave_no_overlap'),
+        ),
+    ]
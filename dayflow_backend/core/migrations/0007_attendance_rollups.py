@@ -0,0 +1,109 @@
+# Generated by Django 6.0 on 2026-10-17 21:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+STATUS_COUNTERS = {'PRESENT': 'present', 'ABSENT': 'absent', 'HALF_DAY': 'half_day', 'ON_LEAVE': 'on_leave'}
+
+
+def build_rollups(apps, schema_editor):
+    """Fill the rollup tables from the existing attendance history."""
+    Attendance = apps.get_model('core', 'Attendance')
+    EmployeeMonthRollup = apps.get_model('core', 'EmployeeMonthRollup')
+    DepartmentDayRollup = apps.get_model('core', 'DepartmentDayRollup')
+
+    aggregates = {
+        'total_days': Count('id'),
+        **{field: Count('id', filter=Q(status=value)) for value, field in STATUS_COUNTERS.items()},
+        'work_hours': Sum('work_hours'),
+        'extra_hours': Sum('extra_hours'),
+    }
+    attendance = Attendance.objects.filter(employee__isnull=False, date__isnull=False)
+
+    EmployeeMonthRollup.objects.bulk_create([
+        EmployeeMonthRollup(
+            employee_id=row.pop('employee_id'), month=row.pop('rollup_month'),
+            **{field: value or 0 for field, value in row.items()}
+        )
+        for row in attendance.annotate(rollup_month=TruncMonth('date'))
+        .values('employee_id', 'rollup_month').annotate(**aggregates).order_by()
+    ], batch_size=2000)
+
+    days = {}
+    for row in attendance.values('employee__department', 'date').annotate(**aggregates).order_by():
+        key = (row.pop('employee__department') or '', row.pop('date'))
+        totals = days.setdefault(key, dict.fromkeys(aggregates, 0))
+        for field, value in row.items():
+            totals[field] += value or 0
+    DepartmentDayRollup.objects.bulk_create([
+        DepartmentDayRollup(department=department, date=day, **totals)
+        for (department, day), totals in days.items()
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_leave_no_overlap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DepartmentDayRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_days', models.IntegerField(default=0)),
+                ('present', models.IntegerField(default=0)),
+                ('absent', models.IntegerField(default=0)),
+                ('half_day', models.IntegerField(default=0)),
+                ('on_leave', models.IntegerField(default=0)),
+                ('work_hours', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('extra_hours', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('department', models.CharField(blank=True, default='', max_length=100)),
+                ('date', models.DateField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EmployeeMonthRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_days', models.IntegerField(default=0)),
+                ('present', models.IntegerField(default=0)),
+                ('absent', models.IntegerField(default=0)),
+                ('half_day', models.IntegerField(default=0)),
+                ('on_leave', models.IntegerField(default=0)),
+                ('work_hours', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('extra_hours', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('month', models.DateField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date'], name='attendance_date'),
+        ),
+        migrations.AddIndex(
+            model_name='departmentdayrollup',
+            index=models.Index(fields=['date'], name='rollup_department_day_date'),
+        ),
+        migrations.AddConstraint(
+            model_name='departmentdayrollup',
+            constraint=models.UniqueConstraint(fields=('department', 'date'), name='unique_rollup_department_date'),
+        ),
+        migrations.AddField(
+            model_name='employeemonthrollup',
+            name='employee',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attendance_months', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='employeemonthrollup',
+            index=models.Index(fields=['month'], name='rollup_employee_month_month'),
+        ),
+        migrations.AddConstraint(
+            model_name='employeemonthrollup',
+            constraint=models.UniqueConstraint(fields=('employee', 'month'), name='unique_rollup_employee_month'),
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
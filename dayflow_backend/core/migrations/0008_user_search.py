@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-17 21:40
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+import core.models
+from core.postgres import AddPostgresIndex
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_attendance_rollups'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        AddPostgresIndex(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(core.models.user_search_vector(), name='user_search_vector'),
+        ),
+        AddPostgresIndex(
+            model_name='user',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(core.models.user_search_text(), name='gin_trgm_ops'), name='user_search_text_trgm'),
+        ),
+    ]
@@ -1,10 +1,83 @@
-from django.db import models
+import re
+from datetime import date, datetime
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+from django.db import connections, models
+from django.db.models import Count, FloatField, Func, Q, Sum, Value
+from django.db.models.functions import Coalesce, Concat, Lower
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateRangeField, RangeBoundary, RangeOperators
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
 from django.utils import timezone
 
 # Create your models here.
 
-class UserManager(BaseUserManager):
+USER_SEARCH_FIELDS = ['first_name', 'last_name', 'username', 'email', 'employee_id', 'department', 'designation']
+MAX_SEARCH_TERMS = 8
+
+
+def search_terms(query):
+    """Lower-cased words of a search box entry; punctuation is dropped"""
+    return re.findall(r'\w+', (query or '').lower())[:MAX_SEARCH_TERMS]
+
+
+def user_search_vector():
+    """Weighted tsvector of a user: names and ids (A), email (B), department and designation (C)"""
+    return (
+        SearchVector('first_name', 'last_name', 'username', 'employee_id', config='simple', weight='A')
+        + SearchVector('email', config='simple', weight='B')
+        + SearchVector('department', 'designation', config='simple', weight='C')
+    )
+
+
+def user_search_text():
+    """USER_SEARCH_FIELDS lower-cased and joined by spaces, for trigram matching
+    (Concat treats NULL as '')"""
+    parts = []
+    for field in USER_SEARCH_FIELDS:
+        parts += [field, Value(' ')]
+    return Lower(Concat(*parts[:-1], output_field=models.TextField()))
+
+
+class UserQuerySet(models.QuerySet):
+    def search(self, query):
+        """
+        Users matching every word of query, best match first (annotated as
+        search_rank). On PostgreSQL this is an index lookup with full-text
+        ranking and typo tolerance; elsewhere each word must be contained in
+        one of USER_SEARCH_FIELDS.
+        """
+        terms = search_terms(query)
+        if not terms:
+            return self.none()
+        if connections[self.db].vendor == 'postgresql':
+            # Every term as a prefix, so typeahead matches mid-word
+            query = SearchQuery(' & '.join(f'{term}:*' for term in terms), search_type='raw', config='simple')
+            text = ' '.join(terms)
+            # The expressions of the User.Meta GIN indexes, so those are used; trigram
+            # word similarity (<%) tolerates typos
+            return (
+                self.alias(search_vector=user_search_vector(), search_text=user_search_text())
+                .filter(Q(search_vector=query) | Q(search_text__trigram_word_similar=text))
+                .annotate(search_rank=SearchRank(models.F('search_vector'), query)
+                          + TrigramWordSimilarity(text, 'search_text'))
+                .order_by('-search_rank', 'id')
+            )
+
+        matches = Q()
+        for term in terms:
+            matches &= reduce(or_, (Q(**{f'{field}__icontains': term}) for field in USER_SEARCH_FIELDS))
+        return (
+            self.filter(matches)
+            .annotate(search_rank=Value(1.0, output_field=FloatField()))
+            .order_by('first_name', 'last_name', 'id')
+        )
+
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
     def create_user(self, username, email=None, password=None, **extra_fields):
         if not username: raise ValueError('Username is required')
         user = self.model(username=username, email=self.normalize_email(email), **extra_fields)
@@ -38,6 +111,19 @@ class LeaveStatus(models.TextChoices):
     APPROVED = 'APPROVED', 'Approved'
     REJECTED = 'REJECTED', 'Rejected'
 
+class LedgerReason(models.TextChoices):
+    OPENING = 'OPENING', 'Opening Balance'
+    ACCRUAL = 'ACCRUAL', 'Annual Accrual'
+    LAPSE = 'LAPSE', 'Lapsed at Year End'
+    APPROVAL = 'APPROVAL', 'Leave Approved'
+    ADJUSTMENT = 'ADJUSTMENT', 'Manual Adjustment'
+
+class JobStatus(models.TextChoices):
+    PENDING = 'PENDING', 'Pending'
+    RUNNING = 'RUNNING', 'Running'
+    DONE = 'DONE', 'Done'
+    FAILED = 'FAILED', 'Failed'
+
 
 
 class User(AbstractUser):
@@ -53,19 +139,213 @@ class User(AbstractUser):
     sick_leave_balance = models.IntegerField(default=7, null=True, blank=True)
     profile_picture = models.ImageField(upload_to='profile_pics/', null=True, blank=True)
     resume = models.FileField(upload_to='resumes/', null=True, blank=True)
+    # Size name -> stored WebP file; NULL until `manage.py process_media` runs (core.media)
+    profile_thumbnails = models.JSONField(null=True, blank=True, editable=False)
     manager = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='team')
 
     objects = UserManager()
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # PostgreSQL only (core.postgres); see UserQuerySet.search
+            GinIndex(user_search_vector(), name='user_search_vector'),
+            GinIndex(OpClass(user_search_text(), name='gin_trgm_ops'), name='user_search_text_trgm'),
+        ]
+
+def month_bounds(year, month):
+    """First day of the month and first day of the next one"""
+    start = date(year, month, 1)
+    end = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+    return start, end
+
+class AttendanceQuerySet(models.QuerySet):
+    def for_month(self, year, month):
+        """Range filter on date so the (employee, date) index can be used"""
+        start, end = month_bounds(year, month)
+        return self.filter(date__gte=start, date__lt=end)
+
+    @staticmethod
+    def summary_aggregates():
+        """Conditional aggregates computed for a set of attendance rows in one pass"""
+        return {
+            'total_days': Count('id'),
+            'present': Count('id', filter=Q(status=AttendanceStatus.PRESENT)),
+            'absent': Count('id', filter=Q(status=AttendanceStatus.ABSENT)),
+            'half_day': Count('id', filter=Q(status=AttendanceStatus.HALF_DAY)),
+            'on_leave': Count('id', filter=Q(status=AttendanceStatus.ON_LEAVE)),
+            'work_hours': Sum('work_hours'),
+            'extra_hours': Sum('extra_hours'),
+        }
+
+    @staticmethod
+    def hours_aggregates():
+        return {'work_hours': Sum('work_hours'), 'extra_hours': Sum('extra_hours')}
+
+    def hours_totals(self):
+        """Summed work and overtime hours, computed by the database"""
+        return self.aggregate(**self.hours_aggregates())
+
+    def hours_by(self, *fields):
+        """Summed work and overtime hours per distinct value of fields, e.g. 'employee'"""
+        return self.values(*fields).annotate(**self.hours_aggregates()).order_by(*fields)
+
+    def summary(self):
+        return self.aggregate(**self.summary_aggregates())
+
+    async def asummary(self):
+        return await self.aaggregate(**self.summary_aggregates())
+
+    def summary_by(self, *fields):
+        """One GROUP BY query returning a summary row per distinct value of fields"""
+        return self.values(*fields).annotate(**self.summary_aggregates()).order_by(*fields)
+
+STANDARD_WORK_HOURS = Decimal('8')
+
 class Attendance(models.Model):
     employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attendance', null=True, blank=True)
     date = models.DateField(default=timezone.now, null=True, blank=True)
     check_in = models.TimeField(null=True, blank=True)
     check_out = models.TimeField(null=True, blank=True)
-    work_hours = models.CharField(max_length=10, null=True, blank=True)
-    extra_hours = models.CharField(max_length=10, null=True, blank=True)
+    work_hours = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    extra_hours = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     status = models.CharField(max_length=20, choices=AttendanceStatus.choices, default=AttendanceStatus.ABSENT, null=True, blank=True)
 
+    objects = AttendanceQuerySet.as_manager()
+
+    # Columns the attendance rollups are derived from (see core.rollups)
+    ROLLUP_SOURCE_FIELDS = ('employee_id', 'date', 'status', 'work_hours', 'extra_hours')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'date'], name='unique_attendance_employee_date'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='attendance_date'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what was loaded so a later save() can move the rollups by the difference
+        if set(cls.ROLLUP_SOURCE_FIELDS) <= set(field_names):
+            instance._loaded_rollup_state = instance.rollup_state()
+        return instance
+
+    def rollup_state(self):
+        return tuple(getattr(self, field) for field in self.ROLLUP_SOURCE_FIELDS)
+
+    def record_check_out(self, check_out):
+        """Set check_out and derive work_hours/extra_hours from the check-in time"""
+        self.check_out = check_out
+        duration = datetime.combine(self.date, check_out) - datetime.combine(self.date, self.check_in)
+        hours = Decimal(duration.total_seconds()) / 3600
+        self.work_hours = hours.quantize(Decimal('0.01'))
+        if hours > STANDARD_WORK_HOURS:
+            self.extra_hours = (hours - STANDARD_WORK_HOURS).quantize(Decimal('0.01'))
+        else:
+            # A shorter day after a correction must not keep the earlier overtime
+            self.extra_hours = Decimal('0.00')
+
+
+class AttendanceRollupQuerySet(models.QuerySet):
+    """Same summary shape as AttendanceQuerySet, summed over pre-aggregated rows"""
+
+    @staticmethod
+    def summary_aggregates():
+        aggregates = {field: Coalesce(Sum(field), 0) for field in AttendanceRollup.COUNT_FIELDS}
+        return {**aggregates, 'work_hours': Sum('work_hours'), 'extra_hours': Sum('extra_hours')}
+
+    def summary(self):
+        return self.aggregate(**self.summary_aggregates())
+
+    async def asummary(self):
+        return await self.aaggregate(**self.summary_aggregates())
+
+    def summary_by(self, *fields):
+        return self.values(*fields).annotate(**self.summary_aggregates()).order_by(*fields)
+
+    def for_month(self, year, month):
+        """Rows of one month, whichever key (month or date) the rollup has"""
+        start, end = month_bounds(year, month)
+        field = 'month' if self.model is EmployeeMonthRollup else 'date'
+        return self.filter(**{f'{field}__gte': start, f'{field}__lt': end})
+
+
+class AttendanceRollup(models.Model):
+    """Attendance counters for one rollup key, kept in step with Attendance by core.rollups"""
+    COUNT_FIELDS = ('total_days', 'present', 'absent', 'half_day', 'on_leave')
+
+    total_days = models.IntegerField(default=0)
+    present = models.IntegerField(default=0)
+    absent = models.IntegerField(default=0)
+    half_day = models.IntegerField(default=0)
+    on_leave = models.IntegerField(default=0)
+    work_hours = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    extra_hours = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    objects = AttendanceRollupQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+
+class EmployeeMonthRollup(AttendanceRollup):
+    employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attendance_months')
+    month = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'month'], name='unique_rollup_employee_month'),
+        ]
+        indexes = [
+            models.Index(fields=['month'], name='rollup_employee_month_month'),
+        ]
+
+
+class DepartmentDayRollup(AttendanceRollup):
+    """Per-day counters by the employee's department ('' when none) at the time of the change"""
+    department = models.CharField(max_length=100, blank=True, default='')
+    date = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['department', 'date'], name='unique_rollup_department_date'),
+        ]
+        indexes = [
+            models.Index(fields=['date'], name='rollup_department_day_date'),
+        ]
+
+
+class LeavePeriod(Func):
+    """
+    DATERANGE(start, end, '[]'), the inclusive days of a leave on PostgreSQL.
+
+    The leave_no_overlap exclusion constraint indexes LeavePeriod(), so
+    overlap lookups written with it can use that GiST index.
+    """
+    function = 'DATERANGE'
+    output_field = DateRangeField()
+
+    def __init__(self, start='start_date', end='end_date'):
+        super().__init__(start, end, RangeBoundary(inclusive_lower=True, inclusive_upper=True))
+
+
+class LeaveRequestQuerySet(models.QuerySet):
+    def active(self):
+        """Requests that hold their dates: pending or approved"""
+        return self.filter(status__in=[LeaveStatus.PENDING, LeaveStatus.APPROVED])
+
+    def overlapping(self, start, end):
+        """Requests covering any day of the inclusive window start..end"""
+        queryset = self.filter(start_date__lte=end, end_date__gte=start)
+        if connections[self.db].vendor == 'postgresql':
+            # Same expression and predicate as leave_no_overlap, so its GiST index is used
+            queryset = self.alias(period=LeavePeriod()).filter(
+                period__overlap=LeavePeriod(Value(start), Value(end)), start_date__lte=models.F('end_date')
+            )
+        return queryset
+
+
 class LeaveRequest(models.Model):
     employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leaves', null=True, blank=True)
     leave_type = models.CharField(max_length=20, choices=LeaveType.choices, null=True, blank=True)
@@ -76,6 +356,57 @@ class LeaveRequest(models.Model):
     status = models.CharField(max_length=20, choices=LeaveStatus.choices, default=LeaveStatus.PENDING, null=True, blank=True)
     admin_comment = models.TextField(null=True, blank=True)
 
+    objects = LeaveRequestQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'status', 'start_date', 'end_date'], name='leave_employee_status_dates'),
+        ]
+        constraints = [
+            # An employee's pending/approved requests may not overlap; PostgreSQL only (core.postgres)
+            ExclusionConstraint(
+                name='leave_no_overlap',
+                expressions=[('employee', RangeOperators.EQUAL), (LeavePeriod(), RangeOperators.OVERLAPS)],
+                condition=Q(
+                    status__in=[LeaveStatus.PENDING, LeaveStatus.APPROVED], start_date__lte=models.F('end_date')
+                ),
+            ),
+        ]
+
+class LeaveLedgerEntry(models.Model):
+    """
+    Append-only record of every change to a leave balance.
+
+    User.paid_leave_balance / sick_leave_balance hold the running total for
+    O(1) reads; the ledger explains how it was reached and lets it be rebuilt.
+    """
+    employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='leave_ledger')
+    leave_type = models.CharField(max_length=20, choices=LeaveType.choices)
+    delta = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=LedgerReason.choices)
+    year = models.IntegerField(null=True, blank=True)
+    leave_request = models.ForeignKey(LeaveRequest, on_delete=models.SET_NULL, related_name='ledger_entries', null=True, blank=True)
+    note = models.CharField(max_length=255, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['employee', 'leave_type', 'created_at'], name='ledger_employee_type_created'),
+        ]
+        constraints = [
+            # Re-running the year-end job or double-approving must not apply twice
+            models.UniqueConstraint(
+                fields=['employee', 'leave_type', 'year', 'reason'],
+                condition=Q(reason__in=['ACCRUAL', 'LAPSE']),
+                name='unique_leave_ledger_year_end',
+            ),
+            models.UniqueConstraint(
+                fields=['leave_request'],
+                condition=Q(reason='APPROVAL'),
+                name='unique_leave_ledger_approval',
+            ),
+        ]
+
 class Payroll(models.Model):
     employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='payrolls', null=True, blank=True)
     month = models.DateField(null=True, blank=True)
@@ -85,8 +416,53 @@ class Payroll(models.Model):
     other_allowances = models.DecimalField(max_digits=10, decimal_places=2, default=0, null=True, blank=True)
     pf = models.DecimalField(max_digits=10, decimal_places=2, default=0, null=True, blank=True)
     professional_tax = models.DecimalField(max_digits=10, decimal_places=2, default=0, null=True, blank=True)
+    unpaid_days = models.DecimalField(max_digits=4, decimal_places=1, default=0, null=True, blank=True)
+    loss_of_pay = models.DecimalField(max_digits=10, decimal_places=2, default=0, null=True, blank=True)
     net_salary = models.DecimalField(max_digits=10, decimal_places=2, default=0, null=True, blank=True)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['employee', 'month'], name='unique_payroll_employee_month'),
+        ]
+
+    def compute_gross_salary(self):
+        return self.basic_salary + self.hra + self.standard_allowance + self.other_allowances
+
+    def compute_total_deductions(self):
+        return self.pf + self.professional_tax + (self.loss_of_pay or 0)
+
+    def compute_net_salary(self):
+        return self.compute_gross_salary() - self.compute_total_deductions()
+
     def save(self, *args, **kwargs):
-        self.net_salary = (self.basic_salary + self.hra) - (self.pf + self.professional_tax)
-        super().save(*args, **kwargs)
\ No newline at end of file
+        self.net_salary = self.compute_net_salary()
+        super().save(*args, **kwargs)
+
+
+class Job(models.Model):
+    """
+    Outbox row: work to do once the transaction that wrote it commits.
+
+    Written by core.jobs.enqueue() and run by `manage.py run_jobs`. A RUNNING
+    job whose locked_until has passed belongs to a dead worker and is due again.
+    """
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=JobStatus.choices, default=JobStatus.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Only unfinished jobs are polled; finished ones stay out of the index
+            models.Index(
+                fields=['status', 'run_after'],
+                condition=Q(status__in=['PENDING', 'RUNNING']),
+                name='job_unfinished',
+            ),
+        ]
@@ -0,0 +1,149 @@
+"""
+Bulk employee onboarding.
+
+import_employees() takes a batch of rows (parsed from CSV or JSON by
+read_employee_rows) and creates every valid one in a single transaction:
+
+- each row is validated with UserImportSerializer, which skips the per-row
+  uniqueness queries;
+- usernames, emails and employee IDs are checked against each other and
+  against the database with one query per key;
+- passwords are hashed in a process pool, since the password hasher is
+  deliberately slow and dominates the cost of an import;
+- users and their opening leave-ledger entries are written with
+  bulk_create (which bypasses the post_save signal that normally opens
+  the ledger).
+
+Returns one result per row, in input order, like ingest_punches().
+"""
+import csv
+import io
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import get_hasher
+from django.db import transaction
+
+from .leaves import opening_entries
+from .models import LeaveLedgerEntry, User
+from .serializers import UserImportSerializer
+
+UNIQUE_KEYS = {
+    'username': "Username already exists",
+    'email': "Email already exists",
+    'employee_id': "Employee ID already exists",
+}
+# Below this many passwords the pool costs more to start than it saves
+POOL_THRESHOLD = 16
+
+
+def read_employee_rows(content, filename=''):
+    """
+    Parse an upload into row dicts: a JSON list (or {"employees": [...]}) or
+    a CSV whose header names UserSerializer fields.
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    if filename.lower().endswith('.json') or content.lstrip().startswith(('[', '{')):
+        rows = json.loads(content)
+        if isinstance(rows, dict):
+            rows = rows.get('employees', [])
+        if not isinstance(rows, list):
+            raise ValueError("Expected a list of employees")
+    else:
+        rows = list(csv.DictReader(io.StringIO(content)))
+    return rows
+
+
+def _clean(row):
+    """Drop empty cells, so optional fields stay NULL rather than ''"""
+    return {key.strip(): value for key, value in row.items() if key and value not in ('', None)}
+
+
+def hash_passwords(passwords, workers=None):
+    """Encode passwords with the default hasher, in parallel for large batches"""
+    hasher = get_hasher('default')
+    salts = [hasher.salt() for _ in passwords]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(passwords) < POOL_THRESHOLD:
+        return [hasher.encode(password, salt) for password, salt in zip(passwords, salts)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        chunksize = max(1, len(passwords) // (workers * 4))
+        return list(pool.map(hasher.encode, passwords, salts, chunksize=chunksize))
+
+
+def _existing_values(rows):
+    """Values of each unique key already taken, one query per key"""
+    existing = {}
+    for key in UNIQUE_KEYS:
+        values = {row[key] for _, row in rows if row.get(key)}
+        existing[key] = set(
+            User.objects.filter(**{f'{key}__in': values}).values_list(key, flat=True)
+        ) if values else set()
+    return existing
+
+
+def import_employees(rows, dry_run=False, workers=None, batch_size=500):
+    """Create the valid rows (unless dry_run); other rows are reported with their errors"""
+    results = [None] * len(rows)
+
+    valid = []
+    for index, row in enumerate(rows):
+        if not isinstance(row, dict):
+            results[index] = {"index": index, "status": "error", "errors": {"non_field_errors": ["Expected an object"]}}
+            continue
+        serializer = UserImportSerializer(data=_clean(row))
+        if serializer.is_valid():
+            valid.append((index, serializer.validated_data))
+        else:
+            results[index] = {"index": index, "status": "error", "errors": serializer.errors}
+
+    existing = _existing_values(valid)
+    seen = {key: set() for key in UNIQUE_KEYS}
+    accepted = []
+    for index, data in valid:
+        errors = {}
+        for key, message in UNIQUE_KEYS.items():
+            value = data.get(key)
+            if not value:
+                continue
+            if value in existing[key]:
+                errors[key] = [message]
+            elif value in seen[key]:
+                errors[key] = [f"Duplicate {key.replace('_', ' ')} in this batch"]
+        if errors:
+            results[index] = {"index": index, "status": "error", "errors": errors}
+            continue
+        for key in UNIQUE_KEYS:
+            if data.get(key):
+                seen[key].add(data[key])
+        accepted.append((index, data))
+
+    if dry_run:
+        for index, data in accepted:
+            results[index] = {"index": index, "status": "valid", "username": data['username']}
+        return results
+
+    passwords = hash_passwords([data.pop('password') for _, data in accepted], workers)
+    users = []
+    for (index, data), password in zip(accepted, passwords):
+        data.pop('password_confirm', None)
+        users.append(User(**data, password=password))
+
+    with transaction.atomic():
+        User.objects.bulk_create(users, batch_size=batch_size)
+        if any(user.pk is None for user in users):
+            # Backends that cannot return ids from a bulk insert
+            ids = dict(
+                User.objects.filter(username__in=[user.username for user in users]).values_list('username', 'id')
+            )
+            for user in users:
+                user.pk = ids[user.username]
+        LeaveLedgerEntry.objects.bulk_create(
+            [entry for user in users for entry in opening_entries(user)], batch_size=batch_size
+        )
+
+    for (index, _), user in zip(accepted, users):
+        results[index] = {"index": index, "status": "created", "id": user.pk, "username": user.username}
+    return results
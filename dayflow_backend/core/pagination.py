@@ -0,0 +1,188 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+Cursor = namedtuple('Cursor', ['reverse', 'position'])
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset (seek) pagination over a composite, unique ordering.
+
+    DRF's CursorPagination only seeks on the first ordering field and falls
+    back to OFFSET for ties, which degrades badly when thousands of rows share
+    a date. Here the cursor carries the full ordering tuple (always ending in
+    the primary key), so every page is a single indexed range scan no matter
+    how deep the client has paged.
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'PAGINATION_MAX_PAGE_SIZE', 200)
+    ordering = ('-id',)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.fields = self._resolve_fields(queryset.model, self.ordering)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            reverse, current_position = False, None
+        else:
+            reverse, current_position = self.cursor
+
+        queryset = queryset.order_by(*self._order_expressions(reverse))
+        if current_position is not None:
+            queryset = queryset.filter(self._seek_filter(current_position, reverse))
+
+        # Fetch one extra row to find out whether another page follows.
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following = len(results) > len(self.page)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = current_position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        """Append the primary key so the ordering is total and seekable."""
+        ordering = list(super().get_ordering(request, queryset, view))
+        names = [field.lstrip('-') for field in ordering]
+        if 'id' not in names and 'pk' not in names:
+            ordering.append('-id' if ordering[0].startswith('-') else 'id')
+        return tuple(ordering)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if self.page:
+            position = self._get_position_from_instance(self.page[-1], self.ordering)
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(Cursor(reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.page:
+            position = self._get_position_from_instance(self.page[0], self.ordering)
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(Cursor(reverse=True, position=position))
+
+    def decode_cursor(self, request):
+        """Decode the opaque cursor back into typed ordering values."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            values = payload['p']
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = tuple(
+                None if value is None else field.to_python(value)
+                for (field, _), value in zip(self.fields, values)
+            )
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+        return Cursor(reverse=reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        payload = {'p': list(cursor.position)}
+        if cursor.reverse:
+            payload['r'] = 1
+        raw = json.dumps(payload, default=str, separators=(',', ':'))
+        encoded = urlsafe_b64encode(raw.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_position_from_instance(self, instance, ordering):
+        if isinstance(instance, dict):
+            return tuple(instance[field.name] for field, _ in self.fields)
+        return tuple(getattr(instance, field.attname) for field, _ in self.fields)
+
+    def _resolve_fields(self, model, ordering):
+        fields = []
+        for name in ordering:
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            field = model._meta.pk if name == 'pk' else model._meta.get_field(name)
+            fields.append((field, descending))
+        return fields
+
+    def _order_expressions(self, reverse):
+        # NULLs always sort after real values in the forward direction so the
+        # seek predicate below is the same on Postgres and SQLite.
+        nulls = {'nulls_first': True} if reverse else {'nulls_last': True}
+        expressions = []
+        for field, descending in self.fields:
+            expression = F(field.attname)
+            if descending != reverse:
+                expressions.append(expression.desc(**nulls))
+            else:
+                expressions.append(expression.asc(**nulls))
+        return expressions
+
+    def _seek_filter(self, position, reverse):
+        """Build `(a, b, c) > (x, y, z)` as an OR of prefix-equal terms."""
+        seek = Q()
+        prefix = Q()
+        for (field, descending), value in zip(self.fields, position):
+            after = self._after(field.attname, value, descending, reverse)
+            if after is not None:
+                seek |= prefix & after
+            if value is None:
+                prefix &= Q(**{f'{field.attname}__isnull': True})
+            else:
+                prefix &= Q(**{field.attname: value})
+        return seek
+
+    def _after(self, name, value, descending, reverse):
+        if reverse:
+            if value is None:
+                return Q(**{f'{name}__isnull': False})
+            lookup = 'gt' if descending else 'lt'
+            return Q(**{f'{name}__{lookup}': value})
+        if value is None:
+            return None
+        lookup = 'lt' if descending else 'gt'
+        return Q(**{f'{name}__{lookup}': value}) | Q(**{f'{name}__isnull': True})
+
+
+class UserPagination(KeysetPagination):
+    ordering = ('id',)
+
+
+class AttendancePagination(KeysetPagination):
+    ordering = ('-date', '-id')
+
+
+class LeavePagination(KeysetPagination):
+    ordering = ('-start_date', '-id')
+
+
+class PayrollPagination(KeysetPagination):
+    ordering = ('-month', '-id')
@@ -0,0 +1,274 @@
+"""
+Payroll calculation and month-end payroll runs.
+
+PayrollCalculator pro-rates pay from attendance and unpaid leave. A run takes
+a month and a salary-structure template and produces one Payroll row per
+active employee. Everything is computed and validated in memory and written
+with a single bulk_create/bulk_update inside one transaction, so a run over
+thousands of employees costs a handful of queries.
+
+A run that writes plans inside its write transaction, under a lock on the
+month's payslips. It also enqueues a 'payroll.published' job (core.jobs).
+"""
+import calendar
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from .jobs import enqueue, job
+from .models import Attendance, AttendanceStatus, LeaveRequest, LeaveStatus, LeaveType, Payroll, User
+from .response_cache import bump_on_commit
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal('0.01')
+AMOUNT_FIELDS = [
+    'basic_salary', 'hra', 'standard_allowance',
+    'other_allowances', 'pf', 'professional_tax',
+]
+
+
+def to_amount(value):
+    return Decimal(value or 0).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def payroll_amount_errors(amounts):
+    """
+    Sanity checks shared by PayrollSerializer and payroll runs.
+
+    Returns a {field: message} dict for the first failing rule, or {}.
+    """
+    for field in AMOUNT_FIELDS:
+        if Decimal(amounts.get(field) or 0) < 0:
+            return {field: "Amount cannot be negative"}
+
+    basic_salary = Decimal(amounts.get('basic_salary') or 0)
+    # PF is typically 12% of basic
+    if basic_salary > 0 and Decimal(amounts.get('pf') or 0) > basic_salary * Decimal('0.15'):
+        return {"pf": "PF amount seems too high (should be around 12% of basic)"}
+    # HRA is typically 40-50% of basic
+    if basic_salary > 0 and Decimal(amounts.get('hra') or 0) > basic_salary * Decimal('0.60'):
+        return {"hra": "HRA amount seems too high (should be 40-50% of basic)"}
+    return {}
+
+
+class PayrollCalculator:
+    """
+    Pro-rate a month's pay from attendance and unpaid leave.
+
+    Each ABSENT day counts as one unpaid day, each HALF_DAY as half, and each
+    day of an approved UNPAID leave as one (a day is never counted twice).
+    Loss of pay is gross salary / days in month per unpaid day.
+
+    prefetch() loads the month's attendance and leave for any number of
+    employees in two queries; adjustments() is then pure computation, so
+    pricing the whole company does not cost a query per employee.
+    """
+    unpaid_attendance = {AttendanceStatus.ABSENT: Decimal('1'), AttendanceStatus.HALF_DAY: Decimal('0.5')}
+
+    def __init__(self, month):
+        self.first_day = month.replace(day=1)
+        self.days_in_month = calendar.monthrange(month.year, month.month)[1]
+        self.last_day = self.first_day.replace(day=self.days_in_month)
+        self.unpaid = defaultdict(dict)
+
+    def prefetch(self, employee_ids=None):
+        """Load unpaid days for employee_ids (or everyone) into memory"""
+        attendance = Attendance.objects.filter(
+            date__gte=self.first_day, date__lte=self.last_day,
+            status__in=list(self.unpaid_attendance),
+        )
+        leaves = LeaveRequest.objects.filter(
+            status=LeaveStatus.APPROVED, leave_type=LeaveType.UNPAID,
+            start_date__lte=self.last_day, end_date__gte=self.first_day,
+        )
+        if employee_ids is not None:
+            attendance = attendance.filter(employee_id__in=employee_ids)
+            leaves = leaves.filter(employee_id__in=employee_ids)
+
+        for employee_id, day, attendance_status in attendance.values_list('employee_id', 'date', 'status'):
+            self.unpaid[employee_id][day] = self.unpaid_attendance[attendance_status]
+        for employee_id, start, end in leaves.values_list('employee_id', 'start_date', 'end_date'):
+            day = max(start, self.first_day)
+            while day <= min(end, self.last_day):
+                self.unpaid[employee_id][day] = Decimal('1')
+                day += timedelta(days=1)
+        return self
+
+    def unpaid_days(self, employee_id):
+        return sum(self.unpaid.get(employee_id, {}).values(), Decimal('0'))
+
+    def adjustments(self, employee_id, amounts):
+        """Return the unpaid_days/loss_of_pay fields for one employee's amounts"""
+        unpaid_days = min(self.unpaid_days(employee_id), Decimal(self.days_in_month))
+        gross = sum(Decimal(amounts.get(field) or 0) for field in (
+            'basic_salary', 'hra', 'standard_allowance', 'other_allowances'
+        ))
+        return {
+            'unpaid_days': unpaid_days,
+            'loss_of_pay': to_amount(gross * unpaid_days / self.days_in_month),
+        }
+
+    def recalculate(self, payrolls):
+        """Re-price existing Payroll rows in memory; returns the rows that changed"""
+        changed = []
+        for payroll in payrolls:
+            before = (payroll.unpaid_days, payroll.loss_of_pay, payroll.net_salary)
+            amounts = {field: getattr(payroll, field) for field in AMOUNT_FIELDS}
+            for field, value in self.adjustments(payroll.employee_id, amounts).items():
+                setattr(payroll, field, value)
+            payroll.net_salary = payroll.compute_net_salary()
+            if before != (payroll.unpaid_days, payroll.loss_of_pay, payroll.net_salary):
+                changed.append(payroll)
+        return changed
+
+    def recalculate_month(self, batch_size=1000):
+        """Re-price every stored Payroll row of the month with one bulk_update"""
+        self.prefetch()
+        changed = self.recalculate(Payroll.objects.filter(
+            month__gte=self.first_day, month__lte=self.last_day
+        ))
+        Payroll.objects.bulk_update(
+            changed, ['unpaid_days', 'loss_of_pay', 'net_salary'], batch_size=batch_size
+        )
+        if changed:
+            bump_on_commit('payroll')
+        return changed
+
+
+class PayrollRun:
+    """
+    Generate a month's payroll from a salary-structure template.
+
+    The template (see SalaryTemplateSerializer) gives HRA and PF as a
+    percentage of basic plus flat allowances and professional tax. Each
+    employee's basic salary comes from, in order: a per-employee override in
+    the template, their most recent earlier Payroll row, or the template's
+    default basic_salary.
+    """
+    batch_size = 1000
+
+    def __init__(self, month, template, replace=False):
+        self.month = month
+        self.template = template
+        self.replace = replace
+        self.calculator = PayrollCalculator(month)
+
+    def employees(self):
+        latest_basic = Payroll.objects.filter(
+            employee=OuterRef('pk'), month__lt=self.month
+        ).order_by('-month').values('basic_salary')[:1]
+        return (
+            User.objects.filter(is_active=True)
+            .only('id', 'username', 'employee_id')
+            .annotate(previous_basic=Subquery(latest_basic))
+            .order_by('id')
+        )
+
+    def compute(self, employee):
+        """Return the payroll amounts for one employee as a dict of Decimals"""
+        template = self.template
+        override = template.get('overrides', {}).get(employee.employee_id or '', {})
+        basic_salary = to_amount(
+            override.get('basic_salary', employee.previous_basic or template['basic_salary'])
+        )
+        amounts = {
+            'basic_salary': basic_salary,
+            'hra': to_amount(basic_salary * template['hra_percent'] / 100),
+            'standard_allowance': to_amount(override.get('standard_allowance', template['standard_allowance'])),
+            'other_allowances': to_amount(override.get('other_allowances', template['other_allowances'])),
+            'pf': to_amount(basic_salary * template['pf_percent'] / 100),
+            'professional_tax': to_amount(override.get('professional_tax', template['professional_tax'])),
+        }
+        amounts.update(self.calculator.adjustments(employee.pk, amounts))
+        return amounts
+
+    def plan(self, lock=False):
+        """
+        Compute every employee's payroll and compare it with what is stored.
+
+        Returns (rows, results) where rows maps action -> list of Payroll
+        instances to write and results is the per-employee diff. With lock,
+        the month's payslips stay locked until the caller's transaction ends.
+        """
+        self.calculator.prefetch()
+        stored = Payroll.objects.filter(month=self.month)
+        if lock:
+            stored = stored.select_for_update()
+        existing = {payroll.employee_id: payroll for payroll in stored}
+        rows = {'create': [], 'update': []}
+        results = []
+
+        for employee in self.employees().iterator(chunk_size=self.batch_size):
+            amounts = self.compute(employee)
+            result = {"employee": employee.pk, "employee_id": employee.employee_id}
+
+            errors = payroll_amount_errors(amounts)
+            if errors:
+                results.append({**result, "action": "error", "errors": errors})
+                continue
+
+            payroll = existing.get(employee.pk)
+            if payroll is None:
+                payroll = Payroll(employee_id=employee.pk, month=self.month, **amounts)
+                payroll.net_salary = payroll.compute_net_salary()
+                rows['create'].append(payroll)
+                results.append({**result, "action": "create", "net_salary": payroll.net_salary})
+                continue
+
+            changes = {
+                field: [getattr(payroll, field), value]
+                for field, value in amounts.items()
+                if getattr(payroll, field) != value
+            }
+            if not changes:
+                results.append({**result, "action": "unchanged", "net_salary": payroll.net_salary})
+            elif not self.replace:
+                results.append({**result, "action": "skipped", "changes": changes})
+            else:
+                for field, value in amounts.items():
+                    setattr(payroll, field, value)
+                payroll.net_salary = payroll.compute_net_salary()
+                rows['update'].append(payroll)
+                results.append({**result, "action": "update", "changes": changes, "net_salary": payroll.net_salary})
+
+        return rows, results
+
+    def execute(self, dry_run=False):
+        """Plan the run and, unless dry_run, write it in the same transaction"""
+        if dry_run:
+            rows, results = self.plan()
+        else:
+            with transaction.atomic():
+                rows, results = self.plan(lock=True)
+                Payroll.objects.bulk_create(rows['create'], batch_size=self.batch_size)
+                Payroll.objects.bulk_update(
+                    rows['update'], AMOUNT_FIELDS + ['unpaid_days', 'loss_of_pay', 'net_salary'],
+                    batch_size=self.batch_size
+                )
+                # Bulk writes skip the signals that expire cached payroll responses
+                bump_on_commit('payroll')
+                published = [payroll.employee_id for payroll in rows['create'] + rows['update']]
+                if published:
+                    enqueue('payroll.published', {'month': self.month.isoformat(), 'employee_ids': published})
+
+        summary = {}
+        for result in results:
+            summary[result['action']] = summary.get(result['action'], 0) + 1
+        return {
+            "month": self.month,
+            "dry_run": dry_run,
+            "summary": summary,
+            "results": results,
+        }
+
+
+@job('payroll.published')
+def notify_payroll_published(month, employee_ids):
+    """Hook for payslip notices; no mail is configured, so it only logs who is due one"""
+    recipients = User.objects.filter(pk__in=employee_ids, is_active=True).exclude(email='').count()
+    logger.info(f"Payslips for {month[:7]} published; {recipients} employee(s) to notify")
@@ -0,0 +1,29 @@
+"""
+Migration operations for PostgreSQL-only schema.
+
+The leave_no_overlap exclusion constraint and the user search GIN indexes
+are declared on LeaveRequest and User, so the migration state, makemigrations
+and inspectdb know about them. The migrations add them with these operations,
+which, like django.contrib.postgres's CreateExtension, do nothing on other
+databases; there the querysets fall back to plain lookups
+(LeaveRequestQuerySet.overlapping, UserQuerySet.search).
+"""
+from django.db import migrations
+
+
+class PostgresOnly:
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+
+
+class AddPostgresConstraint(PostgresOnly, migrations.AddConstraint):
+    pass
+
+
+class AddPostgresIndex(PostgresOnly, migrations.AddIndex):
+    pass
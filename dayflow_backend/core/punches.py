@@ -0,0 +1,148 @@
+"""
+Batch ingestion of door-terminal punches into Attendance rows.
+
+Terminals buffer (employee_id, timestamp, direction) punches and upload them
+in bulk. A punch batch is folded into one Attendance row per employee and
+day: the earliest IN becomes check_in and the latest OUT becomes check_out.
+Because that fold is a min/max it is idempotent, so replaying a batch (or an
+overlapping one) leaves the rows unchanged.
+"""
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Attendance, AttendanceStatus, User
+from .rollups import rebuild_rollups_soon
+
+IN = 'in'
+OUT = 'out'
+
+
+class _DayPunches:
+    """Earliest IN and latest OUT seen for one employee on one day"""
+
+    def __init__(self):
+        self.first_in = None
+        self.last_out = None
+        self.indexes = []
+
+    def add(self, index, direction, moment):
+        self.indexes.append(index)
+        if direction == IN:
+            self.first_in = moment if self.first_in is None else min(self.first_in, moment)
+        else:
+            self.last_out = moment if self.last_out is None else max(self.last_out, moment)
+
+
+def _merge(attendance, day):
+    """Fold a day's punches into an Attendance row; return whether it changed"""
+    before = (attendance.check_in, attendance.check_out, attendance.status)
+
+    if day.first_in is not None and (attendance.check_in is None or day.first_in < attendance.check_in):
+        attendance.check_in = day.first_in
+    if attendance.check_in is not None and attendance.status in (None, AttendanceStatus.ABSENT):
+        attendance.status = AttendanceStatus.PRESENT
+
+    check_out = attendance.check_out
+    if day.last_out is not None and (check_out is None or day.last_out > check_out):
+        check_out = day.last_out
+    if check_out is not None and attendance.check_in is not None and check_out > attendance.check_in:
+        if check_out != attendance.check_out or before[0] != attendance.check_in:
+            attendance.record_check_out(check_out)
+
+    return before != (attendance.check_in, attendance.check_out, attendance.status)
+
+
+def ingest_punches(punches, attempts=2):
+    """
+    Apply validated punches ({'employee_id', 'timestamp', 'direction'}) in bulk.
+
+    Employees and existing rows are each loaded with one query; new rows are
+    written with one bulk_create and changed rows with one bulk_update, all in
+    a single transaction. Returns one result dict per punch, in input order.
+    """
+    results = [None] * len(punches)
+
+    codes = {punch['employee_id'] for punch in punches}
+    employees = dict(
+        User.objects.filter(employee_id__in=codes, is_active=True).values_list('employee_id', 'id')
+    )
+
+    days = defaultdict(_DayPunches)
+    for index, punch in enumerate(punches):
+        user_id = employees.get(punch['employee_id'])
+        if user_id is None:
+            results[index] = {"index": index, "status": "error", "error": "Unknown or inactive employee"}
+            continue
+        moment = timezone.localtime(punch['timestamp'])
+        days[(user_id, moment.date())].add(index, punch['direction'], moment.time().replace(microsecond=0))
+
+    if days:
+        for attempt in range(attempts):
+            try:
+                outcomes = _write_days(days)
+                break
+            except IntegrityError:
+                # A live check-in created one of our rows after we read; re-read and retry.
+                if attempt == attempts - 1:
+                    raise
+        for key, day in days.items():
+            outcome = outcomes[key]
+            for index in day.indexes:
+                results[index] = {"index": index, **outcome}
+
+    return results
+
+
+def _write_days(days):
+    user_ids = {user_id for user_id, _ in days}
+    dates = [day for _, day in days]
+    employees_by_date = defaultdict(set)
+    for user_id, day in days:
+        employees_by_date[day].add(user_id)
+    # Only the rows of this batch: a bounding box would lock other employees' days too
+    pairs = reduce(or_, (
+        Q(date=day, employee_id__in=employee_ids) for day, employee_ids in employees_by_date.items()
+    ))
+
+    with transaction.atomic():
+        existing = {
+            (row.employee_id, row.date): row
+            for row in Attendance.objects.select_for_update().filter(pairs)
+        }
+
+        outcomes = {}
+        to_create, to_update = [], []
+        for key, day in days.items():
+            attendance = existing.get(key)
+            if attendance is None:
+                if day.first_in is None:
+                    outcomes[key] = {"status": "error", "error": "No check-in recorded for this date"}
+                    continue
+                attendance = Attendance(employee_id=key[0], date=key[1], status=AttendanceStatus.PRESENT)
+                _merge(attendance, day)
+                to_create.append((key, attendance))
+            elif _merge(attendance, day):
+                to_update.append((key, attendance))
+            else:
+                outcomes[key] = {"status": "unchanged", "attendance": attendance.pk}
+
+        Attendance.objects.bulk_create([attendance for _, attendance in to_create], batch_size=1000)
+        Attendance.objects.bulk_update(
+            [attendance for _, attendance in to_update],
+            ['check_in', 'check_out', 'work_hours', 'extra_hours', 'status'],
+            batch_size=1000,
+        )
+        # bulk writes bypass the rollup signals
+        if to_create or to_update:
+            rebuild_rollups_soon(min(dates), max(dates), employee_ids=user_ids)
+
+    for key, attendance in to_create:
+        outcomes[key] = {"status": "created", "attendance": attendance.pk}
+    for key, attendance in to_update:
+        outcomes[key] = {"status": "updated", "attendance": attendance.pk}
+    return outcomes
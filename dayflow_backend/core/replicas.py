@@ -0,0 +1,64 @@
+"""
+Read replica routing.
+
+Reads go to the 'replica' database alias (see dayflow_backend/database.py)
+only inside use_replica(), which ReplicaReadMixin enters for a viewset's
+`replica_actions`. Everything else, and every write, stays on 'default',
+so a user never reads their own just-written check-in from a lagging replica
+outside the endpoints that opted in. Actions wrapped in cached_response()
+(core.response_cache) still fill the cache from 'default'; only their hits
+skip the database altogether.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+REPLICA = 'replica'
+
+reading_from_replica = ContextVar('reading_from_replica', default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+@contextmanager
+def use_replica(enabled=True):
+    """Route ORM reads in the enclosed block (and threads it awaits) to the replica"""
+    token = reading_from_replica.set(enabled)
+    try:
+        yield
+    finally:
+        reading_from_replica.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if reading_from_replica.get() and replica_configured():
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as default
+        if {obj1._state.db, obj2._state.db} <= {'default', REPLICA}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA:
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+    """Serve the viewset actions listed in `replica_actions` from the replica"""
+    replica_actions = ()
+
+    def dispatch(self, request, *args, **kwargs):
+        action = getattr(self, 'action_map', {}).get(request.method.lower())
+        with use_replica(action in self.replica_actions):
+            return super().dispatch(request, *args, **kwargs)
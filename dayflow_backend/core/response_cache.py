@@ -0,0 +1,112 @@
+"""
+Per-user caching of read-heavy API responses.
+
+Views decorated with cached_response() store the response data of a 200 in
+the default cache, keyed by the user, the full request path and the current
+value of one or more version counters. Writes bump the counters (signals in
+core.signals, plus the bulk code paths that bypass them) once their
+transaction commits, so stale entries are never read again and simply age
+out after RESPONSE_CACHE['TTL']. A miss is always computed on the primary,
+even in a replica action (core.replicas): a lagging replica read stored
+under a version that was just bumped would be served until the TTL.
+
+Counters:
+    'payroll'            any Payroll row, or an employee's name/department
+    'attendance'         any attendance row or rollup
+    'attendance:<id>'    one employee's attendance rows
+    'attendance:*'       everyone's, after a full rollup rebuild
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+from .replicas import use_replica
+
+DEFAULTS = {
+    'TTL': 300,
+    'DASHBOARD_TTL': 60,
+}
+
+
+def response_cache_settings():
+    return {**DEFAULTS, **getattr(settings, 'RESPONSE_CACHE', {})}
+
+
+def _version_key(scope):
+    return f'response-version:{scope}'
+
+
+def versions(scopes):
+    """Current value of each counter, starting a missing one"""
+    keys = [_version_key(scope) for scope in scopes]
+    current = cache.get_many(keys)
+    for key in keys:
+        if key not in current:
+            # Start from the clock, so a counter evicted and restarted never
+            # repeats a value that old entries were stored under
+            cache.add(key, time.time_ns(), timeout=None)
+            current[key] = cache.get(key)
+    return [current[key] for key in keys]
+
+
+def bump_versions(*scopes):
+    for scope in scopes:
+        try:
+            cache.incr(_version_key(scope))
+        except ValueError:
+            cache.add(_version_key(scope), time.time_ns(), timeout=None)
+
+
+def bump_on_commit(*scopes):
+    """Bump once the current transaction commits, so no reader caches the old rows under the new version"""
+    transaction.on_commit(lambda: bump_versions(*scopes))
+
+
+def attendance_scopes(employee_ids):
+    """Counters to bump when these employees' attendance changes ('*' for all)"""
+    return ['attendance', *(f'attendance:{employee_id}' for employee_id in employee_ids)]
+
+
+def payroll_scopes(view, request):
+    return ['payroll']
+
+
+def summary_scopes(view, request):
+    """Admins may see anyone's figures; an employee only their own"""
+    if request.user.role == 'ADMIN':
+        return ['attendance']
+    return [f'attendance:{request.user.pk}', 'attendance:*']
+
+
+def cached_response(scopes):
+    """
+    Cache a DRF view method's successful responses per user.
+
+    scopes(view, request) returns the counters the response depends on.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            ttl = response_cache_settings()['TTL']
+            if not ttl:
+                return method(view, request, *args, **kwargs)
+
+            path = hashlib.sha256(request.get_full_path().encode()).hexdigest()
+            version = '.'.join(str(value) for value in versions(scopes(view, request)))
+            key = f'response:{view.basename}:{view.action}:{request.user.pk}:{version}:{path}'
+            data = cache.get(key)
+            if data is not None:
+                return Response(data)
+
+            with use_replica(False):
+                response = method(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, ttl)
+            return response
+        return wrapper
+    return decorator
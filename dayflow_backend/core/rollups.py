@@ -0,0 +1,233 @@
+"""
+Attendance rollups.
+
+EmployeeMonthRollup and DepartmentDayRollup hold the counters that
+monthly_summary and the dashboards report, so reading them costs the same
+however long the attendance history gets.
+
+Single-row writes (check-in, check-out, admin edits and deletes) move the
+rollups by the difference between the row's old and new state (see
+core.signals). In the writing transaction that is one INSERT ... ON CONFLICT
+DO UPDATE on the employee's own month row; the department-day delta, whose
+row every check-in of a department on that day would queue on, is handed to
+the job worker as a 'rollups.department_days' job and lands a moment after
+the commit. Today's dashboard figures are read from Attendance, so they do
+not wait for it. Bulk writes, which bypass signals, and repairs call
+rebuild_rollups() for the affected range; request paths go through
+rebuild_rollups_soon(), which can defer the rebuild to the job worker
+(JOBS['DEFER_ROLLUP_REBUILDS']).
+
+Locking: an increment holds a row lock on the rollup row it moves until its
+transaction commits. rebuild_rollups() locks the rows it is about to rewrite
+before reading Attendance, so an increment either committed before its
+snapshot or waits and is applied on top of the rebuilt values.
+"""
+from collections import Counter, defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.db.models.functions import TruncMonth
+
+from .jobs import enqueue, job, jobs_settings
+from .models import Attendance, AttendanceStatus, DepartmentDayRollup, EmployeeMonthRollup, User
+from .response_cache import attendance_scopes, bump_on_commit
+
+STATUS_COUNTERS = {
+    AttendanceStatus.PRESENT: 'present',
+    AttendanceStatus.ABSENT: 'absent',
+    AttendanceStatus.HALF_DAY: 'half_day',
+    AttendanceStatus.ON_LEAVE: 'on_leave',
+}
+ROLLUP_FIELDS = ['total_days', 'present', 'absent', 'half_day', 'on_leave', 'work_hours', 'extra_hours']
+
+
+def _counters(state, sign=1):
+    """Counter deltas contributed by one attendance state (see Attendance.rollup_state)"""
+    _, _, attendance_status, work_hours, extra_hours = state
+    counters = Counter({'total_days': sign})
+    if attendance_status in STATUS_COUNTERS:
+        counters[STATUS_COUNTERS[attendance_status]] += sign
+    counters['work_hours'] += sign * Decimal(work_hours or 0)
+    counters['extra_hours'] += sign * Decimal(extra_hours or 0)
+    return counters
+
+
+def _increment(model, key, deltas):
+    """Add deltas to the rollup row for key in one statement, creating it if rows were added"""
+    deltas = {field: value for field, value in deltas.items() if value}
+    if not deltas:
+        return
+    if deltas.get('total_days', 0) <= 0:
+        # Nothing to create; e.g. the employee's rollups went with them in a cascade
+        model.objects.filter(**key).update(**{field: F(field) + value for field, value in deltas.items()})
+        return
+
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    values = {**key, **{field: deltas.get(field, 0) for field in ROLLUP_FIELDS}}
+    fields = [model._meta.get_field(name) for name in values]
+    columns = [quote(field.column) for field in fields]
+    key_columns = [quote(model._meta.get_field(name).column) for name in key]
+    increments = ', '.join(
+        f'{column} = {table}.{column} + EXCLUDED.{column}'
+        for column in (quote(model._meta.get_field(field).column) for field in deltas)
+    )
+    # Same statement on PostgreSQL and SQLite
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+            f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET {increments}",
+            [field.get_db_prep_save(value, connection) for field, value in zip(fields, values.values())],
+        )
+
+
+def apply_attendance_change(old_state, new_state):
+    """
+    Move the rollups from an attendance row's old state to its new one.
+
+    Either state may be None (row created or deleted). Rows without an
+    employee or date are not counted.
+    """
+    changes = [
+        (state, sign) for state, sign in [(old_state, -1), (new_state, 1)]
+        if state is not None and state[0] is not None and state[1] is not None
+    ]
+    if not changes or old_state == new_state:
+        return
+
+    months, days = defaultdict(Counter), defaultdict(Counter)
+    for state, sign in changes:
+        employee_id, day = state[0], state[1]
+        counters = _counters(state, sign)
+        months[(employee_id, day.replace(day=1))].update(counters)
+        days[(employee_id, day)].update(counters)
+
+    for (employee_id, month), deltas in months.items():
+        _increment(EmployeeMonthRollup, {'employee_id': employee_id, 'month': month}, deltas)
+    changed_days = [
+        [employee_id, day.isoformat(), {field: str(value) for field, value in deltas.items() if value}]
+        for (employee_id, day), deltas in days.items()
+        if any(deltas.values())
+    ]
+    if changed_days:
+        enqueue('rollups.department_days', {'changes': changed_days})
+    bump_on_commit(*attendance_scopes({employee_id for employee_id, _ in months}))
+
+
+@job('rollups.department_days')
+def apply_department_day_changes(changes):
+    """Add the department-day deltas recorded by apply_attendance_change()"""
+    departments = dict(
+        User.objects.filter(pk__in={employee_id for employee_id, _, _ in changes}).values_list('id', 'department')
+    )
+    days = defaultdict(Counter)
+    for employee_id, day, deltas in changes:
+        days[(departments.get(employee_id) or '', date.fromisoformat(day))].update(
+            {field: Decimal(value) for field, value in deltas.items()}
+        )
+    for (department, day), deltas in days.items():
+        _increment(DepartmentDayRollup, {'department': department, 'date': day}, deltas)
+    bump_on_commit('attendance')
+
+
+def _month_end(day):
+    next_month = (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return next_month - timedelta(days=1)
+
+
+def rebuild_rollups(start, end, employee_ids=None, batch_size=2000):
+    """
+    Recompute the rollups covering start..end from Attendance.
+
+    Employee-month rows are rebuilt for every month touching the window and
+    department-day rows for every day in it; with employee_ids, only those
+    employees' months and their departments' days. Each side is one locking
+    SELECT, one GROUP BY query, one bulk upsert and a delete of rows left
+    with no attendance. Returns (month rows, day rows) written.
+    """
+    first_month, last_day = start.replace(day=1), _month_end(end)
+    attendance = Attendance.objects.filter(employee__isnull=False)
+    month_rows = EmployeeMonthRollup.objects.filter(month__gte=first_month, month__lte=end)
+    day_rows = DepartmentDayRollup.objects.filter(date__gte=start, date__lte=end)
+    day_attendance = attendance.filter(date__gte=start, date__lte=end)
+
+    if employee_ids is not None:
+        attendance = attendance.filter(employee_id__in=employee_ids)
+        month_rows = month_rows.filter(employee_id__in=employee_ids)
+        departments = {
+            department or ''
+            for department in User.objects.filter(pk__in=employee_ids).values_list('department', flat=True)
+        }
+        in_departments = Q(employee__department__in=departments)
+        if '' in departments:
+            in_departments |= Q(employee__department__isnull=True)
+        day_rows = day_rows.filter(department__in=departments)
+        day_attendance = day_attendance.filter(in_departments)
+
+    with transaction.atomic():
+        # Lock first (see the module docstring); rows are then updated in place,
+        # so increments waiting on the locks land on the rebuilt values
+        existing_months = {
+            (employee_id, month): pk
+            for pk, employee_id, month in month_rows.select_for_update().values_list('pk', 'employee_id', 'month')
+        }
+        existing_days = {
+            (department, day): pk
+            for pk, department, day in day_rows.select_for_update().values_list('pk', 'department', 'date')
+        }
+
+        months = [
+            EmployeeMonthRollup(
+                employee_id=row['employee_id'], month=row['rollup_month'],
+                **{field: row[field] or 0 for field in ROLLUP_FIELDS}
+            )
+            for row in attendance.filter(date__gte=first_month, date__lte=last_day)
+            .annotate(rollup_month=TruncMonth('date'))
+            .summary_by('employee_id', 'rollup_month')
+        ]
+
+        # NULL and '' departments share one rollup row
+        days = defaultdict(Counter)
+        for row in day_attendance.summary_by('employee__department', 'date'):
+            days[(row['employee__department'] or '', row['date'])].update(
+                {field: row[field] or 0 for field in ROLLUP_FIELDS}
+            )
+
+        EmployeeMonthRollup.objects.bulk_create(
+            months, batch_size=batch_size, update_conflicts=True,
+            unique_fields=['employee', 'month'], update_fields=ROLLUP_FIELDS,
+        )
+        DepartmentDayRollup.objects.bulk_create([
+            DepartmentDayRollup(department=department, date=day, **counters)
+            for (department, day), counters in days.items()
+        ], batch_size=batch_size, update_conflicts=True,
+            unique_fields=['department', 'date'], update_fields=ROLLUP_FIELDS)
+
+        rebuilt_months = {(row.employee_id, row.month) for row in months}
+        EmployeeMonthRollup.objects.filter(
+            pk__in=[pk for key, pk in existing_months.items() if key not in rebuilt_months]
+        ).delete()
+        DepartmentDayRollup.objects.filter(
+            pk__in=[pk for key, pk in existing_days.items() if key not in days]
+        ).delete()
+        bump_on_commit(*attendance_scopes(employee_ids if employee_ids is not None else ['*']))
+    return len(months), len(days)
+
+
+def rebuild_rollups_soon(start, end, employee_ids=None):
+    """rebuild_rollups() now, or as a job when JOBS['DEFER_ROLLUP_REBUILDS'] is set"""
+    if not jobs_settings()['DEFER_ROLLUP_REBUILDS']:
+        rebuild_rollups(start, end, employee_ids=employee_ids)
+        return
+    enqueue('rollups.rebuild', {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'employee_ids': sorted(employee_ids) if employee_ids is not None else None,
+    })
+
+
+@job('rollups.rebuild')
+def rebuild_rollups_job(start, end, employee_ids=None):
+    rebuild_rollups(date.fromisoformat(start), date.fromisoformat(end), employee_ids=employee_ids)
@@ -1,8 +1,14 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.contrib.auth.validators import UnicodeUsernameValidator
 from django.contrib.auth.password_validation import validate_password
+from django.db import transaction
 from .models import Attendance, LeaveRequest, Payroll
-from datetime import date
+from .leaves import BALANCE_FIELDS, adjustment_entries, apply_ledger_entries
+from .media import can_view, media_settings, signed_url
+from .metrics import TimedSerializerMixin
+from .payroll import payroll_amount_errors
+from datetime import date, timedelta
 from decimal import Decimal
 
 User = get_user_model()
@@ -14,7 +20,40 @@ class UserLoginSerializer(serializers.Serializer):
     password = serializers.CharField(required=True, write_only=True, style={'input_type': 'password'})
 
 
-class UserSerializer(serializers.ModelSerializer):
+class SignedFileMixin:
+    """
+    Upload size limit on the way in; a signed /core/media/ URL on the way out,
+    for the owner of the object or an admin only (core.media).
+    """
+
+    def to_internal_value(self, data):
+        limit = media_settings()['MAX_UPLOAD_SIZE']
+        if getattr(data, 'size', 0) > limit:
+            raise serializers.ValidationError(f"File too large (max {limit // (1024 * 1024)} MB)")
+        return super().to_internal_value(data)
+
+    def to_representation(self, value):
+        if not value:
+            return None
+        request = self.context.get('request')
+        if request is not None and not can_view(request.user, value.instance):
+            return None
+        return signed_url(value.name, request)
+
+
+class SignedFileField(SignedFileMixin, serializers.FileField):
+    pass
+
+
+class SignedImageField(SignedFileMixin, serializers.ImageField):
+    pass
+
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    profile_picture = SignedImageField(required=False, allow_null=True)
+    resume = SignedFileField(required=False, allow_null=True)
+    # Signed URLs of the avatar thumbnails by size; null until they are made
+    profile_thumbnails = serializers.SerializerMethodField()
     password = serializers.CharField(
         write_only=True,
         required=True,
@@ -34,7 +73,7 @@ class UserSerializer(serializers.ModelSerializer):
             'first_name', 'last_name', 'role', 'employee_id',
             'department', 'designation', 'phone', 'address',
             'location', 'joining_date', 'paid_leave_balance',
-            'sick_leave_balance', 'profile_picture', 'resume',
+            'sick_leave_balance', 'profile_picture', 'profile_thumbnails', 'resume',
             'is_active', 'date_joined', 'last_login'
         ]
         read_only_fields = ['id', 'date_joined', 'last_login']
@@ -44,6 +83,14 @@ class UserSerializer(serializers.ModelSerializer):
             'last_name': {'required': True},
         }
 
+    def get_profile_thumbnails(self, obj):
+        if not obj.profile_thumbnails:
+            return None
+        request = self.context.get('request')
+        if request is not None and not can_view(request.user, obj):
+            return None
+        return {size: signed_url(name, request) for size, name in obj.profile_thumbnails.items()}
+
     def validate_email(self, value):
         """Validate email uniqueness"""
         user = self.instance
@@ -95,23 +142,52 @@ class UserSerializer(serializers.ModelSerializer):
         return User.objects.create_user(**validated_data)
 
     def update(self, instance, validated_data):
-        """Update user, handling password separately"""
+        """Update user, handling password and leave balances separately"""
         password = validated_data.pop('password', None)
         validated_data.pop('password_confirm', None)
+        balances = {
+            field: validated_data.pop(field) for field in BALANCE_FIELDS.values() if field in validated_data
+        }
         
         # Update user fields
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
+        update_fields = list(validated_data)
         
         # Update password if provided
         if password:
             instance.set_password(password)
+            update_fields.append('password')
         
-        instance.save()
+        with transaction.atomic():
+            # Only the edited columns: a full save would overwrite concurrent F() balance updates
+            if update_fields:
+                instance.save(update_fields=update_fields)
+            if balances:
+                # A balance edit becomes an ADJUSTMENT delta against the stored
+                # value, applied with F() like every other balance change
+                previous_balances = {field: getattr(instance, field) for field in BALANCE_FIELDS.values()}
+                previous_balances.update(
+                    User.objects.select_for_update().filter(pk=instance.pk).values(*balances).get()
+                )
+                for field, value in balances.items():
+                    setattr(instance, field, value)
+                apply_ledger_entries(
+                    adjustment_entries(instance, previous_balances, note="Edited on user profile")
+                )
         return instance
 
 
-class AttendanceSerializer(serializers.ModelSerializer):
+class UserListSerializer(UserSerializer):
+    """Employee list rows: thumbnail URLs instead of the full picture and resume"""
+
+    class Meta(UserSerializer.Meta):
+        fields = [
+            field for field in UserSerializer.Meta.fields if field not in ('profile_picture', 'resume')
+        ]
+
+
+class AttendanceSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     employee_name = serializers.CharField(source='employee.get_full_name', read_only=True)
     employee_username = serializers.CharField(source='employee.username', read_only=True)
     
@@ -123,6 +199,8 @@ class AttendanceSerializer(serializers.ModelSerializer):
             'extra_hours', 'status'
         ]
         read_only_fields = ['work_hours', 'extra_hours']
+        # Duplicates are checked in validate(); the unique constraint is the backstop
+        validators = []
 
     def validate_date(self, value):
         """Ensure date is not in the future"""
@@ -162,10 +240,45 @@ class AttendanceSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class LeaveSerializer(serializers.ModelSerializer):
+class UserImportSerializer(UserSerializer):
+    """
+    One row of a bulk employee import (core.onboarding).
+
+    Same fields and checks as UserSerializer minus the per-row uniqueness
+    queries; import_employees() checks the whole batch at once instead.
+    """
+
+    class Meta(UserSerializer.Meta):
+        extra_kwargs = {
+            **UserSerializer.Meta.extra_kwargs,
+            'username': {'validators': [UnicodeUsernameValidator()]},
+            'employee_id': {'validators': []},
+        }
+
+    def validate_email(self, value):
+        return value.lower()
+
+    def validate_employee_id(self, value):
+        return value
+
+
+class PunchSerializer(serializers.Serializer):
+    """A single door-terminal punch"""
+    employee_id = serializers.CharField(max_length=50)
+    timestamp = serializers.DateTimeField()
+    direction = serializers.ChoiceField(choices=['in', 'out'])
+
+
+class PunchBatchSerializer(serializers.Serializer):
+    """Batch of punches uploaded by a terminal"""
+    punches = PunchSerializer(many=True, allow_empty=False, max_length=20000)
+
+
+class LeaveSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     employee_name = serializers.CharField(source='employee.get_full_name', read_only=True)
     employee_username = serializers.CharField(source='employee.username', read_only=True)
     days_count = serializers.SerializerMethodField()
+    attachment = SignedFileField(required=False, allow_null=True)
     
     class Meta:
         model = LeaveRequest
@@ -214,13 +327,13 @@ class LeaveSerializer(serializers.ModelSerializer):
         
         # Validate overlapping leave requests
         employee = attrs.get('employee') or (self.instance.employee if self.instance else None)
+        if employee is None and 'request' in self.context:
+            # New requests are always filed for the requesting user (see perform_create)
+            employee = self.context['request'].user
         if employee and start_date and end_date:
-            overlapping = LeaveRequest.objects.filter(
-                employee=employee,
-                status__in=['PENDING', 'APPROVED'],
-                start_date__lte=end_date,
-                end_date__gte=start_date
-            )
+            overlapping = LeaveRequest.objects.active().overlapping(
+                start_date, end_date
+            ).filter(employee=employee)
             
             if self.instance:
                 overlapping = overlapping.exclude(pk=self.instance.pk)
@@ -240,7 +353,39 @@ class LeaveSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class PayrollSerializer(serializers.ModelSerializer):
+class LeaveReviewSerializer(serializers.Serializer):
+    """A batch decision on pending leave requests"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=1000
+    )
+    decision = serializers.ChoiceField(choices=['APPROVED', 'REJECTED'])
+    comment = serializers.CharField(required=False, allow_blank=True, default='')
+
+
+class TeamCalendarSerializer(serializers.Serializer):
+    """Inclusive date window for the team calendar, defaulting to the current week"""
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    manager = serializers.IntegerField(required=False, help_text="Admins only: limit to one manager's reports")
+
+    max_days = 92
+
+    def validate(self, attrs):
+        today = date.today()
+        start = attrs.get('start') or today - timedelta(days=today.weekday())
+        end = attrs.get('end') or start + timedelta(days=6)
+        if end < start:
+            raise serializers.ValidationError({
+                "end": "End date must be after start date"
+            })
+        if (end - start).days + 1 > self.max_days:
+            raise serializers.ValidationError(
+                f"Calendar window cannot exceed {self.max_days} days"
+            )
+        return {**attrs, 'start': start, 'end': end}
+
+
+class PayrollSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     employee_name = serializers.CharField(source='employee.get_full_name', read_only=True)
     employee_username = serializers.CharField(source='employee.username', read_only=True)
     gross_salary = serializers.SerializerMethodField()
@@ -252,20 +397,19 @@ class PayrollSerializer(serializers.ModelSerializer):
             'id', 'employee', 'employee_name', 'employee_username',
             'month', 'basic_salary', 'hra', 'standard_allowance',
             'other_allowances', 'gross_salary', 'pf', 'professional_tax',
-            'total_deductions', 'net_salary'
+            'unpaid_days', 'loss_of_pay', 'total_deductions', 'net_salary'
         ]
-        read_only_fields = ['net_salary']
+        read_only_fields = ['unpaid_days', 'loss_of_pay', 'net_salary']
+        # Duplicates are checked in validate(); the unique constraint is the backstop
+        validators = []
 
     def get_gross_salary(self, obj):
         """Calculate gross salary"""
-        return float(
-            obj.basic_salary + obj.hra + 
-            obj.standard_allowance + obj.other_allowances
-        )
+        return float(obj.compute_gross_salary())
 
     def get_total_deductions(self, obj):
-        """Calculate total deductions"""
-        return float(obj.pf + obj.professional_tax)
+        """Calculate total deductions, including loss of pay"""
+        return float(obj.compute_total_deductions())
 
     def validate_month(self, value):
         """Validate month format"""
@@ -277,31 +421,9 @@ class PayrollSerializer(serializers.ModelSerializer):
 
     def validate(self, attrs):
         """Validate payroll amounts"""
-        # Convert Decimal to float for calculations
-        basic_salary = float(attrs.get('basic_salary', 0))
-        hra = float(attrs.get('hra', 0))
-        pf = float(attrs.get('pf', 0))
-        
-        # Validate positive amounts
-        for field in ['basic_salary', 'hra', 'standard_allowance', 
-                     'other_allowances', 'pf', 'professional_tax']:
-            value = float(attrs.get(field, 0))
-            if value < 0:
-                raise serializers.ValidationError({
-                    field: "Amount cannot be negative"
-                })
-        
-        # Validate PF is reasonable (typically 12% of basic)
-        if basic_salary > 0 and pf > basic_salary * 0.15:
-            raise serializers.ValidationError({
-                "pf": "PF amount seems too high (should be around 12% of basic)"
-            })
-        
-        # Validate HRA is reasonable (typically 40-50% of basic)
-        if basic_salary > 0 and hra > basic_salary * 0.60:
-            raise serializers.ValidationError({
-                "hra": "HRA amount seems too high (should be 40-50% of basic)"
-            })
+        errors = payroll_amount_errors(attrs)
+        if errors:
+            raise serializers.ValidationError(errors)
         
         # Check for duplicate payroll entry
         employee = attrs.get('employee')
@@ -321,4 +443,53 @@ class PayrollSerializer(serializers.ModelSerializer):
                     "Payroll entry already exists for this employee and month"
                 )
         
-        return attrs
\ No newline at end of file
+        return attrs
+
+
+class SalaryTemplateSerializer(serializers.Serializer):
+    """Salary structure applied by a payroll run"""
+    basic_salary = serializers.DecimalField(
+        max_digits=10, decimal_places=2, min_value=0,
+        help_text="Basic salary for employees without an earlier payroll or override"
+    )
+    hra_percent = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=0, default=40)
+    pf_percent = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=0, default=12)
+    standard_allowance = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, default=0)
+    other_allowances = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, default=0)
+    professional_tax = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0, default=200)
+    overrides = serializers.DictField(
+        child=serializers.DictField(child=serializers.DecimalField(max_digits=10, decimal_places=2, min_value=0)),
+        required=False, default=dict,
+        help_text="Per-employee amounts keyed by employee_id"
+    )
+
+    def validate_overrides(self, value):
+        allowed = {'basic_salary', 'standard_allowance', 'other_allowances', 'professional_tax'}
+        for employee_id, amounts in value.items():
+            unknown = set(amounts) - allowed
+            if unknown:
+                raise serializers.ValidationError(
+                    f"{employee_id}: unsupported override(s) {', '.join(sorted(unknown))}"
+                )
+        return value
+
+
+class PayrollMonthSerializer(serializers.Serializer):
+    """A payroll month, given as YYYY-MM or any date within it"""
+    month = serializers.DateField(input_formats=['%Y-%m', '%Y-%m-%d'])
+
+    def validate_month(self, value):
+        """Normalise to the first day of the month"""
+        value = value.replace(day=1)
+        if value > date.today():
+            raise serializers.ValidationError(
+                "Payroll month cannot be in the future"
+            )
+        return value
+
+
+class PayrollRunSerializer(PayrollMonthSerializer):
+    """Parameters for generating a month's payroll in one run"""
+    template = SalaryTemplateSerializer()
+    dry_run = serializers.BooleanField(default=False)
+    replace = serializers.BooleanField(default=False)
@@ -0,0 +1,83 @@
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_user
+from .leaves import opening_entries
+from .media import delete_on_commit
+from .metrics import install_query_observer
+from .models import Attendance, LeaveLedgerEntry, Payroll, User
+from .response_cache import bump_on_commit
+from .rollups import apply_attendance_change
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """Drop the cached auth row on any save (profile edits, role changes, deactivation)"""
+    invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def expire_employee_responses(sender, instance, update_fields=None, **kwargs):
+    """Cached payroll and summaries show employee names and departments"""
+    if update_fields and set(update_fields) <= {'last_login', 'profile_thumbnails'}:
+        return
+    bump_on_commit('payroll', 'attendance')
+
+
+@receiver(pre_save, sender=User)
+def reset_profile_thumbnails(sender, instance, raw=False, update_fields=None, **kwargs):
+    """A new or removed profile picture drops its thumbnails; process_media makes new ones"""
+    if raw or (update_fields is not None and 'profile_picture' not in update_fields):
+        return
+    picture = instance.profile_picture
+    # An uploaded file is not committed to storage until the save
+    if picture and picture._committed and instance.profile_thumbnails is not None:
+        return
+    if instance.profile_thumbnails:
+        delete_on_commit(instance.profile_thumbnails.values())
+    instance.profile_thumbnails = None
+
+
+@receiver(post_save, sender=Payroll)
+@receiver(post_delete, sender=Payroll)
+def expire_payroll_responses(sender, instance, **kwargs):
+    bump_on_commit('payroll')
+
+
+@receiver(post_save, sender=User)
+def open_leave_ledger(sender, instance, created, raw=False, **kwargs):
+    """Start a new user's ledger at their initial balances"""
+    if created and not raw:
+        LeaveLedgerEntry.objects.bulk_create(opening_entries(instance))
+
+
+@receiver(pre_save, sender=Attendance)
+def load_attendance_state(sender, instance, raw=False, **kwargs):
+    """Fetch the stored state of rows that were not loaded with all rollup columns"""
+    if raw or instance.pk is None or hasattr(instance, '_loaded_rollup_state'):
+        return
+    stored = Attendance.objects.filter(pk=instance.pk).values_list(*Attendance.ROLLUP_SOURCE_FIELDS).first()
+    instance._loaded_rollup_state = stored
+
+
+@receiver(post_save, sender=Attendance)
+def update_attendance_rollups(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    state = instance.rollup_state()
+    apply_attendance_change(None if created else getattr(instance, '_loaded_rollup_state', None), state)
+    instance._loaded_rollup_state = state
+
+
+@receiver(post_delete, sender=Attendance)
+def remove_attendance_from_rollups(sender, instance, **kwargs):
+    apply_attendance_change(getattr(instance, '_loaded_rollup_state', instance.rollup_state()), None)
+
+
+@receiver(connection_created)
+def observe_connection_queries(sender, connection, **kwargs):
+    """Count every connection's queries towards the request being served (core.metrics)"""
+    install_query_observer(connection)
@@ -1,3 +1,1246 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from PIL import Image
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import ConnectionHandler, connection, transaction
+from django.db.models import F
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import AsyncClient, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from dayflow_backend.database import database_settings, job_statement_timeout, pool_available
+
+from .benchmarks import generate_dataset, run_benchmarks
+from .checkins import CheckInError, check_in, check_out
+from .closing import close_day
+from .jobs import claim_jobs, enqueue, job, run_batch, run_job
+from .leaves import run_year_end
+from .media import process_pending_thumbnails
+from .onboarding import hash_passwords, import_employees
+from .payroll import PayrollRun
+from .replicas import ReplicaRouter, use_replica
+from .response_cache import cached_response, payroll_scopes
+from .serializers import UserSerializer
+from .rollups import rebuild_rollups
+from .models import (
+    User, Attendance, DepartmentDayRollup, EmployeeMonthRollup, LeaveLedgerEntry, LeaveRequest, Payroll,
+    LedgerReason, Job,
+)
+
+
+class EmployeeRecordsTestCase(TestCase):
+    """Admin client plus one attendance, leave and payroll row per employee"""
+    employee_count = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            'admin', 'admin@dayflow.test', 'pass', role='ADMIN'
+        )
+        cls.employees = [
+            User.objects.create_user(
+                f'emp{i}', f'emp{i}@dayflow.test', 'pass',
+                first_name='Emp', last_name=str(i), employee_id=f'E{i:03}'
+            )
+            for i in range(cls.employee_count)
+        ]
+        for employee in cls.employees:
+            Attendance.objects.create(
+                employee=employee, date=date(2026, 1, 5),
+                check_in=time(9, 0), status='PRESENT'
+            )
+            LeaveRequest.objects.create(
+                employee=employee, leave_type='PAID',
+                start_date=date(2026, 2, 2), end_date=date(2026, 2, 3),
+                reason='Family function out of town'
+            )
+            Payroll.objects.create(
+                employee=employee, month=date(2026, 1, 1),
+                basic_salary=Decimal('30000'), hra=Decimal('12000')
+            )
+
+    def setUp(self):
+        # Cached responses outlive each test's rolled-back rows
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+
+class QueryCountTestCase(EmployeeRecordsTestCase):
+    """
+    Guards the list/retrieve endpoints against N+1 regressions.
+
+    Each endpoint is exercised with a handful of employees and the number of
+    queries is pinned; adding a per-row lookup to a serializer makes these
+    tests fail instead of silently slowing down the admin screens.
+    """
+
+    def assertListQueries(self, url, num):
+        with self.assertNumQueries(num):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), self.employee_count)
+        return response
+
+    def assertRetrieveQueries(self, url, num):
+        with self.assertNumQueries(num):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_attendance_list(self):
+        response = self.assertListQueries('/core/attendance/', 1)
+        self.assertEqual(response.data['results'][0]['employee_name'], 'Emp 4')
+
+    def test_attendance_retrieve(self):
+        attendance = Attendance.objects.first()
+        self.assertRetrieveQueries(f'/core/attendance/{attendance.pk}/', 1)
+
+    def test_leave_list(self):
+        response = self.assertListQueries('/core/leaves/', 1)
+        self.assertTrue(response.data['results'][0]['employee_username'].startswith('emp'))
+
+    def test_leave_retrieve(self):
+        leave = LeaveRequest.objects.first()
+        self.assertRetrieveQueries(f'/core/leaves/{leave.pk}/', 1)
+
+    def test_payroll_list(self):
+        self.assertListQueries('/core/payroll/', 1)
+
+    def test_payroll_retrieve(self):
+        payroll = Payroll.objects.first()
+        self.assertRetrieveQueries(f'/core/payroll/{payroll.pk}/', 1)
+
+    def test_employee_sees_own_rows_only(self):
+        self.client.force_authenticate(self.employees[0])
+        with self.assertNumQueries(1):
+            response = self.client.get('/core/attendance/')
+        self.assertEqual(len(response.data['results']), 1)
+
+
+class MonthlySummaryTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            'admin', 'admin@dayflow.test', 'pass', role='ADMIN'
+        )
+        cls.alice = User.objects.create_user(
+            'alice', 'alice@dayflow.test', 'pass', department='Engineering'
+        )
+        cls.bob = User.objects.create_user(
+            'bob', 'bob@dayflow.test', 'pass', department='Sales'
+        )
+        statuses = ['PRESENT', 'PRESENT', 'ABSENT', 'HALF_DAY', 'ON_LEAVE']
+        for day, attendance_status in enumerate(statuses, start=1):
+            Attendance.objects.create(
+                employee=cls.alice, date=date(2026, 3, day),
+                status=attendance_status, work_hours=Decimal('8.50'), extra_hours=Decimal('0.50')
+            )
+        Attendance.objects.create(employee=cls.bob, date=date(2026, 3, 2), status='PRESENT')
+        Attendance.objects.create(employee=cls.bob, date=date(2026, 4, 1), status='PRESENT')
+
+    def setUp(self):
+        # Cached responses outlive each test's rolled-back rows
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_company_summary_is_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/core/attendance/monthly_summary/?month=3&year=2026')
+        self.assertEqual(response.data['total_days'], 6)
+        self.assertEqual(response.data['present'], 3)
+        self.assertEqual(response.data['on_leave'], 1)
+        self.assertEqual(response.data['work_hours'], 42.5)
+
+    def test_group_by_employee(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                '/core/attendance/monthly_summary/?month=3&year=2026&group_by=employee'
+            )
+        rows = {row['employee_username']: row for row in response.data['results']}
+        self.assertEqual(rows['alice']['absent'], 1)
+        self.assertEqual(rows['alice']['extra_hours'], 2.5)
+        self.assertEqual(rows['bob']['total_days'], 1)
+
+    def test_group_by_department(self):
+        response = self.client.get(
+            '/core/attendance/monthly_summary/?month=3&year=2026&group_by=department'
+        )
+        rows = {row['department']: row for row in response.data['results']}
+        self.assertEqual(rows['Engineering']['half_day'], 1)
+        self.assertEqual(rows['Sales']['present'], 1)
+
+    def test_invalid_group_by(self):
+        response = self.client.get('/core/attendance/monthly_summary/?group_by=team')
+        self.assertEqual(response.status_code, 400)
+
+
+class CheckInTestCase(TestCase):
+    def setUp(self):
+        self.employee = User.objects.create_user('emp', 'emp@dayflow.test', 'pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee)
+
+    def test_check_in_touches_only_the_employees_rollup_row(self):
+        # The row, one upsert of the employee's month rollup and the outbox row, in a savepoint
+        with self.assertNumQueries(5):
+            response = self.client.post('/core/attendance/check_in/')
+        self.assertEqual(response.status_code, 201)
+        self.assertFalse(DepartmentDayRollup.objects.exists())
+        run_batch()
+        self.assertEqual(DepartmentDayRollup.objects.get().present, 1)
+
+    def test_double_check_in_is_rejected_by_constraint(self):
+        response = self.client.post('/core/attendance/check_in/')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post('/core/attendance/check_in/')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Attendance.objects.filter(employee=self.employee).count(), 1)
+
+    def test_check_out_stores_numeric_hours(self):
+        Attendance.objects.create(
+            employee=self.employee, date=date.today(), check_in=time(0, 0), status='PRESENT'
+        )
+        response = self.client.post('/core/attendance/check_out/')
+        self.assertEqual(response.status_code, 200)
+        attendance = Attendance.objects.get(employee=self.employee)
+        self.assertIsInstance(attendance.work_hours, Decimal)
+        self.assertEqual(response.data['work_hours'], str(attendance.work_hours))
+        totals = Attendance.objects.filter(employee=self.employee).hours_totals()
+        self.assertEqual(totals['work_hours'], attendance.work_hours)
+
+    def test_shorter_check_out_clears_extra_hours(self):
+        attendance = Attendance(employee=self.employee, date=date(2026, 3, 2), check_in=time(9, 0))
+        attendance.record_check_out(time(20, 0))
+        self.assertGreater(attendance.extra_hours, 0)
+        attendance.record_check_out(time(13, 0))
+        self.assertEqual(attendance.extra_hours, Decimal('0.00'))
+
+
+class BulkPunchTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@dayflow.test', 'pass', role='ADMIN')
+        cls.employees = [
+            User.objects.create_user(f'emp{i}', f'emp{i}@dayflow.test', 'pass', employee_id=f'E{i:03}')
+            for i in range(3)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def punches(self):
+        punches = []
+        for employee in self.employees:
+            punches += [
+                {"employee_id": employee.employee_id, "timestamp": "2026-01-05T09:00:00Z", "direction": "in"},
+                {"employee_id": employee.employee_id, "timestamp": "2026-01-05T09:05:00Z", "direction": "in"},
+                {"employee_id": employee.employee_id, "timestamp": "2026-01-05T18:30:00Z", "direction": "out"},
+            ]
+        punches.append({"employee_id": "NOPE", "timestamp": "2026-01-05T09:00:00Z", "direction": "in"})
+        return punches
+
+    def test_batch_is_folded_per_employee_day(self):
+        # 5 for the punches themselves, the rest rebuild the affected rollups
+        with self.assertNumQueries(14):
+            response = self.client.post('/core/attendance/bulk_punches/', {"punches": self.punches()}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['summary'], {"created": 9, "error": 1})
+        attendance = Attendance.objects.get(employee=self.employees[0])
+        self.assertEqual(attendance.check_in, time(9, 0))
+        self.assertEqual(attendance.check_out, time(18, 30))
+        self.assertEqual(attendance.work_hours, Decimal('9.50'))
+        self.assertEqual(attendance.extra_hours, Decimal('1.50'))
+
+    def test_replay_is_idempotent(self):
+        self.client.post('/core/attendance/bulk_punches/', {"punches": self.punches()}, format='json')
+        response = self.client.post('/core/attendance/bulk_punches/', {"punches": self.punches()}, format='json')
+        self.assertEqual(response.data['summary'], {"unchanged": 9, "error": 1})
+        self.assertEqual(Attendance.objects.count(), 3)
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(self.employees[0])
+        response = self.client.post('/core/attendance/bulk_punches/', {"punches": self.punches()}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class PayrollRunTestCase(TestCase):
+    template = {
+        "basic_salary": "30000", "hra_percent": "40", "pf_percent": "12",
+        "standard_allowance": "0", "other_allowances": "0", "professional_tax": "200",
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@dayflow.test', 'pass', role='ADMIN')
+        cls.employees = [
+            User.objects.create_user(f'emp{i}', f'emp{i}@dayflow.test', 'pass', employee_id=f'E{i:03}')
+            for i in range(4)
+        ]
+        Payroll.objects.create(employee=cls.employees[0], month=date(2026, 1, 1), basic_salary=Decimal('50000'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def run_payroll(self, **extra):
+        return self.client.post(
+            '/core/payroll/run/', {"month": "2026-02", "template": self.template, **extra}, format='json'
+        )
+
+    def test_dry_run_writes_nothing(self):
+        response = self.run_payroll(dry_run=True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['summary'], {"create": 5})
+        self.assertFalse(Payroll.objects.filter(month=date(2026, 2, 1)).exists())
+
+    def test_run_creates_rows_in_constant_queries(self):
+        # 8 with the outbox row for the payslip notices
+        with self.assertNumQueries(8):
+            self.run_payroll()
+        payroll = Payroll.objects.get(employee=self.employees[0], month=date(2026, 2, 1))
+        self.assertEqual(payroll.basic_salary, Decimal('50000.00'))
+        self.assertEqual(payroll.hra, Decimal('20000.00'))
+        self.assertEqual(payroll.net_salary, payroll.compute_net_salary())
+        self.assertEqual(Payroll.objects.filter(month=date(2026, 2, 1)).count(), 5)
+
+    def test_rerun_reports_unchanged_and_replace_updates(self):
+        self.run_payroll()
+        response = self.run_payroll()
+        self.assertEqual(response.data['summary'], {"unchanged": 5})
+        template = {**self.template, "overrides": {"E001": {"basic_salary": "40000"}}}
+        response = self.client.post(
+            '/core/payroll/run/', {"month": "2026-02", "template": template, "replace": True}, format='json'
+        )
+        self.assertEqual(response.data['summary'], {"unchanged": 4, "update": 1})
+        payroll = Payroll.objects.get(employee=self.employees[1], month=date(2026, 2, 1))
+        self.assertEqual(payroll.basic_salary, Decimal('40000.00'))
+
+    def test_concurrent_run_conflicts_instead_of_failing(self):
+        plan = PayrollRun.plan
+
+        def plan_during_another_run(run, **kwargs):
+            planned = plan(run, **kwargs)
+            Payroll.objects.create(employee=self.employees[1], month=date(2026, 2, 1))
+            return planned
+
+        with mock.patch.object(PayrollRun, 'plan', plan_during_another_run):
+            response = self.run_payroll()
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Payroll.objects.filter(month=date(2026, 2, 1)).exists())
+
+
+class PayrollCalculatorTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin', 'admin@dayflow.test', 'pass', role='ADMIN')
+        cls.employee = User.objects.create_user('emp', 'emp@dayflow.test', 'pass')
+        Attendance.objects.create(employee=cls.employee, date=date(2026, 4, 1), status='ABSENT')
+        Attendance.objects.create(employee=cls.employee, date=date(2026, 4, 2), status='HALF_DAY')
+        Attendance.objects.create(employee=cls.employee, date=date(2026, 4, 3), status='PRESENT')
+        # Overlaps an ABSENT day and spills into May; only 2 April days are new
+        LeaveRequest.objects.create(
+            employee=cls.employee, leave_type='UNPAID', status='APPROVED',
+            start_date=date(2026, 3, 31), end_date=date(2026, 4, 1), reason='Personal errand'
+        )
+        LeaveRequest.objects.create(
+            employee=cls.employee, leave_type='UNPAID', status='APPROVED',
+            start_date=date(2026, 4, 30), end_date=date(2026, 5, 2), reason='Personal errand'
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_create_applies_loss_of_pay(self):
+        response = self.client.post('/core/payroll/', {
+            "employee": self.employee.pk, "month": "2026-04-01",
+            "basic_salary": "20000", "hra": "8000", "standard_allowance": "1000",
+            "other_allowances": "1000", "pf": "2400", "professional_tax": "200",
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        payroll = Payroll.objects.get(pk=response.data['id'])
+        # ABSENT + HALF_DAY + one extra UNPAID leave day in April
+        self.assertEqual(payroll.unpaid_days, Decimal('2.5'))
+        self.assertEqual(payroll.loss_of_pay, Decimal('2500.00'))
+        self.assertEqual(payroll.net_salary, Decimal('24900.00'))
+        self.assertEqual(response.data['total_deductions'], 5100.0)
+
+    def test_recalculate_month_is_constant_queries(self):
+        others = User.objects.bulk_create([User(username=f'u{i}') for i in range(10)])
+        Payroll.objects.bulk_create([
+            Payroll(employee=user, month=date(2026, 4, 1), basic_salary=Decimal('30000'))
+            for user in [self.employee, *others]
+        ])
+        with self.assertNumQueries(4):
+            response = self.client.post('/core/payroll/recalculate/', {"month": "2026-04"}, format='json')
+        self.assertEqual(response.data['updated'], 11)
+        self.assertEqual(
+            Payroll.objects.get(employee=self.employee).loss_of_pay, Decimal('2500.00')
+        )
+
+
+class ExportTestCase(EmployeeRecordsTestCase):
+    def read_csv(self, response):
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_attendance_export_streams_filtered_rows(self):
+        with self.assertNumQueries(1):
+            lines = self.read_csv(self.client.get('/core/attendance/export/?status=PRESENT'))
+        self.assertEqual(len(lines), 1 + self.employee_count)
+        self.assertTrue(lines[0].startswith('Employee ID,Username,Name'))
+        self.assertIn('Emp 4', lines[1])
+
+    def test_export_respects_employee_scope(self):
+        self.client.force_authenticate(self.employees[1])
+        lines = self.read_csv(self.client.get('/core/payroll/export/'))
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith('E001,emp1,Emp 1'))
+
+    def test_leave_export(self):
+        lines = self.read_csv(self.client.get('/core/leaves/export/?leave_type=SICK'))
+        self.assertEqual(len(lines), 1)
+
+    def test_export_neutralises_formulas(self):
+        LeaveRequest.objects.create(
+            employee=self.employees[0], leave_type='SICK', start_date=date(2026, 3, 2),
+            end_date=date(2026, 3, 2), reason='=HYPERLINK("http://evil.test","Click")'
+        )
+        self.employees[0].first_name = '@SUM(1+1)'
+        self.employees[0].save()
+        lines = self.read_csv(self.client.get('/core/leaves/export/?leave_type=SICK'))
+        self.assertIn("'@SUM(1+1)", lines[1])
+        self.assertIn("\"'=HYPERLINK(", lines[1])
+
+
+class CachedJWTAuthenticationTestCase(TestCase):
+    def setUp(self):
+        from .authentication import local_cache
+        local_cache.clear()
+        self.user = User.objects.create_user('emp', 'emp@dayflow.test', 'pass', first_name='Emp')
+        token = RefreshToken.for_user(self.user).access_token
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_user_row_is_loaded_once(self):
+        with self.assertNumQueries(1):
+            self.client.get('/core/auth/me/')
+        with self.assertNumQueries(0):
+            response = self.client.get('/core/auth/me/')
+        self.assertEqual(response.data['first_name'], 'Emp')
+
+    def test_save_invalidates(self):
+        self.client.get('/core/auth/me/')
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get('/core/auth/me/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_profile_update_does_not_touch_password(self):
+        self.client.get('/core/auth/me/')
+        response = self.client.patch('/core/auth/profile/', {"first_name": "New"}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, 'New')
+        self.assertTrue(self.user.check_password('pass'))
+
+
+    def test_profile_update_keeps_balance_changed_behind_the_cache(self):
+        self.client.get('/core/auth/me/')
+        # As another worker's approval would: an F() update that sends no signal
+        User.objects.filter(pk=self.user.pk).update(paid_leave_balance=F('paid_leave_balance') - 5)
+        self.client.patch('/core/auth/profile/', {"phone": "9876543210"}, format='json')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.paid_leave_balance, 19)
+
+    def test_no_process_local_cache_with_several_workers(self):
+        with self.settings(AUTH_USER_CACHE={'PROCESSES': 4}):
+            self.client.get('/core/auth/me/')
+            with self.assertNumQueries(1):
+                self.client.get('/core/auth/me/')
+
+class LeaveLedgerTestCase(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@dayflow.test', 'pass', role='ADMIN')
+        self.employee = User.objects.create_user(
+            'emp', 'emp@dayflow.test', 'pass', paid_leave_balance=20, sick_leave_balance=3
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def ledger_balance(self, leave_type):
+        return sum(LeaveLedgerEntry.objects.filter(
+            employee=self.employee, leave_type=leave_type
+        ).values_list('delta', flat=True))
+
+    def test_new_user_gets_opening_entries(self):
+        self.assertEqual(self.ledger_balance('PAID'), 20)
+        self.assertEqual(self.ledger_balance('SICK'), 3)
+
+    def test_profile_edits_do_not_overwrite_concurrent_deductions(self):
+        employee = User.objects.get(pk=self.employee.pk)
+        # An approval committed after `employee` was loaded
+        User.objects.filter(pk=employee.pk).update(paid_leave_balance=F('paid_leave_balance') - 5)
+        LeaveLedgerEntry.objects.create(employee=employee, leave_type='PAID', delta=-5, reason='APPROVAL')
+
+        serializer = UserSerializer(employee, data={'phone': '9876543210'}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.employee.refresh_from_db()
+        self.assertEqual(self.employee.paid_leave_balance, 15)
+
+        serializer = UserSerializer(employee, data={'paid_leave_balance': 18}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.employee.refresh_from_db()
+        self.assertEqual((self.employee.paid_leave_balance, self.employee.sick_leave_balance), (18, 3))
+        self.assertEqual(self.ledger_balance('PAID'), 18)
+        self.assertEqual(self.ledger_balance('SICK'), 3)
+
+    def test_approve_deducts_balance_once(self):
+        leave = LeaveRequest.objects.create(
+            employee=self.employee, leave_type='PAID',
+            start_date=date(2026, 3, 2), end_date=date(2026, 3, 4),
+            reason='Family function out of town'
+        )
+        url = f'/core/leaves/{leave.pk}/approve/'
+
+        response = self.client.post(url, {'comment': 'Enjoy'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'APPROVED')
+
+        response = self.client.post(url, {}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        self.employee.refresh_from_db()
+        self.assertEqual(self.employee.paid_leave_balance, 17)
+        self.assertEqual(self.ledger_balance('PAID'), 17)
+
+    def test_profile_edit_records_adjustment(self):
+        response = self.client.patch(
+            f'/core/users/{self.employee.pk}/', {'sick_leave_balance': 5}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.ledger_balance('SICK'), 5)
+
+    def test_year_end_caps_carry_forward_and_is_idempotent(self):
+        policy = {'PAID_ANNUAL': 24, 'SICK_ANNUAL': 7, 'PAID_CARRY_FORWARD_CAP': 12}
+        self.assertEqual(run_year_end(2027, policy), 2)
+        self.assertEqual(run_year_end(2027, policy), 0)
+
+        self.employee.refresh_from_db()
+        self.assertEqual(self.employee.paid_leave_balance, 36)
+        self.assertEqual(self.employee.sick_leave_balance, 7)
+        self.assertEqual(self.ledger_balance('PAID'), 36)
+        self.assertEqual(self.ledger_balance('SICK'), 7)
+
+    def test_review_decides_batch_with_per_id_outcomes(self):
+        other = User.objects.create_user('emp2', 'emp2@dayflow.test', 'pass', paid_leave_balance=10)
+        # The rejected one is on its own dates: pending/approved leave may not overlap on PostgreSQL
+        leaves = [
+            LeaveRequest.objects.create(
+                employee=employee, leave_type='PAID', status=leave_status,
+                start_date=date(2026, 3, day), end_date=date(2026, 3, day + 1),
+                reason='Family function out of town'
+            )
+            for employee, day, leave_status in [
+                (self.employee, 2, 'PENDING'), (self.employee, 9, 'PENDING'),
+                (other, 2, 'PENDING'), (other, 9, 'PENDING'), (self.employee, 16, 'REJECTED'),
+            ]
+        ]
+        ids = [leave.pk for leave in leaves] + [leaves[0].pk, 999999]
+
+        # 7 with the outbox row for the decision notices
+        with self.assertNumQueries(7):
+            response = self.client.post('/core/leaves/review/', {
+                'ids': ids, 'decision': 'APPROVED', 'comment': 'Approved in bulk'
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['summary'], {'approved': 4, 'error': 3})
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            ['approved'] * 4 + ['error'] * 3
+        )
+
+        self.employee.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.employee.paid_leave_balance, 16)
+        self.assertEqual(other.paid_leave_balance, 6)
+        self.assertEqual(self.ledger_balance('PAID'), 16)
+        self.assertEqual(
+            LeaveRequest.objects.filter(status='APPROVED', admin_comment='Approved in bulk').count(), 4
+        )
+
+
+class TeamCalendarTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.lead = User.objects.create_user('lead', 'lead@dayflow.test', 'pass', employee_id='L001')
+        cls.report = User.objects.create_user('report', 'report@dayflow.test', 'pass', manager=cls.lead)
+        cls.peer = User.objects.create_user('peer', 'peer@dayflow.test', 'pass', manager=cls.lead)
+        cls.outsider = User.objects.create_user('outsider', 'outsider@dayflow.test', 'pass')
+        for employee, start, end, leave_status in [
+            (cls.report, date(2026, 3, 2), date(2026, 3, 4), 'APPROVED'),
+            (cls.peer, date(2026, 2, 27), date(2026, 3, 2), 'PENDING'),
+            (cls.peer, date(2026, 3, 3), date(2026, 3, 3), 'REJECTED'),
+            (cls.report, date(2026, 3, 10), date(2026, 3, 11), 'APPROVED'),
+            (cls.outsider, date(2026, 3, 2), date(2026, 3, 6), 'APPROVED'),
+        ]:
+            LeaveRequest.objects.create(
+                employee=employee, leave_type='PAID', start_date=start, end_date=end,
+                status=leave_status, reason='Family function out of town'
+            )
+        Attendance.objects.create(employee=cls.lead, date=date(2026, 3, 5), status='ON_LEAVE')
+
+    def calendar(self, user, query='?start=2026-03-02&end=2026-03-08'):
+        client = APIClient()
+        client.force_authenticate(user)
+        with self.assertNumQueries(1):
+            response = client.get(f'/core/leaves/team_calendar/{query}')
+        self.assertEqual(response.status_code, 200)
+        return [(row['username'], row['source'], row['start_date']) for row in response.data['absences']]
+
+    def test_team_sees_leave_and_on_leave_attendance(self):
+        expected = [
+            ('peer', 'LEAVE', date(2026, 2, 27)),
+            ('report', 'LEAVE', date(2026, 3, 2)),
+            ('lead', 'ATTENDANCE', date(2026, 3, 5)),
+        ]
+        self.assertEqual(self.calendar(self.report), expected)
+        self.assertEqual(self.calendar(self.lead), expected)
+
+    def test_outsider_sees_only_themselves(self):
+        self.assertEqual(self.calendar(self.outsider), [('outsider', 'LEAVE', date(2026, 3, 2))])
+
+    def test_window_is_validated(self):
+        client = APIClient()
+        client.force_authenticate(self.lead)
+        response = client.get('/core/leaves/team_calendar/?start=2026-03-08&end=2026-03-02')
+        self.assertEqual(response.status_code, 400)
+        response = client.get('/core/leaves/team_calendar/?start=2026-01-01&end=2026-12-31')
+        self.assertEqual(response.status_code, 400)
+
+
+class AttendanceRollupTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.alice = User.objects.create_user('alice', 'alice@dayflow.test', 'pass', department='Engineering')
+        self.bob = User.objects.create_user('bob', 'bob@dayflow.test', 'pass')
+
+    def rollups(self):
+        months = {
+            (row.employee_id, row.month): (row.total_days, row.present, row.absent, row.work_hours)
+            for row in EmployeeMonthRollup.objects.all()
+        }
+        days = {
+            (row.department, row.date): (row.total_days, row.present, row.absent, row.work_hours)
+            for row in DepartmentDayRollup.objects.all()
+        }
+        return months, days
+
+    def test_writes_move_rollups_incrementally(self):
+        attendance = Attendance.objects.create(
+            employee=self.alice, date=date(2026, 3, 2), check_in=time(9, 0), status='PRESENT'
+        )
+        attendance = Attendance.objects.get(pk=attendance.pk)
+        attendance.record_check_out(time(18, 0))
+        attendance.save(update_fields=['check_out', 'work_hours', 'extra_hours'])
+        Attendance.objects.create(employee=self.bob, date=date(2026, 3, 2), status='ABSENT')
+        moved = Attendance.objects.create(employee=self.bob, date=date(2026, 3, 3), status='PRESENT')
+        moved.date, moved.status = date(2026, 4, 1), 'HALF_DAY'
+        moved.save()
+        Attendance.objects.create(employee=self.alice, date=date(2026, 3, 9), status='PRESENT').delete()
+        # Department-day deltas go through the job worker
+        self.assertEqual(run_batch(batch_size=20), {'done': 7})
+
+        months, days = self.rollups()
+        self.assertEqual(months[(self.alice.pk, date(2026, 3, 1))], (1, 1, 0, Decimal('9.00')))
+        self.assertEqual(months[(self.bob.pk, date(2026, 3, 1))], (1, 0, 1, Decimal('0.00')))
+        self.assertEqual(months[(self.bob.pk, date(2026, 4, 1))], (1, 0, 0, Decimal('0.00')))
+        self.assertEqual(days[('Engineering', date(2026, 3, 2))], (1, 1, 0, Decimal('9.00')))
+        self.assertEqual(days[('', date(2026, 3, 3))], (0, 0, 0, Decimal('0.00')))
+        self.assertEqual(days[('Engineering', date(2026, 3, 9))][0], 0)
+
+        # A full rebuild agrees with the incremental totals
+        rebuild_rollups(date(2026, 3, 1), date(2026, 4, 30))
+        rebuilt_months, rebuilt_days = self.rollups()
+        self.assertEqual(rebuilt_months, months)
+        self.assertEqual(rebuilt_days, {key: value for key, value in days.items() if value[0]})
+
+    def test_summary_reads_rollups(self):
+        for day in range(1, 21):
+            Attendance.objects.create(employee=self.alice, date=date(2026, 3, day), status='PRESENT')
+        client = APIClient()
+        client.force_authenticate(self.alice)
+        with self.assertNumQueries(1):
+            response = client.get('/core/attendance/monthly_summary/?month=3&year=2026')
+        self.assertEqual(response.data['present'], 20)
+        self.assertIn('core_employeemonthrollup', connection.queries[-1]['sql'])
+
+        response = client.get('/core/attendance/monthly_summary/?month=3&year=2026&group_by=day')
+        self.assertEqual(len(response.data['results']), 20)
+
+
+class CloseDayTestCase(TestCase):
+    day = date(2026, 3, 2)  # a Monday
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.worker = User.objects.create_user('worker', 'worker@dayflow.test', 'pass')
+        cls.forgetful = User.objects.create_user('forgetful', 'forgetful@dayflow.test', 'pass')
+        cls.absentee = User.objects.create_user('absentee', 'absentee@dayflow.test', 'pass')
+        cls.vacationer = User.objects.create_user('vacationer', 'vacationer@dayflow.test', 'pass')
+        User.objects.create_user('newcomer', 'newcomer@dayflow.test', 'pass', joining_date=date(2026, 3, 9))
+        User.objects.create_user('leaver', 'leaver@dayflow.test', 'pass', is_active=False)
+        Attendance.objects.create(
+            employee=cls.worker, date=cls.day, check_in=time(9, 0),
+            check_out=time(17, 0), work_hours=Decimal('8.00'), status='PRESENT'
+        )
+        Attendance.objects.create(employee=cls.forgetful, date=cls.day, check_in=time(10, 0), status='PRESENT')
+        LeaveRequest.objects.create(
+            employee=cls.vacationer, leave_type='PAID', status='APPROVED',
+            start_date=date(2026, 3, 1), end_date=date(2026, 3, 3), reason='Family function out of town'
+        )
+
+    def test_close_day_is_set_based_and_idempotent(self):
+        policy = {'CHECK_OUT_TIME': '18:00', 'WORKING_DAYS': [0, 1, 2, 3, 4]}
+        self.assertEqual(close_day(self.day, policy), {'absent': 1, 'on_leave': 1, 'closed': 1})
+        self.assertEqual(close_day(self.day, policy), {'absent': 0, 'on_leave': 0, 'closed': 0})
+
+        statuses = dict(Attendance.objects.filter(date=self.day).values_list('employee__username', 'status'))
+        self.assertEqual(statuses, {
+            'worker': 'PRESENT', 'forgetful': 'PRESENT', 'absentee': 'ABSENT', 'vacationer': 'ON_LEAVE',
+        })
+        forgetful = Attendance.objects.get(employee=self.forgetful)
+        self.assertEqual((forgetful.check_out, forgetful.work_hours), (time(18, 0), Decimal('8.00')))
+
+        summary = EmployeeMonthRollup.objects.for_month(2026, 3).summary()
+        self.assertEqual((summary['total_days'], summary['absent'], summary['on_leave']), (4, 1, 1))
+
+    def test_check_in_after_closing_replaces_the_absence(self):
+        close_day(self.day)
+        moment = timezone.make_aware(datetime.combine(self.day, time(11, 0)))
+        attendance = check_in(self.absentee, moment)
+        self.assertEqual((attendance.status, attendance.check_in), ('PRESENT', time(11, 0)))
+        with self.assertRaises(CheckInError):
+            check_in(self.absentee, moment)
+        with self.assertRaises(CheckInError):
+            check_in(self.vacationer, moment)
+        # A recorded absence or leave has nothing to check out of
+        with self.assertRaises(CheckInError) as raised:
+            check_out(self.vacationer, moment)
+        self.assertEqual(raised.exception.status, 404)
+
+        summary = EmployeeMonthRollup.objects.for_month(2026, 3).summary()
+        self.assertEqual((summary['present'], summary['absent']), (3, 0))
+
+    def test_non_working_day_only_closes_open_rows(self):
+        sunday = date(2026, 3, 1)
+        Attendance.objects.create(employee=self.worker, date=sunday, check_in=time(19, 0), status='PRESENT')
+        self.assertEqual(close_day(sunday), {'absent': 0, 'on_leave': 0, 'closed': 1})
+        self.assertEqual(Attendance.objects.get(date=sunday).check_out, time(19, 0))
+
+
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        self.employee = User.objects.create_user('emp', 'emp@dayflow.test', 'pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee)
+
+    def test_requests_are_recorded_per_route(self):
+        self.client.get('/core/attendance/')
+        self.client.post('/core/attendance/check_in/')
+
+        with self.settings(METRICS={'TOKEN': 'secret'}):
+            body = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').content.decode()
+        self.assertIn('dayflow_http_requests_total{route="attendance.list",method="GET",status="200"}', body)
+        self.assertIn('dayflow_http_requests_total{route="attendance.check_in",method="POST",status="201"}', body)
+        self.assertIn('dayflow_db_queries_per_request_count{route="attendance.check_in"}', body)
+        self.assertIn('dayflow_serializer_time_seconds_bucket{route="attendance.list",le="+Inf"}', body)
+        self.assertNotIn('route="metrics"', body)
+
+    def test_slow_requests_are_logged_with_sql(self):
+        with self.settings(METRICS={'SLOW_REQUEST_SECONDS': 0}):
+            with self.assertLogs('core.middleware', 'WARNING') as logs:
+                self.client.get('/core/attendance/')
+        self.assertIn('attendance.list', logs.output[0])
+        self.assertIn('FROM "core_attendance"', logs.output[0])
+
+    def test_token_protects_endpoint(self):
+        with self.settings(METRICS={'TOKEN': 'secret'}):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+            self.assertEqual(response.status_code, 200)
+        with self.settings(METRICS={'TOKEN': None}):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            with self.settings(DEBUG=True):
+                self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+
+class AsyncViewsTestCase(TestCase):
+    def setUp(self):
+        self.employee = User.objects.create_user('emp', 'emp@dayflow.test', 'pass')
+        self.headers = {'Authorization': f'Bearer {RefreshToken.for_user(self.employee).access_token}'}
+        self.client = AsyncClient()
+
+    async def test_check_in_and_out(self):
+        response = await self.client.post('/core/async/attendance/check_in/', headers=self.headers)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['status'], 'Checked in successfully')
+        response = await self.client.post('/core/async/attendance/check_in/', headers=self.headers)
+        self.assertEqual(response.json(), {"error": "Already checked in today"})
+
+        response = await self.client.post('/core/async/attendance/check_out/', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('work_hours', response.json())
+        response = await self.client.post('/core/async/attendance/check_out/', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+        summary = await self.client.get('/core/async/attendance/monthly_summary/', headers=self.headers)
+        self.assertEqual(summary.json()['total_days'], 1)
+        self.assertEqual(summary.json()['present'], 1)
+        by_day = await self.client.get('/core/async/attendance/monthly_summary/?group_by=day', headers=self.headers)
+        self.assertEqual(len(by_day.json()['results']), 1)
+
+    async def test_matches_sync_responses(self):
+        sync_client = APIClient()
+        sync_client.force_authenticate(self.employee)
+        for path in ['auth/me/', 'attendance/monthly_summary/?group_by=employee']:
+            response = await self.client.get(f'/core/async/{path}', headers=self.headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), (await sync_to_async(sync_client.get)(f'/core/{path}')).json())
+
+    async def test_rejects_bad_requests(self):
+        self.assertEqual((await AsyncClient().get('/core/async/auth/me/')).status_code, 401)
+        invalid = {'Authorization': 'Bearer invalid'}
+        self.assertEqual((await self.client.get('/core/async/auth/me/', headers=invalid)).status_code, 401)
+        self.assertEqual((await self.client.get('/core/async/attendance/check_in/', headers=self.headers)).status_code, 405)
+        response = await self.client.get('/core/async/attendance/monthly_summary/?month=13', headers=self.headers)
+        self.assertEqual(response.json(), {"error": "Invalid month or year"})
+
+
+class DatabaseSettingsTestCase(TestCase):
+    def test_pool_and_persistent_connections_are_exclusive(self):
+        pooled = database_settings({'DB_POOL': 'true', 'DB_STATEMENT_TIMEOUT': '5000'})['default']
+        self.assertEqual(pooled['CONN_MAX_AGE'], 0)
+        self.assertEqual(pooled['OPTIONS']['pool']['max_size'], 20)
+        self.assertEqual(pooled['OPTIONS']['options'], '-c statement_timeout=5000')
+        self.assertTrue(pooled['CONN_HEALTH_CHECKS'])
+
+        persistent = database_settings({'DB_POOL': 'off', 'DB_CONN_MAX_AGE': '300', 'DB_STATEMENT_TIMEOUT': '0'})
+        self.assertEqual(persistent['default']['CONN_MAX_AGE'], 300)
+        self.assertTrue(persistent['default']['CONN_HEALTH_CHECKS'])
+        self.assertEqual(persistent['default']['OPTIONS'], {})
+        self.assertNotIn('replica', persistent)
+
+    @skipUnless(pool_available(), "psycopg_pool is not installed")
+    def test_pooled_connection_opens(self):
+        pooled = database_settings({'DB_POOL': 'true'})['default']
+        if connection.vendor == 'postgresql':
+            # The test database, through a pool built from these settings
+            pooled.update({key: connection.settings_dict[key] for key in ('NAME', 'USER', 'PASSWORD', 'HOST', 'PORT')})
+        wrapper = ConnectionHandler({'default': pooled})['default']
+        try:
+            self.assertIsNotNone(wrapper.pool)
+            if connection.vendor == 'postgresql':
+                with wrapper.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    self.assertEqual(cursor.fetchone(), (1,))
+        finally:
+            wrapper.close()
+            wrapper.close_pool()
+
+    def test_asgi_defaults_to_closing_connections(self):
+        self.assertEqual(database_settings({'DB_POOL': 'off'})['default']['CONN_MAX_AGE'], 60)
+        self.assertEqual(database_settings({'DB_POOL': 'off', 'DB_ASGI': 'true'})['default']['CONN_MAX_AGE'], 0)
+        explicit = database_settings({'DB_POOL': 'off', 'DB_ASGI': 'true', 'DB_CONN_MAX_AGE': '30'})
+        self.assertEqual(explicit['default']['CONN_MAX_AGE'], 30)
+
+    def test_job_statement_timeout(self):
+        self.assertEqual(job_statement_timeout({}), 0)
+        self.assertEqual(job_statement_timeout({'DB_JOB_STATEMENT_TIMEOUT': '600000'}), 600000)
+
+    def test_replica_defaults_to_primary_credentials(self):
+        databases = database_settings({'DB_POOL': 'off', 'DB_NAME': 'hr', 'DB_REPLICA_HOST': 'replica.internal'})
+        self.assertEqual(databases['replica']['HOST'], 'replica.internal')
+        self.assertEqual(databases['replica']['NAME'], 'hr')
+        self.assertEqual(databases['replica']['TEST'], {'MIRROR': 'default'})
+
+    def test_router_sends_only_opted_in_reads_to_replica(self):
+        router = ReplicaRouter()
+        replica = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}
+        with self.settings(DATABASES={**settings.DATABASES, 'replica': replica}):
+            self.assertIsNone(router.db_for_read(Attendance))
+            with use_replica():
+                self.assertEqual(router.db_for_read(Attendance), 'replica')
+                self.assertEqual(router.db_for_write(Attendance), 'default')
+            self.assertFalse(router.allow_migrate('replica', 'core'))
+        with use_replica():
+            self.assertIsNone(router.db_for_read(Attendance))
+
+
+class ResponseCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', 'admin@dayflow.test', 'pass', role='ADMIN')
+        self.alice = User.objects.create_user('alice', 'alice@dayflow.test', 'pass')
+        self.payroll = Payroll.objects.create(
+            employee=self.alice, month=date(2026, 1, 1), basic_salary=Decimal('30000'), hra=Decimal('12000')
+        )
+        self.client = APIClient()
+
+    def test_payroll_is_cached_until_a_payroll_changes(self):
+        self.client.force_authenticate(self.alice)
+        url = f'/core/payroll/{self.payroll.pk}/'
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).data, first.data)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.payroll.basic_salary = Decimal('35000')
+            self.payroll.save()
+        self.assertEqual(self.client.get(url).data['basic_salary'], '35000.00')
+
+    def test_summaries_are_cached_per_user(self):
+        url = '/core/attendance/monthly_summary/'
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.get(url).data['total_days'], 0)
+        self.client.force_authenticate(self.alice)
+        self.assertEqual(self.client.get(url).data['total_days'], 0)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/core/attendance/check_in/')
+        self.assertEqual(self.client.get(url).data['total_days'], 1)
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.get(url).data['total_days'], 1)
+
+    def test_misses_are_filled_from_the_primary(self):
+        replica = {**settings.DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+        routed = []
+        view = SimpleNamespace(basename='test', action='read')
+        request = SimpleNamespace(user=self.alice, get_full_path=lambda: '/core/test/')
+
+        @cached_response(payroll_scopes)
+        def read(view, request):
+            routed.append(ReplicaRouter().db_for_read(Payroll))
+            return Response({})
+
+        with self.settings(DATABASES={**settings.DATABASES, 'replica': replica}), use_replica():
+            read(view, request)
+            read(view, request)
+        self.assertEqual(routed, [None])
+
+    def test_last_login_does_not_expire_payroll(self):
+        self.client.force_authenticate(self.alice)
+        self.client.get('/core/payroll/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.alice.save(update_fields=['last_login'])
+        with self.assertNumQueries(0):
+            self.client.get('/core/payroll/')
+
+
+class DashboardStatsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', 'admin@dayflow.test', 'pass', role='ADMIN')
+        self.alice = User.objects.create_user('alice', 'alice@dayflow.test', 'pass', department='Engineering')
+        self.bob = User.objects.create_user('bob', 'bob@dayflow.test', 'pass', department='Sales')
+        User.objects.create_user('carol', 'carol@dayflow.test', 'pass', department='Sales', is_active=False)
+        today = timezone.localdate()
+        Attendance.objects.create(employee=self.alice, date=today, status='PRESENT')
+        Attendance.objects.create(employee=self.bob, date=today, status='ON_LEAVE')
+        LeaveRequest.objects.create(
+            employee=self.alice, leave_type='PAID', start_date=today + timedelta(days=7),
+            end_date=today + timedelta(days=8), reason='Family function out of town'
+        )
+        Payroll.objects.create(
+            employee=self.alice, month=today.replace(day=1), basic_salary=Decimal('30000'),
+            hra=Decimal('12000'), net_salary=Decimal('42000')
+        )
+        self.client = APIClient()
+
+    def test_stats_take_a_fixed_number_of_queries(self):
+        self.client.force_authenticate(self.admin)
+        with self.assertNumQueries(4):
+            response = self.client.get('/core/users/dashboard_stats/')
+        self.assertEqual(response.data['headcount']['total'], 3)
+        self.assertEqual(response.data['headcount']['departments'], 2)
+        self.assertEqual(response.data['headcount']['by_department'], {'': 1, 'Engineering': 1, 'Sales': 1})
+        self.assertEqual(response.data['headcount']['by_role'], {'ADMIN': 1, 'EMPLOYEE': 2})
+        self.assertEqual(
+            response.data['attendance_today'],
+            {"present": 1, "absent": 0, "half_day": 0, "on_leave": 1, "not_recorded": 1},
+        )
+        self.assertEqual(response.data['pending_leaves'], 1)
+        self.assertEqual(response.data['payroll']['employees'], 1)
+        self.assertEqual(response.data['payroll']['net_salary'], '42000.00')
+
+        with self.assertNumQueries(0):
+            self.client.get('/core/users/dashboard_stats/')
+
+    def test_admin_only(self):
+        self.client.force_authenticate(self.alice)
+        self.assertEqual(self.client.get('/core/users/dashboard_stats/').status_code, 403)
+
+
+class UserSearchTestCase(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@dayflow.test', 'pass', role='ADMIN')
+        User.objects.create_user(
+            'asmith', 'alice@dayflow.test', 'pass', first_name='Alice', last_name='Smith',
+            employee_id='E001', department='Engineering', designation='Backend Developer'
+        )
+        User.objects.create_user(
+            'bjones', 'bob@dayflow.test', 'pass', first_name='Bob', last_name='Jones',
+            employee_id='E002', department='Sales', is_active=False
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_search_matches_every_word_across_fields(self):
+        response = self.client.get('/core/users/', {'search': 'alice engineer'})
+        self.assertEqual([user['username'] for user in response.data['results']], ['asmith'])
+        response = self.client.get('/core/users/', {'search': 'developer e001'})
+        self.assertEqual(len(response.data['results']), 1)
+        response = self.client.get('/core/users/', {'search': 'jones', 'is_active': 'true'})
+        self.assertEqual(response.data['results'], [])
+        self.assertEqual(self.client.get('/core/users/', {'search': '%'}).data['results'], [])
+
+    def test_typeahead_returns_only_active_names(self):
+        response = self.client.get('/core/users/typeahead/', {'q': 'e00'})
+        self.assertEqual(response.data, [{"id": response.data[0]['id'], "name": "Alice Smith", "employee_id": "E001"}])
+        self.assertEqual(self.client.get('/core/users/typeahead/', {'q': 'e', 'limit': 'x'}).status_code, 400)
+
+
+class EmployeeImportTestCase(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@dayflow.test', 'pass', role='ADMIN', employee_id='E000')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def row(self, i, **fields):
+        return {
+            "username": f"new{i}", "email": f"New{i}@Dayflow.test", "password": "Onboard-2026!",
+            "first_name": "New", "last_name": f"Hire{i}", "employee_id": f"N{i:03}", **fields,
+        }
+
+    def test_import_reports_duplicates_and_opens_ledgers(self):
+        rows = [
+            self.row(1),
+            self.row(2, employee_id='N001'),
+            self.row(3, email='admin@dayflow.test'),
+            self.row(4, password='short'),
+            "not a row",
+        ]
+        results = import_employees(rows)
+        self.assertEqual([result['status'] for result in results], ['created', 'error', 'error', 'error', 'error'])
+        self.assertEqual(results[1]['errors'], {'employee_id': ["Duplicate employee id in this batch"]})
+        self.assertEqual(results[2]['errors'], {'email': ["Email already exists"]})
+        self.assertIn('password', results[3]['errors'])
+
+        user = User.objects.get(pk=results[0]['id'])
+        self.assertEqual(user.email, 'new1@dayflow.test')
+        self.assertTrue(user.check_password('Onboard-2026!'))
+        self.assertEqual(user.leave_ledger.filter(reason=LedgerReason.OPENING).count(), 2)
+
+    def test_hash_passwords_salts_each_password(self):
+        hashed = hash_passwords(['Onboard-2026!'] * 2, workers=2)
+        self.assertEqual(len(set(hashed)), 2)
+        user = User(password=hashed[0])
+        self.assertTrue(user.check_password('Onboard-2026!'))
+
+    def test_csv_upload_dry_run_creates_nothing(self):
+        upload = SimpleUploadedFile(
+            'employees.csv',
+            b"username,email,password,first_name,last_name,employee_id,department\r\n"
+            b"new1,new1@dayflow.test,Onboard-2026!,New,Hire,N001,\r\n"
+            b"new2,new2@dayflow.test,Onboard-2026!,New,Hire,E000,Sales\r\n",
+            content_type='text/csv',
+        )
+        response = self.client.post('/core/users/bulk_import/?dry_run=1', {'file': upload}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['summary'], {"valid": 1, "error": 1})
+        self.assertEqual(User.objects.count(), 1)
+
+        response = self.client.post('/core/users/bulk_import/', {"employees": [self.row(1)]}, format='json')
+        self.assertEqual(response.data['summary'], {"created": 1})
+        self.assertIsNone(User.objects.get(username='new1').department)
+        self.assertEqual(self.client.post('/core/users/bulk_import/', {}, format='json').status_code, 400)
+
+    def test_accepts_a_bare_json_list(self):
+        response = self.client.post('/core/users/bulk_import/', [self.row(1), self.row(2)], format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['summary'], {"created": 2})
+        self.assertEqual(self.client.post('/core/users/bulk_import/', [], format='json').status_code, 400)
+
+
+class MediaPipelineTestCase(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.admin = User.objects.create_user('admin', 'admin@dayflow.test', 'pass', role='ADMIN')
+        self.employee = User.objects.create_user('emp', 'emp@dayflow.test', 'pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee)
+
+    def upload_picture(self):
+        buffer = io.BytesIO()
+        Image.new('RGB', (640, 480), 'teal').save(buffer, 'JPEG')
+        upload = SimpleUploadedFile('me.jpg', buffer.getvalue(), content_type='image/jpeg')
+        return self.client.patch('/core/auth/profile/', {'profile_picture': upload}, format='multipart')
+
+    def test_thumbnails_are_made_in_the_background(self):
+        response = self.upload_picture()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('/core/media/profile_pics/me', response.data['profile_picture'])
+        self.assertIsNone(response.data['profile_thumbnails'])
+
+        self.assertEqual(process_pending_thumbnails(), {'processed': 1, 'failed': 0})
+        self.assertEqual(process_pending_thumbnails(), {'processed': 0, 'failed': 0})
+        self.employee.refresh_from_db()
+        self.assertEqual(set(self.employee.profile_thumbnails), {'small', 'medium'})
+
+        self.client.force_authenticate(self.admin)
+        row = self.client.get('/core/users/').data['results'][1]
+        self.assertNotIn('profile_picture', row)
+        response = self.client.get(row['profile_thumbnails']['small'])
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(Image.open(io.BytesIO(b''.join(response.streaming_content))).size, (64, 64))
+
+        # A new picture drops the old thumbnails until the worker runs again
+        self.client.force_authenticate(self.employee)
+        self.assertIsNone(self.upload_picture().data['profile_thumbnails'])
+
+    def test_signed_urls_are_checked(self):
+        url = self.upload_picture().data['profile_picture']
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(url.replace('signature=', 'signature=x')).status_code, 403)
+        self.assertEqual(self.client.get(url.split('?')[0]).status_code, 403)
+
+        self.assertEqual(self.client.get(url)['Content-Security-Policy'], 'sandbox')
+        with self.settings(MEDIA_PIPELINE={'ACCEL_PREFIX': '/protected-media/'}):
+            response = self.client.get(url)
+        self.assertTrue(response['X-Accel-Redirect'].startswith('/protected-media/profile_pics/me'))
+
+    def test_uploads_other_than_raster_images_are_downloads(self):
+        svg = SimpleUploadedFile(
+            'cv.svg', b'<svg xmlns="http://www.w3.org/2000/svg"><script>alert(1)</script></svg>',
+            content_type='image/svg+xml'
+        )
+        url = self.client.patch('/core/auth/profile/', {'resume': svg}, format='multipart').data['resume']
+        response = self.client.get(url)
+        self.assertTrue(response['Content-Disposition'].startswith('attachment'))
+        self.assertEqual(response['Content-Security-Policy'], 'sandbox')
+
+
+calls = []
+
+
+@job('tests.flaky')
+def flaky_job(fail):
+    calls.append(fail)
+    if fail:
+        raise RuntimeError("boom")
+
+
+class JobQueueTestCase(TestCase):
+    def setUp(self):
+        calls.clear()
+        self.admin = User.objects.create_user('admin', 'admin@dayflow.test', 'pass', role='ADMIN')
+        self.employee = User.objects.create_user('emp', 'emp@dayflow.test', 'pass', employee_id='E001')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_jobs_only_exist_if_their_transaction_commits(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                enqueue('tests.flaky', {'fail': False})
+                raise RuntimeError
+        self.assertFalse(Job.objects.exists())
+
+        leave = LeaveRequest.objects.create(
+            employee=self.employee, leave_type='SICK', start_date=date(2026, 3, 2),
+            end_date=date(2026, 3, 2), reason='Down with the flu'
+        )
+        self.client.post(f'/core/leaves/{leave.pk}/approve/')
+        job_row = Job.objects.get()
+        self.assertEqual((job_row.name, job_row.payload), ('leave.decided', {'leave_ids': [leave.pk]}))
+        self.assertEqual(run_batch(), {'done': 1})
+        self.assertEqual(Job.objects.get().status, 'DONE')
+        self.assertEqual(run_batch(), {})
+
+    def test_failures_are_retried_with_backoff_then_given_up(self):
+        failing = enqueue('tests.flaky', {'fail': True}, max_attempts=2)
+        enqueue('tests.flaky', {'fail': False})
+        self.assertEqual(run_batch(), {'retried': 1, 'done': 1})
+        failing.refresh_from_db()
+        self.assertEqual((failing.status, failing.attempts), ('PENDING', 1))
+        self.assertIn('boom', failing.last_error)
+        self.assertGreater(failing.run_after, timezone.now())
+
+        Job.objects.filter(pk=failing.pk).update(run_after=timezone.now())
+        self.assertEqual(run_batch(), {'failed': 1})
+        self.assertEqual(Job.objects.get(pk=failing.pk).status, 'FAILED')
+        self.assertEqual(calls, [True, False, True])
+
+    def test_a_worker_that_lost_its_lease_cannot_finish_the_job(self):
+        enqueue('tests.flaky', {'fail': False})
+        [stale] = claim_jobs(1)
+        # The lease ran out and another worker claimed the job
+        Job.objects.filter(pk=stale.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        [current] = claim_jobs(1)
+        self.assertEqual(run_job(stale), 'lost')
+        self.assertEqual(run_job(current), 'done')
+        self.assertEqual(Job.objects.get().attempts, 2)
+
+    def test_worker_runs_deferred_rollup_rebuilds(self):
+        punches = [
+            {"employee_id": "E001", "timestamp": "2026-01-05T09:00:00Z", "direction": "in"},
+            {"employee_id": "E001", "timestamp": "2026-01-05T18:00:00Z", "direction": "out"},
+        ]
+        with self.settings(JOBS={'DEFER_ROLLUP_REBUILDS': True}):
+            self.client.post('/core/attendance/bulk_punches/', {"punches": punches}, format='json')
+        self.assertFalse(EmployeeMonthRollup.objects.exists())
+
+        call_command('run_jobs', '--once', stdout=io.StringIO())
+        self.assertEqual(EmployeeMonthRollup.objects.get(employee=self.employee).present, 1)
+
+
+class BenchmarkSmokeTestCase(TestCase):
+    def test_benchmark_runs_against_generated_data(self):
+        dataset = generate_dataset(employees=3, months=1, seed=1)
+        self.assertEqual(len(dataset['pending_leaves']), 3)
+
+        results = run_benchmarks(
+            dataset, iterations=2, warmup=1,
+            only=['check_in', 'check_out', 'monthly_summary', 'attendance_list', 'leave_approve'],
+        )
+        self.assertEqual(set(results), {'check_in', 'check_out', 'monthly_summary', 'attendance_list', 'leave_approve'})
+        self.assertEqual(results['check_in']['status'], {'201': 2})
+        self.assertEqual(results['leave_approve']['status'], {'200': 2})
+        self.assertEqual(results['monthly_summary']['queries_max'], 1)
+        for key in ('p50_ms', 'p99_ms', 'queries_mean', 'rss_mb'):
+            self.assertIn(key, results['attendance_list'])
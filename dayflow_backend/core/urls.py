@@ -2,6 +2,8 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView, TokenVerifyView
 from .views import UserViewSet, AttendanceViewSet, LeaveViewSet, PayrollViewSet
+from . import async_views
+from .media import serve_media
 
 router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='user')
@@ -17,5 +19,14 @@ urlpatterns = [
     path('auth/me/', UserViewSet.as_view({'get': 'me'}), name='user-me'),
     path('auth/profile/', UserViewSet.as_view({'patch': 'update_profile'}), name='update-profile'),
     
+    # Async versions of the hot endpoints, for ASGI deployments (core.async_views)
+    path('async/auth/me/', async_views.me, name='async-user-me'),
+    path('async/attendance/check_in/', async_views.check_in, name='async-check-in'),
+    path('async/attendance/check_out/', async_views.check_out, name='async-check-out'),
+    path('async/attendance/monthly_summary/', async_views.monthly_summary, name='async-monthly-summary'),
+    
+    # Uploaded files, behind signed URLs (core.media)
+    path('media/<path:name>', serve_media, name='media-file'),
+    
     path('', include(router.urls)),
 ]
\ No newline at end of file
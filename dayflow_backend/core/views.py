@@ -1,30 +1,78 @@
 from rest_framework import viewsets, status, permissions, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from rest_framework.throttling import UserRateThrottle, AnonRateThrottle
 from django.contrib.auth import authenticate, get_user_model
 from django_filters.rest_framework import DjangoFilterBackend
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from django.utils import timezone
-from datetime import datetime, timedelta
 from .permissions import IsAdminUser, IsOwnerOrAdmin
+from .pagination import UserPagination, AttendancePagination, LeavePagination, PayrollPagination
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from .models import User, Attendance, LeaveRequest, Payroll
+from .models import User, Attendance, DepartmentDayRollup, EmployeeMonthRollup, LeaveRequest, Payroll
 from .serializers import (
     UserSerializer, 
+    UserListSerializer,
     AttendanceSerializer, 
     LeaveSerializer, 
+    LeaveReviewSerializer,
+    TeamCalendarSerializer,
     PayrollSerializer,
-    UserLoginSerializer
+    UserLoginSerializer,
+    PunchBatchSerializer,
+    PayrollRunSerializer,
+    PayrollMonthSerializer
 )
+from . import checkins
+from .dashboard import cached_dashboard_stats
+from .exports import CSVExportMixin, employee_name
+from .jobs import enqueue
+from .onboarding import import_employees, read_employee_rows
+from .leaves import LeaveNotPending, approve_leave, review_leaves, team_absences
+from .punches import ingest_punches
+from .replicas import ReplicaReadMixin
+from .response_cache import cached_response, payroll_scopes, summary_scopes
+from .payroll import AMOUNT_FIELDS, PayrollCalculator, PayrollRun
 import logging
 
-from core import serializers
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+# Columns the list/retrieve serializers read through `employee.*`
+EMPLOYEE_NAME_FIELDS = ('employee__first_name', 'employee__last_name', 'employee__username')
+
+
+def with_employee_names(queryset, action):
+    """Join the employee row, pruned to the name columns on read-only actions"""
+    queryset = queryset.select_related('employee')
+    if action in ['list', 'retrieve']:
+        model_fields = [field.name for field in queryset.model._meta.concrete_fields]
+        queryset = queryset.only(*model_fields, *EMPLOYEE_NAME_FIELDS)
+    return queryset
+
+
+def check_in_payload(attendance):
+    return {
+        "status": "Checked in successfully",
+        "time": attendance.check_in,
+        "date": attendance.date
+    }
+
+
+def check_out_payload(attendance):
+    return {
+        "status": "Checked out successfully",
+        "check_in": attendance.check_in,
+        "check_out": attendance.check_out,
+        "work_hours": str(attendance.work_hours),
+        "extra_hours": str(attendance.extra_hours or "0.00")
+    }
+
 
 class LoginRateThrottle(AnonRateThrottle):
     """Custom throttle for login attempts"""
@@ -34,9 +82,13 @@ class LoginRateThrottle(AnonRateThrottle):
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter]
-    search_fields = ['username', 'email', 'employee_id', 'department']
+    pagination_class = UserPagination
+    # ?search= is handled by list() through User.objects.search (ranked, indexed)
+    filter_backends = [DjangoFilterBackend]
     filterset_fields = ['role', 'department', 'is_active']
+    typeahead_limit = 10
+    typeahead_max_limit = 25
+    bulk_import_max_rows = 5000
 
     def get_permissions(self):
         if self.action in ['login', 'create']:
@@ -45,11 +97,103 @@ class UserViewSet(viewsets.ModelViewSet):
             return [permissions.IsAuthenticated()]
         return [IsAdminUser()]
 
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return UserListSerializer
+        return super().get_serializer_class()
+
     def get_throttles(self):
         if self.action == 'login':
             return [LoginRateThrottle()]
         return super().get_throttles()
 
+    def list(self, request, *args, **kwargs):
+        """List users; with ?search=, the best page_size matches by rank"""
+        query = request.query_params.get('search')
+        if not query:
+            return super().list(request, *args, **kwargs)
+        
+        # Keyset pages follow the primary key, not relevance, so a search
+        # returns a single ranked page
+        queryset = self.filter_queryset(self.get_queryset()).search(query)
+        limit = self.paginator.get_page_size(request)
+        serializer = self.get_serializer(queryset[:limit], many=True)
+        return Response({"next": None, "previous": None, "results": serializer.data})
+
+    @action(detail=False, methods=['get'])
+    def typeahead(self, request):
+        """Top matches for ?q= as id/name/employee_id only, for pickers (Admin only)"""
+        try:
+            limit = min(int(request.query_params.get('limit', self.typeahead_limit)), self.typeahead_max_limit)
+        except ValueError:
+            return Response(
+                {"error": "limit must be a number"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        rows = (
+            User.objects.filter(is_active=True)
+            .search(request.query_params.get('q'))
+            .values('id', 'username', 'first_name', 'last_name', 'employee_id')[:max(limit, 1)]
+        )
+        return Response([
+            {
+                "id": row['id'],
+                "name": f"{row['first_name']} {row['last_name']}".strip() or row['username'],
+                "employee_id": row['employee_id'],
+            }
+            for row in rows
+        ])
+
+    @action(detail=False, methods=['post'])
+    def bulk_import(self, request):
+        """Create employees from a CSV/JSON `file` upload, an `employees` list or a bare JSON list (Admin only)"""
+        upload = request.FILES.get('file')
+        try:
+            if upload:
+                rows = read_employee_rows(upload.read(), upload.name)
+            elif isinstance(request.data, list):
+                rows = request.data
+            else:
+                rows = request.data.get('employees')
+        except (ValueError, UnicodeDecodeError) as error:
+            return Response(
+                {"error": f"Could not read the file: {error}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not isinstance(rows, list) or not rows:
+            return Response(
+                {"error": "Provide a CSV/JSON file or a non-empty employees list"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(rows) > self.bulk_import_max_rows:
+            return Response(
+                {"error": f"At most {self.bulk_import_max_rows} employees per import"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        dry_run = request.query_params.get('dry_run', '').lower() in ('1', 'true')
+        try:
+            results = import_employees(rows, dry_run=dry_run)
+        except IntegrityError:
+            return Response(
+                {"error": "Some of these employees were created concurrently; run the import again"},
+                status=status.HTTP_409_CONFLICT
+            )
+        counts = {}
+        for result in results:
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+        
+        logger.info(f"Bulk import by {request.user.username}: {counts}")
+        
+        return Response({
+            "received": len(results),
+            "dry_run": dry_run,
+            "summary": counts,
+            "results": results
+        })
+
     def create(self, request, *args, **kwargs):
         """Override create to add validation and logging"""
         serializer = self.get_serializer(data=request.data)
@@ -112,14 +256,20 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def me(self, request):
         """Get current user profile"""
-        serializer = UserSerializer(request.user)
+        serializer = UserSerializer(request.user, context={'request': request})
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def dashboard_stats(self, request):
+        """Headcount, today's attendance, pending leaves and this month's payroll (Admin only)"""
+        return Response(cached_dashboard_stats())
+
     @action(detail=False, methods=['patch'], permission_classes=[IsAuthenticated])
     def update_profile(self, request):
         """Allow users to update their own profile"""
-        user = request.user
-        serializer = UserSerializer(user, data=request.data, partial=True)
+        # request.user may come from the auth cache; never write back a stale copy
+        user = User.objects.get(pk=request.user.pk)
+        serializer = UserSerializer(user, data=request.data, partial=True, context={'request': request})
         
         restricted_fields = ['role', 'is_staff', 'is_superuser', 'employee_id']
         if not user.role == 'ADMIN':
@@ -137,17 +287,26 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class AttendanceViewSet(viewsets.ModelViewSet):
+class AttendanceViewSet(ReplicaReadMixin, CSVExportMixin, viewsets.ModelViewSet):
     queryset = Attendance.objects.all()
     serializer_class = AttendanceSerializer
+    pagination_class = AttendancePagination
     permission_classes = [IsAuthenticated, IsOwnerOrAdmin]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['date', 'status', 'employee']
     ordering_fields = ['date', 'check_in']
+    replica_actions = ('list', 'retrieve', 'monthly_summary')
+    export_annotations = {'employee_name': employee_name}
+    export_columns = [
+        ('Employee ID', 'employee__employee_id'), ('Username', 'employee__username'),
+        ('Name', 'employee_name'), ('Department', 'employee__department'),
+        ('Date', 'date'), ('Check In', 'check_in'), ('Check Out', 'check_out'),
+        ('Work Hours', 'work_hours'), ('Extra Hours', 'extra_hours'), ('Status', 'status'),
+    ]
 
     def get_queryset(self):
         user = self.request.user
-        queryset = self.queryset
+        queryset = with_employee_names(self.queryset, self.action)
         
         if user.role == 'ADMIN':
             employee_id = self.request.query_params.get('employee_id')
@@ -159,147 +318,174 @@ class AttendanceViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         """Ensure attendance is created for the authenticated user"""
-        if self.request.user.role != 'ADMIN':
-            serializer.save(employee=self.request.user)
-        else:
-            serializer.save()
+        extra = {} if self.request.user.role == 'ADMIN' else {'employee': self.request.user}
+        try:
+            with transaction.atomic():
+                serializer.save(**extra)
+        except IntegrityError:
+            raise ValidationError("Attendance record already exists for this date")
 
     @action(detail=False, methods=['post'])
     def check_in(self, request):
         """Handle employee check-in"""
-        today = timezone.now().date()
-        current_time = timezone.now().time()
-        
-        if Attendance.objects.filter(employee=request.user, date=today).exists():
-            return Response(
-                {"error": "Already checked in today"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        attendance = Attendance.objects.create(
-            employee=request.user,
-            date=today,
-            check_in=current_time,
-            status='PRESENT'
-        )
+        try:
+            attendance = checkins.check_in(request.user)
+        except checkins.CheckInError as error:
+            return Response({"error": error.message}, status=error.status)
         
-        logger.info(f"Check-in recorded for {request.user.username} at {current_time}")
+        logger.info(f"Check-in recorded for {request.user.username} at {attendance.check_in}")
         
-        return Response({
-            "status": "Checked in successfully",
-            "time": attendance.check_in,
-            "date": attendance.date
-        }, status=status.HTTP_201_CREATED)
+        return Response(check_in_payload(attendance), status=status.HTTP_201_CREATED)
 
     @action(detail=False, methods=['post'])
     def check_out(self, request):
         """Handle employee check-out and calculate work hours"""
-        today = timezone.now().date()
-        current_time = timezone.now().time()
-        
         try:
-            attendance = Attendance.objects.get(employee=request.user, date=today)
-            
-            if attendance.check_out:
-                return Response(
-                    {"error": "Already checked out today"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            attendance.check_out = current_time
-            
-            check_in_datetime = datetime.combine(today, attendance.check_in)
-            check_out_datetime = datetime.combine(today, current_time)
-            work_duration = check_out_datetime - check_in_datetime
-            
-            hours = work_duration.total_seconds() / 3600
-            attendance.work_hours = f"{hours:.2f}"
-            
-            if hours > 8:
-                attendance.extra_hours = f"{(hours - 8):.2f}"
-            
-            attendance.save()
-            
-            logger.info(f"Check-out recorded for {request.user.username} at {current_time}")
-            
-            return Response({
-                "status": "Checked out successfully",
-                "check_in": attendance.check_in,
-                "check_out": attendance.check_out,
-                "work_hours": attendance.work_hours,
-                "extra_hours": attendance.extra_hours or "0.00"
-            })
-            
-        except Attendance.DoesNotExist:
-            return Response(
-                {"error": "No check-in record found for today"},
-                status=status.HTTP_404_NOT_FOUND
-            )
+            attendance = checkins.check_out(request.user)
+        except checkins.CheckInError as error:
+            return Response({"error": error.message}, status=error.status)
+        
+        logger.info(f"Check-out recorded for {request.user.username} at {attendance.check_out}")
+        
+        return Response(check_out_payload(attendance))
 
-    @action(detail=False, methods=['get'])
-    def monthly_summary(self, request):
-        """Get monthly attendance summary"""
-        user = request.user
-        month = request.query_params.get('month', timezone.now().month)
-        year = request.query_params.get('year', timezone.now().year)
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsAdminUser])
+    def bulk_punches(self, request):
+        """Ingest a batch of terminal punches (Admin/device accounts only)"""
+        serializer = PunchBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
         
+        results = ingest_punches(serializer.validated_data['punches'])
+        counts = {}
+        for result in results:
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+        
+        logger.info(f"Bulk punches ingested by {request.user.username}: {counts}")
+        
+        return Response({
+            "received": len(results),
+            "summary": counts,
+            "results": results
+        })
+
+    # group_by value -> (columns to group on, how to label each row)
+    SUMMARY_GROUPINGS = {
+        'employee': (
+            ['employee', 'employee__username', 'employee__first_name',
+             'employee__last_name', 'employee__department'],
+            lambda row: {
+                "employee": row['employee'],
+                "employee_username": row['employee__username'],
+                "employee_name": f"{row['employee__first_name']} {row['employee__last_name']}".strip(),
+                "department": row['employee__department'],
+            },
+        ),
+        'department': (
+            ['employee__department'],
+            lambda row: {"department": row['employee__department']},
+        ),
+        'day': (
+            ['date'],
+            lambda row: {"date": row['date']},
+        ),
+    }
+
+    @staticmethod
+    def _summary_counts(row):
+        return {
+            "total_days": row['total_days'],
+            "present": row['present'],
+            "absent": row['absent'],
+            "half_day": row['half_day'],
+            "on_leave": row['on_leave'],
+            "work_hours": round(float(row['work_hours'] or 0), 2),
+            "extra_hours": round(float(row['extra_hours'] or 0), 2),
+        }
+
+    @classmethod
+    def summary_query(cls, user, params):
+        """
+        Parse monthly_summary's query parameters into (month, year, group_by,
+        queryset); raises ValueError with the message to return on bad input.
+        """
         try:
-            month = int(month)
-            year = int(year)
+            month = int(params.get('month', timezone.now().month))
+            year = int(params.get('year', timezone.now().year))
+            if not 1 <= month <= 12:
+                raise ValueError
         except ValueError:
-            return Response(
-                {"error": "Invalid month or year"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+            raise ValueError("Invalid month or year")
         
-        if user.role == 'ADMIN':
-            employee_id = request.query_params.get('employee_id')
+        group_by = params.get('group_by')
+        if group_by and group_by not in cls.SUMMARY_GROUPINGS:
+            raise ValueError("group_by must be one of: employee, department, day")
+        
+        # Read the pre-aggregated rollups (core.rollups); per-day figures for
+        # a single employee come from their own rows, at most 31 of them.
+        employee_id = params.get('employee_id') if user.role == 'ADMIN' else user.pk
+        if group_by != 'day':
+            attendance_records = EmployeeMonthRollup.objects.for_month(year, month)
             if employee_id:
-                attendance_records = Attendance.objects.filter(
-                    employee_id=employee_id,
-                    date__month=month,
-                    date__year=year
-                )
-            else:
-                attendance_records = Attendance.objects.filter(
-                    date__month=month,
-                    date__year=year
-                )
+                attendance_records = attendance_records.filter(employee_id=employee_id)
+        elif employee_id:
+            attendance_records = Attendance.objects.for_month(year, month).filter(employee_id=employee_id)
         else:
-            attendance_records = Attendance.objects.filter(
-                employee=user,
-                date__month=month,
-                date__year=year
+            attendance_records = DepartmentDayRollup.objects.for_month(year, month)
+        return month, year, group_by, attendance_records
+
+    @action(detail=False, methods=['get'])
+    @cached_response(summary_scopes)
+    def monthly_summary(self, request):
+        """Get monthly attendance summary, optionally grouped by employee or department"""
+        try:
+            month, year, group_by, attendance_records = self.summary_query(request.user, request.query_params)
+        except ValueError as error:
+            return Response(
+                {"error": str(error)},
+                status=status.HTTP_400_BAD_REQUEST
             )
         
-        total_days = attendance_records.count()
-        present_days = attendance_records.filter(status='PRESENT').count()
-        absent_days = attendance_records.filter(status='ABSENT').count()
-        half_days = attendance_records.filter(status='HALF_DAY').count()
+        if not group_by:
+            return Response({
+                "month": month,
+                "year": year,
+                **self._summary_counts(attendance_records.summary())
+            })
         
+        columns, label = self.SUMMARY_GROUPINGS[group_by]
         return Response({
             "month": month,
             "year": year,
-            "total_days": total_days,
-            "present": present_days,
-            "absent": absent_days,
-            "half_day": half_days
+            "group_by": group_by,
+            "results": [
+                {**label(row), **self._summary_counts(row)}
+                for row in attendance_records.summary_by(*columns)
+            ]
         })
 
 
-class LeaveViewSet(viewsets.ModelViewSet):
+class LeaveViewSet(CSVExportMixin, viewsets.ModelViewSet):
     queryset = LeaveRequest.objects.all()
     serializer_class = LeaveSerializer
+    pagination_class = LeavePagination
     permission_classes = [IsAuthenticated, IsOwnerOrAdmin]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['status', 'leave_type']
     ordering_fields = ['start_date', 'status']
+    export_annotations = {'employee_name': employee_name}
+    export_columns = [
+        ('Employee ID', 'employee__employee_id'), ('Username', 'employee__username'),
+        ('Name', 'employee_name'), ('Department', 'employee__department'),
+        ('Leave Type', 'leave_type'), ('Start Date', 'start_date'), ('End Date', 'end_date'),
+        ('Status', 'status'), ('Reason', 'reason'), ('Admin Comment', 'admin_comment'),
+    ]
 
     def get_queryset(self):
         user = self.request.user
+        queryset = with_employee_names(self.queryset, self.action)
         if user.role == 'ADMIN':
-            return self.queryset.all()
-        return self.queryset.filter(employee=user)
+            return queryset
+        return queryset.filter(employee=user)
 
     def perform_create(self, serializer):
         """Create leave request with validation"""
@@ -309,45 +495,74 @@ class LeaveViewSet(viewsets.ModelViewSet):
         end_date = serializer.validated_data.get('end_date')
         
         days_requested = (end_date - start_date).days + 1
+        # request.user may come from the auth cache; check the stored balances
+        balances = User.objects.filter(pk=user.pk).values('paid_leave_balance', 'sick_leave_balance').get()
         
-        if leave_type == 'PAID' and user.paid_leave_balance < days_requested:
-            raise serializers.ValidationError(
+        if leave_type == 'PAID' and balances['paid_leave_balance'] < days_requested:
+            raise ValidationError(
                 "Insufficient paid leave balance"
             )
-        elif leave_type == 'SICK' and user.sick_leave_balance < days_requested:
-            raise serializers.ValidationError(
+        elif leave_type == 'SICK' and balances['sick_leave_balance'] < days_requested:
+            raise ValidationError(
                 "Insufficient sick leave balance"
             )
         
-        serializer.save(employee=user, status='PENDING')
+        try:
+            with transaction.atomic():
+                serializer.save(employee=user, status='PENDING')
+                enqueue('leave.requested', {'leave_id': serializer.instance.pk})
+        except IntegrityError:
+            raise ValidationError("You already have a leave request for overlapping dates")
         logger.info(f"Leave request created by {user.username}")
 
+    def perform_update(self, serializer):
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            raise ValidationError("You already have a leave request for overlapping dates")
+
+    def get_team(self, manager=None):
+        """Employees whose absences the requesting user may see"""
+        user = self.request.user
+        employees = User.objects.filter(is_active=True)
+        if user.role == 'ADMIN':
+            return employees.filter(manager_id=manager) if manager else employees
+
+        # The user, their direct reports, and their own manager's team
+        team = Q(pk=user.pk) | Q(manager_id=user.pk)
+        if user.manager_id:
+            team |= Q(pk=user.manager_id) | Q(manager_id=user.manager_id)
+        return employees.filter(team)
+
+    @action(detail=False, methods=['get'])
+    def team_calendar(self, request):
+        """Who is out between ?start and ?end (default: this week)"""
+        serializer = TeamCalendarSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        team = self.get_team(data.get('manager')).values('pk')
+        
+        return Response({
+            "start": data['start'],
+            "end": data['end'],
+            "absences": team_absences(team, data['start'], data['end'])
+        })
+
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, IsAdminUser])
     def approve(self, request, pk=None):
         """Approve leave request (Admin only)"""
         leave_request = self.get_object()
         
-        if leave_request.status != 'PENDING':
+        try:
+            leave_request = approve_leave(leave_request.pk, request.data.get('comment', ''))
+        except LeaveNotPending:
             return Response(
                 {"error": "Leave request is not pending"},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        leave_request.status = 'APPROVED'
-        leave_request.admin_comment = request.data.get('comment', '')
-        leave_request.save()
-        
-        employee = leave_request.employee
-        days = (leave_request.end_date - leave_request.start_date).days + 1
-        
-        if leave_request.leave_type == 'PAID':
-            employee.paid_leave_balance -= days
-        elif leave_request.leave_type == 'SICK':
-            employee.sick_leave_balance -= days
-        
-        employee.save()
-        
-        logger.info(f"Leave approved for {employee.username} by {request.user.username}")
+        logger.info(f"Leave approved for {leave_request.employee.username} by {request.user.username}")
         
         return Response(LeaveSerializer(leave_request).data)
 
@@ -364,26 +579,59 @@ class LeaveViewSet(viewsets.ModelViewSet):
         
         leave_request.status = 'REJECTED'
         leave_request.admin_comment = request.data.get('comment', '')
-        leave_request.save()
+        with transaction.atomic():
+            leave_request.save()
+            enqueue('leave.decided', {'leave_ids': [leave_request.pk]})
         
         logger.info(f"Leave rejected for {leave_request.employee.username} by {request.user.username}")
         
         return Response(LeaveSerializer(leave_request).data)
 
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsAdminUser])
+    def review(self, request):
+        """Approve or reject many pending leave requests at once (Admin only)"""
+        serializer = LeaveReviewSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        data = serializer.validated_data
+        results = review_leaves(data['ids'], data['decision'], data['comment'])
+        counts = {}
+        for result in results:
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+        
+        logger.info(f"Leave queue reviewed by {request.user.username}: {counts}")
+        
+        return Response({
+            "received": len(results),
+            "summary": counts,
+            "results": results
+        })
+
 
-class PayrollViewSet(viewsets.ModelViewSet):
+class PayrollViewSet(ReplicaReadMixin, CSVExportMixin, viewsets.ModelViewSet):
     queryset = Payroll.objects.all()
     serializer_class = PayrollSerializer
+    pagination_class = PayrollPagination
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ['employee', 'month']
     ordering_fields = ['month']
+    replica_actions = ('list', 'retrieve')
+    export_annotations = {'employee_name': employee_name}
+    export_columns = [
+        ('Employee ID', 'employee__employee_id'), ('Username', 'employee__username'),
+        ('Name', 'employee_name'), ('Department', 'employee__department'), ('Month', 'month'),
+        ('Basic Salary', 'basic_salary'), ('HRA', 'hra'), ('Standard Allowance', 'standard_allowance'),
+        ('Other Allowances', 'other_allowances'), ('PF', 'pf'), ('Professional Tax', 'professional_tax'),
+        ('Unpaid Days', 'unpaid_days'), ('Loss of Pay', 'loss_of_pay'), ('Net Salary', 'net_salary'),
+    ]
 
     def get_queryset(self):
         user = self.request.user
+        queryset = with_employee_names(self.queryset, self.action)
         if user.role == 'ADMIN':
-            return self.queryset.all()
-        return self.queryset.filter(employee=user)
+            return queryset
+        return queryset.filter(employee=user)
 
     def get_permissions(self):
         """Only admins can create, update, or delete payroll"""
@@ -391,7 +639,69 @@ class PayrollViewSet(viewsets.ModelViewSet):
             return [IsAuthenticated(), IsAdminUser()]
         return [IsAuthenticated()]
 
+    @cached_response(payroll_scopes)
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_response(payroll_scopes)
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    def _loss_of_pay(self, serializer):
+        """Pro-rate the saved amounts against the month's attendance and unpaid leave"""
+        data = {}
+        if serializer.instance:
+            data = {field: getattr(serializer.instance, field) for field in AMOUNT_FIELDS + ['employee', 'month']}
+        data.update(serializer.validated_data)
+        if not data.get('employee') or not data.get('month'):
+            return {}
+        calculator = PayrollCalculator(data['month']).prefetch([data['employee'].pk])
+        return calculator.adjustments(data['employee'].pk, data)
+
     def perform_create(self, serializer):
         """Log payroll creation"""
-        serializer.save()
-        logger.info(f"Payroll created for {serializer.instance.employee.username}")
\ No newline at end of file
+        try:
+            with transaction.atomic():
+                serializer.save(**self._loss_of_pay(serializer))
+        except IntegrityError:
+            raise ValidationError("Payroll entry already exists for this employee and month")
+        logger.info(f"Payroll created for {serializer.instance.employee.username}")
+
+    def perform_update(self, serializer):
+        serializer.save(**self._loss_of_pay(serializer))
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsAdminUser])
+    def run(self, request):
+        """Generate (or preview with dry_run) a whole month's payroll (Admin only)"""
+        serializer = PayrollRunSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        
+        try:
+            report = PayrollRun(
+                params['month'], params['template'], replace=params['replace']
+            ).execute(dry_run=params['dry_run'])
+        except IntegrityError:
+            # Another run created some of the month's payslips while this one was planning
+            return Response(
+                {"error": "Another payroll run for this month is in progress; try again"},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        logger.info(
+            f"Payroll run for {params['month']:%Y-%m} by {request.user.username} "
+            f"(dry_run={params['dry_run']}): {report['summary']}"
+        )
+        return Response(report)
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsAdminUser])
+    def recalculate(self, request):
+        """Re-apply attendance and unpaid leave to every payslip of a month (Admin only)"""
+        serializer = PayrollMonthSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        month = serializer.validated_data['month']
+        
+        changed = PayrollCalculator(month).recalculate_month()
+        logger.info(f"Payroll for {month:%Y-%m} recalculated by {request.user.username}: {len(changed)} changed")
+        
+        return Response({"month": month, "updated": len(changed)})
@@ -2,6 +2,10 @@
 ASGI config for dayflow_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with an ASGI server so the async views in core.async_views run on
+the event loop, e.g.:
+
+    uvicorn dayflow_backend.asgi:application --workers 4
 
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
@@ -12,5 +16,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'dayflow_backend.settings')
+# No persistent connections under ASGI unless DB_CONN_MAX_AGE says otherwise (see database.py)
+os.environ.setdefault('DB_ASGI', 'true')
 
 application = get_asgi_application()
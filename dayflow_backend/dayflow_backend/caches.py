@@ -0,0 +1,45 @@
+"""
+Environment-driven CACHES configuration.
+
+    CACHE_BACKEND      locmem (default), file or redis
+    CACHE_LOCATION     directory for file, server URL(s) for redis, comma
+                       separated (default redis://localhost:6379/0)
+    CACHE_KEY_PREFIX   namespace for every key (default 'dayflow')
+
+locmem is per process, so throttle counts, cached users and cached responses
+are only shared between workers with file or redis.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+
+DEFAULT_LOCATIONS = {
+    'locmem': 'dayflow',
+    'file': '/var/tmp/dayflow_cache',
+    'redis': 'redis://localhost:6379/0',
+}
+
+
+def cache_backends(environ=None):
+    """Build CACHES from environ (os.environ by default)"""
+    env = os.environ if environ is None else environ
+    kind = env.get('CACHE_BACKEND', 'locmem').lower()
+    if kind not in BACKENDS:
+        raise ImproperlyConfigured(f"CACHE_BACKEND must be one of: {', '.join(BACKENDS)}")
+
+    location = env.get('CACHE_LOCATION', DEFAULT_LOCATIONS[kind])
+    if kind == 'redis' and ',' in location:
+        location = [server.strip() for server in location.split(',')]
+    return {
+        'default': {
+            'BACKEND': BACKENDS[kind],
+            'LOCATION': location,
+            'KEY_PREFIX': env.get('CACHE_KEY_PREFIX', 'dayflow'),
+        }
+    }
@@ -0,0 +1,127 @@
+"""
+Environment-driven DATABASES configuration.
+
+    DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT   primary connection
+    DB_POOL                 use psycopg's connection pool (default: on when
+                            psycopg_pool is installed, as requirements.txt
+                            asks)
+    DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT
+    DB_CONN_MAX_AGE         seconds to keep a connection open when not
+                            pooling (0 closes it after every request);
+                            default 60, or 0 under ASGI
+    DB_ASGI                 set by dayflow_backend.asgi: async views open a
+                            connection per thread, which a persistent
+                            connection would leave open
+    DB_CONN_HEALTH_CHECKS   check reused connections before handing them out
+    DB_STATEMENT_TIMEOUT    server-side statement timeout in ms (0 disables)
+    DB_JOB_STATEMENT_TIMEOUT  timeout in ms for long management jobs
+                            (rebuild_rollups, run_payroll; 0 disables, the
+                            default), applied with statement_timeout()
+    DB_REPLICA_HOST         adds a 'replica' alias for read-only traffic (see
+                            core.replicas); DB_REPLICA_PORT, DB_REPLICA_NAME,
+                            DB_REPLICA_USER and DB_REPLICA_PASSWORD default
+                            to the primary's values
+
+Pooling and persistent connections are alternatives: Django refuses a pool
+with CONN_MAX_AGE, so DB_CONN_MAX_AGE only applies when the pool is off.
+"""
+import importlib.util
+import os
+from contextlib import contextmanager
+
+TRUE_VALUES = {'1', 'true', 'yes', 'on'}
+
+DEFAULTS = {
+    'DB_NAME': 'dayflow_db',
+    'DB_USER': 'dayflow_user',
+    'DB_PASSWORD': '!@#$%^&*()',
+    'DB_HOST': 'localhost',
+    'DB_PORT': '5432',
+    'DB_POOL_MIN_SIZE': '2',
+    'DB_POOL_MAX_SIZE': '20',
+    'DB_POOL_TIMEOUT': '10',
+    'DB_ASGI': 'false',
+    'DB_CONN_HEALTH_CHECKS': 'true',
+    'DB_STATEMENT_TIMEOUT': '30000',
+    'DB_JOB_STATEMENT_TIMEOUT': '0',
+}
+
+
+def _flag(value):
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+def pool_available():
+    return importlib.util.find_spec('psycopg_pool') is not None
+
+
+def database_settings(environ=None):
+    """Build DATABASES from environ (os.environ by default)"""
+    env = {**DEFAULTS, **(os.environ if environ is None else environ)}
+    pooled = _flag(env['DB_POOL']) if 'DB_POOL' in env else pool_available()
+    health_checks = _flag(env['DB_CONN_HEALTH_CHECKS'])
+    conn_max_age = int(env.get('DB_CONN_MAX_AGE', 0 if _flag(env['DB_ASGI']) else 60))
+
+    options = {}
+    statement_timeout = int(env['DB_STATEMENT_TIMEOUT'])
+    if statement_timeout:
+        options['options'] = f'-c statement_timeout={statement_timeout}'
+    if pooled:
+        pool = {
+            'min_size': int(env['DB_POOL_MIN_SIZE']),
+            'max_size': int(env['DB_POOL_MAX_SIZE']),
+            'timeout': float(env['DB_POOL_TIMEOUT']),
+        }
+        options['pool'] = pool
+
+    default = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': env['DB_NAME'],
+        'USER': env['DB_USER'],
+        'PASSWORD': env['DB_PASSWORD'],
+        'HOST': env['DB_HOST'],
+        'PORT': env['DB_PORT'],
+        'CONN_MAX_AGE': 0 if pooled else conn_max_age,
+        # With a pool, Django turns this into the pool's check on checkout
+        'CONN_HEALTH_CHECKS': health_checks,
+        'OPTIONS': options,
+    }
+    databases = {'default': default}
+
+    if env.get('DB_REPLICA_HOST'):
+        databases['replica'] = {
+            **default,
+            'HOST': env['DB_REPLICA_HOST'],
+            'PORT': env.get('DB_REPLICA_PORT', default['PORT']),
+            'NAME': env.get('DB_REPLICA_NAME', default['NAME']),
+            'USER': env.get('DB_REPLICA_USER', default['USER']),
+            'PASSWORD': env.get('DB_REPLICA_PASSWORD', default['PASSWORD']),
+            'OPTIONS': {**options, 'pool': {**options['pool']}} if pooled else dict(options),
+            # Tests read the replica through the default connection
+            'TEST': {'MIRROR': 'default'},
+        }
+    return databases
+
+
+def job_statement_timeout(environ=None):
+    env = {**DEFAULTS, **(os.environ if environ is None else environ)}
+    return int(env['DB_JOB_STATEMENT_TIMEOUT'])
+
+
+@contextmanager
+def statement_timeout(milliseconds, using='default'):
+    """Replace DB_STATEMENT_TIMEOUT on one connection for the duration of a long job (0 disables)"""
+    from django.db import connections
+
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SET statement_timeout = %s', [int(milliseconds)])
+    try:
+        yield
+    finally:
+        # Back to the connection's startup value, so a pooled connection is returned as it was lent
+        with connection.cursor() as cursor:
+            cursor.execute('SET statement_timeout TO DEFAULT')
@@ -14,6 +14,9 @@ from pathlib import Path
 import os
 from datetime import timedelta
 
+from .caches import cache_backends
+from .database import database_settings
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -40,6 +43,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'rest_framework_simplejwt',
     'django_filters',
@@ -48,6 +52,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -63,7 +68,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': (
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -78,9 +83,14 @@ REST_FRAMEWORK = {
         'anon': '100/hour',
         'user': '1000/hour',
         'login': '5/hour',
-    }
+    },
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
+    'PAGE_SIZE': 50,
 }
 
+# Upper bound for the client-supplied ?page_size= on list endpoints
+PAGINATION_MAX_PAGE_SIZE = 200
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
@@ -95,6 +105,65 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
 }
 
+# Backend from the environment (CACHE_* variables, see dayflow_backend/caches.py);
+# also holds the DRF throttle counters
+CACHES = cache_backends()
+
+# Cached payroll and monthly summary responses (core.response_cache). TTL is in
+# seconds; entries are also dropped as soon as the underlying rows change.
+# DASHBOARD_TTL is how stale the admin dashboard figures may get (core.dashboard).
+# 0 disables the cache.
+RESPONSE_CACHE = {
+    'TTL': 300,
+    'DASHBOARD_TTL': 60,
+}
+
+# Short-lived cache of the authenticated user's row (core.authentication).
+# TTL is in seconds; 0 disables the cache. SHARED_CACHE names a CACHES alias
+# (file or redis) to keep entries in. Without one, the cache is per process
+# and stays off when PROCESSES (WEB_CONCURRENCY) says there is more than one.
+AUTH_USER_CACHE = {
+    'TTL': 30,
+    'MAX_ENTRIES': 10000,
+    'SHARED_CACHE': None,
+    'PROCESSES': int(os.environ.get('WEB_CONCURRENCY', 1)),
+}
+
+# Annual leave entitlements used by `manage.py accrue_leave` (core.leaves)
+LEAVE_POLICY = {
+    'PAID_ANNUAL': 24,
+    'SICK_ANNUAL': 7,
+    'PAID_CARRY_FORWARD_CAP': 12,
+}
+
+# End-of-day closing used by `manage.py close_attendance` (core.closing)
+ATTENDANCE_POLICY = {
+    'CHECK_OUT_TIME': '18:00',
+    'WORKING_DAYS': [0, 1, 2, 3, 4],  # Monday=0 ... Sunday=6
+}
+
+# Request metrics served on /metrics (core.metrics) to bearers of TOKEN;
+# without a token the endpoint is only open when DEBUG is on
+METRICS = {
+    'SLOW_REQUEST_SECONDS': 1.0,
+    'SLOW_REQUEST_MAX_SQL': 50,
+    'TOKEN': os.environ.get('METRICS_TOKEN'),
+}
+
+# Outbox jobs run by `manage.py run_jobs` (core.jobs). Failed attempts are
+# retried after RETRY_BASE_SECONDS, doubling up to RETRY_MAX_SECONDS.
+# DEFER_ROLLUP_REBUILDS moves the rollup rebuild after a punch upload to the
+# worker; only enable it where the worker runs.
+JOBS = {
+    'BATCH_SIZE': 20,
+    'LEASE_SECONDS': 300,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BASE_SECONDS': 10,
+    'RETRY_MAX_SECONDS': 3600,
+    'KEEP_FINISHED_DAYS': 7,
+    'DEFER_ROLLUP_REBUILDS': False,
+}
+
 ROOT_URLCONF = 'dayflow_backend.urls'
 
 TEMPLATES = [
@@ -125,18 +194,12 @@ WSGI_APPLICATION = 'dayflow_backend.wsgi.application'
 #     }
 # }
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'dayflow_db',
-        'USER': 'dayflow_user',
-        'PASSWORD': '!@#$%^&*()',
-        'HOST': 'localhost',
-        'PORT': '5432',
-    }
-}
-
+# Connection, pooling, timeouts and the optional read replica come from the
+# environment (DB_* variables, see dayflow_backend/database.py)
+DATABASES = database_settings()
 
+# Sends read-only list/summary traffic to the replica when one is configured
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
 
 
 # Password validation
@@ -176,6 +239,18 @@ USE_TZ = True
 STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Spool uploads larger than this to a temporary file instead of memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = 256 * 1024
+# Upload limits, avatar thumbnails and signed media URLs (core.media)
+MEDIA_PIPELINE = {
+    'MAX_UPLOAD_SIZE': 5 * 1024 * 1024,
+    'THUMBNAIL_SIZES': {'small': 64, 'medium': 256},
+    'THUMBNAIL_QUALITY': 80,
+    'URL_MAX_AGE': 3600,
+    # nginx `internal` location aliasing MEDIA_ROOT, e.g. '/protected-media/';
+    # empty streams files from Django
+    'ACCEL_PREFIX': '',
+}
 CORS_ALLOW_ALL_ORIGINS = False
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",